@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量创建用户性能测试脚本
+对比逐个调用创建用户（原 POST /users/ 的写法，每个用户多次往返）与
+POST /users/bulk（集合化唯一性检查 + 多行INSERT，单个事务）的每秒创建用户数
+
+用法:
+    python benchmarks/bench_bulk_create.py --users 2000
+    python benchmarks/bench_bulk_create.py --users 2000 --backend sqlite --sqlite-path /tmp/bench.db
+    python benchmarks/bench_bulk_create.py --url http://127.0.0.1:8000 --users 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import STORAGE_CONFIG
+from db_pool import close_pool, get_db_connection
+from passwords import hash_password
+from storage import BACKENDS, use_backend
+from user_management import UserCreate, _create_user, _create_users_bulk
+
+PREFIX = "bench_bulk_"
+
+
+def make_users(count: int, tag: str):
+    return [
+        UserCreate(username=f"{PREFIX}{tag}_{i}", password=f"pw{i}",
+                   email=f"{PREFIX}{tag}_{i}@example.com", phone=None, user_type="student")
+        for i in range(count)
+    ]
+
+
+def cleanup():
+    connection = get_db_connection()
+    if connection:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM users WHERE username LIKE %s", (f"{PREFIX}%",))
+            connection.commit()
+        finally:
+            connection.close()
+
+
+def report(name: str, count: int, elapsed: float):
+    print(f"{name:<14}{count:>8}{elapsed:>12.2f}{count / elapsed:>14.0f}")
+
+
+def bench_database(count: int):
+    print(f"{'写入方式':<14}{'用户数':>8}{'耗时(s)':>12}{'用户/秒':>14}")
+    print("-" * 48)
+
+    users = make_users(count, "hash")
+    start = time.perf_counter()
+    for user in users:
+        hash_password(user.password)
+    report("仅密码哈希", count, time.perf_counter() - start)
+
+    users = make_users(count, "single")
+    start = time.perf_counter()
+    for user in users:
+        _create_user(user, hash_password(user.password))
+    report("逐个创建", count, time.perf_counter() - start)
+
+    users = make_users(count, "bulk")
+    start = time.perf_counter()
+    result = _create_users_bulk(users)
+    report("批量创建", count, time.perf_counter() - start)
+    assert result.created == count, f"批量创建失败 {result.failed} 行"
+
+    # 全部冲突时只有唯一性检查的开销
+    start = time.perf_counter()
+    result = _create_users_bulk(users)
+    report("批量(全冲突)", count, time.perf_counter() - start)
+    assert result.failed == count
+
+
+def bench_http(url: str, count: int):
+    import requests
+
+    session = requests.Session()
+    users = [u.model_dump() if hasattr(u, "model_dump") else u.dict() for u in make_users(count, "http")]
+    start = time.perf_counter()
+    response = session.post(f"{url}/users/bulk", json={"users": users})
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    body = response.json()
+    print(f"POST /users/bulk {count} 个用户: {elapsed:.2f}s, {count / elapsed:.0f} 用户/秒, "
+          f"成功 {body['created']}, 失败 {body['failed']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量创建用户性能测试")
+    parser.add_argument("--users", type=int, default=2000, help="创建的用户数")
+    parser.add_argument("--url", help="对运行中的服务测量 POST /users/bulk")
+    parser.add_argument("--backend", choices=BACKENDS, default=STORAGE_CONFIG['backend'], help="存储后端")
+    parser.add_argument("--sqlite-path", help="SQLite数据库文件（默认 STORAGE_CONFIG['sqlite_path']）")
+    args = parser.parse_args()
+    use_backend(args.backend, args.sqlite_path)
+
+    try:
+        if args.url:
+            bench_http(args.url, args.users)
+        else:
+            bench_database(args.users)
+    finally:
+        cleanup()
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
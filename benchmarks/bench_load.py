@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发负载测试脚本
+对运行中的服务按场景施加并发负载，每个虚拟用户使用一条keep-alive连接（asyncio实现的HTTP/1.1客户端，
+不依赖第三方库），统计吞吐量、p50/p95/p99延迟、错误率和状态码分布，并可保存为JSON以便比较多次运行。
+
+场景:
+    health      GET /health（不访问数据库，作为基线）
+    login       登录风暴：并发 POST /auth/login
+    list        用户列表随机翻页（前10页）
+    deep        深翻页：按 next_cursor 连续翻页，到末尾后重新开始
+    search      按关键词搜索用户
+    bulk        批量创建用户（写入数据库，需要 --allow-writes；用户名以 loadtest_ 开头）
+    profile     读取用户资料 /auth/profile/{id}
+
+/users 和 /admin 接口使用 --username/--password 登录得到的令牌。功能性检查仍使用 src/test_api.py 等脚本。
+
+用法:
+    python benchmarks/bench_load.py --url http://127.0.0.1:8000 --scenarios list,search,profile \\
+        --concurrency 32 --duration 20 --output results/after.json
+    python benchmarks/bench_load.py --scenarios login --concurrency 64 --compare results/before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+SEARCH_TERMS = ["zhang", "wang", "li", "student", "teacher", "138", "example", "2024"]
+LOGIN_ACCOUNTS = [("admin", "admin123"), ("teacher_zhang", "teacher123"), ("student_wang", "student123")]
+
+
+class HTTPError(Exception):
+    """响应格式无法解析"""
+
+
+class HTTPClient:
+    """最小的HTTP/1.1客户端：一条keep-alive连接，顺序发送请求，服务端关闭连接时自动重连"""
+
+    def __init__(self, host: str, port: int, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        sock = self._writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self._reader = self._writer = None
+
+    async def request(self, method: str, path: str, body=None,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        """发送请求，返回 (状态码, 响应体)；body为dict/list时按JSON发送"""
+        data = b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        if body is not None:
+            data = json.dumps(body).encode()
+            lines.append("Content-Type: application/json")
+        lines.append(f"Content-Length: {len(data)}")
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode() + data
+
+        for attempt in (1, 2):
+            if self._writer is None:
+                await self._connect()
+            try:
+                self._writer.write(payload)
+                await self._writer.drain()
+                return await asyncio.wait_for(self._read_response(), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # keep-alive连接被服务端关闭，重连后重试一次
+                await self.close()
+                if attempt == 2:
+                    raise
+            except BaseException:
+                await self.close()
+                raise
+
+    async def _read_response(self) -> Tuple[int, bytes]:
+        status_line = await self._reader.readuntil(b"\r\n")
+        parts = status_line.split(b" ", 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+            raise HTTPError(f"无效的状态行: {status_line!r}")
+        status = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readuntil(b"\r\n")
+                    break
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readexactly(2)
+            body = b"".join(chunks)
+        else:
+            body = await self._reader.readexactly(int(headers.get("content-length", 0)))
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, body
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """最近秩法百分位数，sorted_values须已排序"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))  # 向上取整
+    return sorted_values[int(rank) - 1]
+
+
+class ScenarioResult:
+    """一个场景的请求结果汇总"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def record(self, status: Optional[int], latency: float, ok: bool):
+        self.latencies.append(latency)
+        key = str(status) if status is not None else "exception"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self) -> Dict:
+        values = sorted(self.latencies)
+        count = len(values)
+
+        def ms(value):
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "requests": count,
+            "duration_s": round(self.elapsed, 3),
+            "throughput_rps": round(count / self.elapsed, 2) if self.elapsed else 0.0,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "latency_ms": {
+                "p50": ms(percentile(values, 50)),
+                "p95": ms(percentile(values, 95)),
+                "p99": ms(percentile(values, 99)),
+                "max": ms(values[-1] if values else None),
+                "mean": ms(sum(values) / count if count else None),
+            },
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+class LoadTest:
+    """按场景生成请求；每个场景函数执行一次操作并返回 (状态码, 是否成功)"""
+
+    def __init__(self, args):
+        self.args = args
+        url = urlsplit(args.url)
+        self.host = url.hostname or "127.0.0.1"
+        self.port = url.port or 80
+        self.auth: Dict[str, str] = {}
+        self.run_id = uuid.uuid4().hex[:8]
+        self.scenarios: Dict[str, Callable] = {
+            "health": self.health,
+            "login": self.login,
+            "list": self.list_paging,
+            "deep": self.deep_pagination,
+            "search": self.search,
+            "bulk": self.bulk_create,
+            "profile": self.profile,
+        }
+
+    async def authenticate(self):
+        """登录取得访问令牌，供 /users 接口使用"""
+        client = HTTPClient(self.host, self.port)
+        try:
+            status, body = await client.request(
+                "POST", "/auth/login", {"username": self.args.username, "password": self.args.password})
+        finally:
+            await client.close()
+        result = json.loads(body) if status == 200 else {}
+        if not result.get("token"):
+            print(f"警告: 以 {self.args.username} 登录失败（状态码 {status}），/users 场景将不带令牌")
+            return
+        self.auth = {"Authorization": f"Bearer {result['token']}"}
+
+    async def health(self, client: HTTPClient, state: Dict):
+        status, _ = await client.request("GET", "/health")
+        return status, status == 200
+
+    async def login(self, client: HTTPClient, state: Dict):
+        username, password = random.choice(LOGIN_ACCOUNTS)
+        status, body = await client.request("POST", "/auth/login", {"username": username, "password": password})
+        # 429（登录限流）计为错误，说明并发超过了限流配置
+        return status, status == 200 and json.loads(body).get("success") is True
+
+    async def list_paging(self, client: HTTPClient, state: Dict):
+        query = urlencode({"page": random.randint(1, 10), "page_size": self.args.page_size})
+        status, _ = await client.request("GET", f"/users/?{query}", headers=self.auth)
+        return status, status == 200
+
+    async def deep_pagination(self, client: HTTPClient, state: Dict):
+        params = {"page_size": self.args.page_size, "include_total": "false"}
+        if state.get("cursor"):
+            params["cursor"] = state["cursor"]
+        status, body = await client.request("GET", f"/users/?{urlencode(params)}", headers=self.auth)
+        state["cursor"] = json.loads(body).get("next_cursor") if status == 200 else None
+        return status, status == 200
+
+    async def search(self, client: HTTPClient, state: Dict):
+        query = urlencode({"search": random.choice(SEARCH_TERMS), "page_size": self.args.page_size})
+        status, _ = await client.request("GET", f"/users/?{query}", headers=self.auth)
+        return status, status == 200
+
+    async def bulk_create(self, client: HTTPClient, state: Dict):
+        state["batch"] = state.get("batch", 0) + 1
+        prefix = f"loadtest_{self.run_id}_{state['worker']}_{state['batch']}"
+        users = [{"username": f"{prefix}_{i}", "password": "loadtest123"} for i in range(self.args.bulk_size)]
+        status, _ = await client.request("POST", "/users/bulk", {"users": users}, headers=self.auth)
+        return status, status == 200
+
+    async def profile(self, client: HTTPClient, state: Dict):
+        user_id = random.randint(1, self.args.max_user_id)
+        status, _ = await client.request("GET", f"/auth/profile/{user_id}")
+        # 随机ID可能不存在，404视为正常响应
+        return status, status in (200, 404)
+
+    async def _worker(self, worker: int, name: str, result: ScenarioResult, deadline: float,
+                      remaining: List[int]):
+        client = HTTPClient(self.host, self.port, self.args.timeout)
+        operation = self.scenarios[name]
+        state = {"worker": worker}
+        try:
+            while time.perf_counter() < deadline:
+                if remaining is not None:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+                start = time.perf_counter()
+                try:
+                    status, ok = await operation(client, state)
+                except Exception:
+                    status, ok = None, False
+                result.record(status, time.perf_counter() - start, ok)
+        finally:
+            await client.close()
+
+    async def run_scenario(self, name: str) -> ScenarioResult:
+        result = ScenarioResult(name)
+        deadline = time.perf_counter() + self.args.duration
+        # 指定 --requests 时在请求数达到后提前结束（仍受 --duration 限制）
+        remaining = [self.args.requests] if self.args.requests else None
+        start = time.perf_counter()
+        await asyncio.gather(*(self._worker(i, name, result, deadline, remaining)
+                               for i in range(self.args.concurrency)))
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    async def run(self, names: List[str]) -> Dict[str, Dict]:
+        if any(name != "health" for name in names):
+            await self.authenticate()
+        results = {}
+        for name in names:
+            print(f"运行场景 {name}: 并发 {self.args.concurrency}，最长 {self.args.duration} 秒 ...")
+            results[name] = (await self.run_scenario(name)).summary()
+        return results
+
+
+def print_report(results: Dict[str, Dict], baseline: Optional[Dict[str, Dict]] = None):
+    header = f"{'场景':<10}{'请求数':>9}{'吞吐(rps)':>12}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'错误率':>9}"
+    print(header)
+    print("-" * 70)
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.2f}"
+
+    for name, summary in results.items():
+        latency = summary["latency_ms"]
+        print(f"{name:<10}{summary['requests']:>9}{summary['throughput_rps']:>12.1f}{fmt(latency['p50']):>10}"
+              f"{fmt(latency['p95']):>10}{fmt(latency['p99']):>10}{summary['error_rate'] * 100:>8.2f}%")
+        if summary["statuses"]:
+            print(f"{'':<10}状态码: {summary['statuses']}")
+        old = (baseline or {}).get(name)
+        if old and old["throughput_rps"]:
+            change = (summary["throughput_rps"] - old["throughput_rps"]) / old["throughput_rps"] * 100
+            old_p99 = old["latency_ms"]["p99"]
+            p99_text = f"{fmt(old_p99)} -> {fmt(latency['p99'])}" if old_p99 is not None else "-"
+            print(f"{'':<10}对比基线: 吞吐 {change:+.1f}%，p99 {p99_text} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发负载测试")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="服务地址")
+    parser.add_argument("--scenarios", default="health,login,list,deep,search,profile",
+                        help="逗号分隔的场景: health,login,list,deep,search,bulk,profile")
+    parser.add_argument("--concurrency", type=int, default=16, help="虚拟用户数（并发连接数）")
+    parser.add_argument("--duration", type=float, default=10, help="每个场景的最长运行时间（秒）")
+    parser.add_argument("--requests", type=int, default=0, help="每个场景的请求总数上限（0为不限）")
+    parser.add_argument("--timeout", type=float, default=30, help="单个请求的超时（秒）")
+    parser.add_argument("--page-size", type=int, default=20, help="列表/搜索场景的每页数量")
+    parser.add_argument("--bulk-size", type=int, default=50, help="bulk场景每个请求创建的用户数")
+    parser.add_argument("--max-user-id", type=int, default=1000, help="profile场景随机用户ID的上限")
+    parser.add_argument("--username", default="admin", help="获取访问令牌使用的管理员账号")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--allow-writes", action="store_true", help="允许运行会写入数据库的bulk场景")
+    parser.add_argument("--seed", type=int, help="随机数种子，便于复现请求序列")
+    parser.add_argument("--output", help="保存JSON结果的文件路径")
+    parser.add_argument("--compare", help="与之前保存的JSON结果比较")
+    args = parser.parse_args()
+
+    test = LoadTest(args)
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in test.scenarios]
+    if unknown:
+        parser.error(f"未知场景: {', '.join(unknown)}")
+    if "bulk" in names and not args.allow_writes:
+        parser.error("bulk场景会创建用户，需要同时指定 --allow-writes")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    started_at = datetime.now().isoformat(timespec="seconds")
+    results = asyncio.run(test.run(names))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["scenarios"]
+    print()
+    print_report(results, baseline)
+
+    if args.output:
+        report = {
+            "started_at": started_at,
+            "url": args.url,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "page_size": args.page_size,
+            "scenarios": results,
+        }
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录日志写入性能测试脚本
+对比两种写法下每次登录记录日志的调用延迟与每秒写入日志数：
+- 同步写入：每条日志一次单行INSERT（原登录流程的写法）
+- 异步批量：日志进入内存队列，由后台线程合并为多行INSERT
+
+可选 --url 参数对运行中的服务测量 /auth/login 端到端延迟，
+分别在 LOGIN_LOG_CONFIG['async_enabled'] 为 False / True 时运行即可对比改造前后
+
+用法:
+    python benchmarks/bench_login_logs.py --events 5000 --threads 8
+    python benchmarks/bench_login_logs.py --events 5000 --threads 8 --backend sqlite
+    python benchmarks/bench_login_logs.py --url http://127.0.0.1:8000 --username admin --password admin123
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import LOGIN_LOG_CONFIG, STORAGE_CONFIG
+from db_pool import close_pool, get_db_connection
+from login_log_writer import LoginLogWriter, write_login_events
+from storage import BACKENDS, use_backend
+
+BENCH_REASON = "benchmark"
+
+
+def make_event():
+    return (None, datetime.now(), '127.0.0.1', 'bench_login_logs', 'failed', BENCH_REASON)
+
+
+def run_threads(threads: int, per_thread: int, record):
+    """多个线程并发调用record()，返回(总耗时, 单次调用延迟列表)"""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            record()
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return time.perf_counter() - start, latencies
+
+
+def report(name: str, elapsed: float, latencies, total: int):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{name:<12}{total / elapsed:>12.0f}{p50:>12.3f}{p99:>12.3f}")
+
+
+def cleanup():
+    connection = get_db_connection()
+    if connection:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM login_logs WHERE failure_reason = %s", (BENCH_REASON,))
+            connection.commit()
+        finally:
+            connection.close()
+
+
+def bench_database(events: int, threads: int):
+    per_thread = max(1, events // threads)
+    total = per_thread * threads
+    print(f"{'写入方式':<12}{'日志/秒':>12}{'p50(ms)':>12}{'p99(ms)':>12}")
+    print("-" * 48)
+
+    elapsed, latencies = run_threads(threads, per_thread, lambda: write_login_events([make_event()]))
+    report("同步单行", elapsed, latencies, total)
+
+    settings = {k: v for k, v in LOGIN_LOG_CONFIG.items() if k != 'async_enabled'}
+    writer = LoginLogWriter(**settings)
+    writer.start()
+    start = time.perf_counter()
+    _, latencies = run_threads(threads, per_thread, lambda: writer.submit(make_event()))
+    writer.stop()  # 计入把队列写完的时间
+    report("异步批量", time.perf_counter() - start, latencies, total)
+    print(f"\n写入器统计: {writer.stats()}")
+
+
+def bench_http(url: str, username: str, password: str, requests_count: int):
+    import requests
+
+    session = requests.Session()
+    latencies = []
+    for _ in range(requests_count):
+        start = time.perf_counter()
+        response = session.post(f"{url}/auth/login", json={"username": username, "password": password})
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+    latencies.sort()
+    print(f"/auth/login {requests_count} 次: p50={statistics.median(latencies) * 1000:.2f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登录日志写入性能测试")
+    parser.add_argument("--events", type=int, default=5000, help="写入的日志总数")
+    parser.add_argument("--threads", type=int, default=8, help="并发线程数")
+    parser.add_argument("--url", help="测量运行中服务的 /auth/login 端到端延迟")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--requests", type=int, default=200, help="--url 模式下的登录次数")
+    parser.add_argument("--backend", choices=BACKENDS, default=STORAGE_CONFIG['backend'], help="存储后端")
+    parser.add_argument("--sqlite-path", help="SQLite数据库文件（默认 STORAGE_CONFIG['sqlite_path']）")
+    args = parser.parse_args()
+    use_backend(args.backend, args.sqlite_path)
+
+    if args.url:
+        bench_http(args.url, args.username, args.password, args.requests)
+        return
+
+    try:
+        bench_database(args.events, args.threads)
+    finally:
+        cleanup()
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控指标开销测试脚本
+以ASGI方式直接调用一个只返回常量的路由（不经过网络和数据库），对比有无 MetricsMiddleware 时
+每个请求的平均耗时，差值即每个请求的记录开销；同时测量单次直方图记录的耗时
+
+不需要数据库和运行中的服务。用法:
+    python benchmarks/bench_metrics_overhead.py --requests 20000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fastapi import FastAPI
+from metrics import Histogram, MetricsMiddleware
+
+
+def build_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/users/{user_id}")
+    async def get_user(user_id: int):
+        return {"id": user_id}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app, count: int) -> float:
+    """顺序发送count个请求，返回每个请求的平均耗时（微秒）"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def scope(i):
+        path = f"/users/{i}"
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+            "root_path": "", "headers": [], "client": ("127.0.0.1", 5000), "server": ("bench", 80),
+        }
+
+    for i in range(min(count, 500)):  # 预热
+        await app(scope(i), receive, send)
+    start = time.perf_counter()
+    for i in range(count):
+        await app(scope(i), receive, send)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def bench_observe(count: int) -> float:
+    histogram = Histogram("bench_seconds", "bench", ("route",))
+    labels = ("/users/{user_id}",)
+    start = time.perf_counter()
+    for i in range(count):
+        histogram.observe(labels, (i % 1000) / 10000)
+    return (time.perf_counter() - start) / count * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="监控指标开销测试")
+    parser.add_argument("--requests", type=int, default=20000, help="每种配置发送的请求数")
+    parser.add_argument("--rounds", type=int, default=5, help="重复轮数，各取最好的一轮")
+    args = parser.parse_args()
+
+    plain, instrumented = build_app(False), build_app(True)
+    # 两种配置交替运行，减少机器负载波动对差值的影响
+    base_runs, metric_runs = [], []
+    for _ in range(args.rounds):
+        base_runs.append(asyncio.run(drive(plain, args.requests)))
+        metric_runs.append(asyncio.run(drive(instrumented, args.requests)))
+    base, with_metrics = min(base_runs), min(metric_runs)
+
+    print(f"{'配置':<20}{'每请求(µs)':>14}")
+    print("-" * 34)
+    print(f"{'无指标':<20}{base:>14.1f}")
+    print(f"{'MetricsMiddleware':<20}{with_metrics:>14.1f}")
+    print(f"记录开销: {with_metrics - base:.1f} µs/请求 ({(with_metrics - base) / base * 100:.1f}%)")
+    print(f"单次直方图记录: {bench_observe(args.requests * 10):.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
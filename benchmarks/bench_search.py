@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户搜索性能测试脚本
+在独立的 bench_users 表中生成百万级模拟用户，对比
+`LIKE '%关键词%'` 全表扫描与全文索引 + LIKE 复核两种查询的耗时，
+并校验两种查询返回的结果集完全一致；MySQL使用ngram全文索引，SQLite使用FTS5 trigram虚拟表
+
+用法:
+    python benchmarks/bench_search.py --rows 1000000
+    python benchmarks/bench_search.py --skip-load   # 复用已生成的数据
+    python benchmarks/bench_search.py --rows 1000000 --backend sqlite --sqlite-path /tmp/bench_search.db
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import STORAGE_CONFIG
+from search import FULLTEXT_CONDITION, LIKE_CONDITION, SQLITE_LIKE_CONDITION, escape_like
+from storage import BACKENDS, SQLITE, create_backend
+
+TABLE = "bench_users"
+FTS_TABLE = "ft_bench_users"
+FTS5_CONDITION = f"id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)"
+SYLLABLES = ["zhang", "wang", "li", "liu", "chen", "yang", "zhao", "huang", "zhou", "wu",
+             "xu", "sun", "ma", "zhu", "hu", "guo", "he", "lin", "luo", "gao"]
+DOMAINS = ["student.com", "school.com", "example.com", "edu.cn"]
+SEARCH_TERMS = ["zhang", "wei", "chenli", "138001", "2024", "xyz", "liu88", "edu"]
+
+
+def create_table(cursor, sqlite: bool):
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    if sqlite:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        cursor.execute(f"""
+            CREATE TABLE {TABLE} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username VARCHAR(50) NOT NULL UNIQUE COLLATE NOCASE,
+                email VARCHAR(100) COLLATE NOCASE,
+                phone VARCHAR(20),
+                created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+            )
+        """)
+        cursor.execute(f"CREATE INDEX idx_bench_email ON {TABLE} (email)")
+        cursor.execute(f"CREATE INDEX idx_bench_phone ON {TABLE} (phone)")
+        return
+    cursor.execute("SET SESSION innodb_ft_enable_stopword = OFF")
+    cursor.execute(f"""
+        CREATE TABLE {TABLE} (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50) NOT NULL UNIQUE,
+            email VARCHAR(100),
+            phone VARCHAR(20),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_email (email),
+            INDEX idx_phone (phone)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+
+
+def generate_rows(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for i in range(count):
+        name = "".join(rng.choice(SYLLABLES) for _ in range(2))
+        username = f"{name}{i}"
+        email = f"{username}@{rng.choice(DOMAINS)}" if rng.random() < 0.8 else None
+        phone = f"13{rng.randint(0, 9)}{rng.randint(0, 99999999):08d}" if rng.random() < 0.7 else None
+        yield (username, email, phone)
+
+
+def load_rows(connection, count: int, sqlite: bool, batch_size: int = 5000):
+    print(f"📥 生成 {count} 条模拟用户...")
+    start = time.perf_counter()
+    batch = []
+    with connection.cursor() as cursor:
+        for row in generate_rows(count):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                connection.begin()
+                cursor.executemany(f"INSERT INTO {TABLE} (username, email, phone) VALUES (%s, %s, %s)", batch)
+                connection.commit()
+                batch = []
+        if batch:
+            connection.begin()
+            cursor.executemany(f"INSERT INTO {TABLE} (username, email, phone) VALUES (%s, %s, %s)", batch)
+            connection.commit()
+        print(f"✅ 数据写入完成，耗时 {time.perf_counter() - start:.1f}s，开始建立全文索引...")
+        start = time.perf_counter()
+        if sqlite:
+            cursor.execute(f"""
+                CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+                    username, email, phone, content = '{TABLE}', content_rowid = 'id', tokenize = 'trigram'
+                )
+            """)
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+        else:
+            cursor.execute(f"ALTER TABLE {TABLE} ADD FULLTEXT INDEX ft_search (username, email, phone) WITH PARSER ngram")
+        print(f"✅ 全文索引建立完成，耗时 {time.perf_counter() - start:.1f}s")
+
+
+def time_query(cursor, sql: str, params, repeat: int):
+    timings = []
+    ids = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        timings.append(time.perf_counter() - start)
+        ids = {row[0] for row in rows}
+    return statistics.median(timings), ids
+
+
+def run_benchmark(connection, repeat: int, sqlite: bool):
+    condition = FTS5_CONDITION if sqlite else FULLTEXT_CONDITION
+    like_condition = SQLITE_LIKE_CONDITION if sqlite else LIKE_CONDITION
+    print(f"\n{'关键词':<10}{'匹配行数':>10}{'LIKE(ms)':>12}{'全文索引(ms)':>14}{'加速比':>8}  结果一致")
+    print("-" * 64)
+    with connection.cursor() as cursor:
+        for term in SEARCH_TERMS:
+            like_param = f"%{escape_like(term)}%"
+            like_sql = f"SELECT id FROM {TABLE} WHERE {like_condition}"
+            fulltext_sql = f"SELECT id FROM {TABLE} WHERE {condition} AND {like_condition}"
+
+            like_time, like_ids = time_query(cursor, like_sql, [like_param] * 3, repeat)
+            fulltext_time, fulltext_ids = time_query(cursor, fulltext_sql, [f'"{term}"'] + [like_param] * 3, repeat)
+
+            speedup = like_time / fulltext_time if fulltext_time else float("inf")
+            same = "✅" if like_ids == fulltext_ids else "❌"
+            print(f"{term:<10}{len(like_ids):>10}{like_time * 1000:>12.1f}{fulltext_time * 1000:>14.1f}"
+                  f"{speedup:>7.1f}x  {same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户搜索性能测试")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="模拟用户数量")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询重复次数（取中位数）")
+    parser.add_argument("--skip-load", action="store_true", help="跳过数据生成，复用已有的bench_users表")
+    parser.add_argument("--backend", choices=BACKENDS, default=STORAGE_CONFIG['backend'], help="存储后端")
+    parser.add_argument("--sqlite-path", help="SQLite数据库文件（默认 STORAGE_CONFIG['sqlite_path']）")
+    args = parser.parse_args()
+
+    sqlite = args.backend == SQLITE
+    connection = create_backend(args.backend, sqlite_path=args.sqlite_path).connect()
+    try:
+        if not args.skip_load:
+            with connection.cursor() as cursor:
+                create_table(cursor, sqlite)
+            load_rows(connection, args.rows, sqlite)
+        run_benchmark(connection, args.repeat, sqlite)
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
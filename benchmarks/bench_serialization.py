@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列表响应序列化测试脚本
+对比用户列表一页的两种响应构造方式（不访问数据库）：
+- 原方式：逐行构造 UserResponse，再由FastAPI按 response_model 校验并序列化
+- 现方式：serialization.model_response 由数据库行校验一次并直接编码为JSON字节
+
+用法:
+    python benchmarks/bench_serialization.py --page-sizes 10,100 --iterations 2000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from serialization import model_response
+from user_management import UserListResponse, UserResponse, router
+
+
+def make_rows(count: int):
+    now = datetime(2024, 9, 1, 8, 30, 0)
+    return [{"id": i, "username": f"student{i:06d}", "email": f"student{i:06d}@example.com",
+             "phone": f"138{i:08d}", "user_type": "student", "is_active": 1,
+             "created_at": now, "updated_at": now, "last_login": None} for i in range(count)]
+
+
+def page_data(rows):
+    return {"total": 100000, "total_estimated": False, "users": rows, "page": 1,
+            "page_size": len(rows), "next_cursor": None}
+
+
+def bench(func, iterations: int) -> float:
+    """返回每次调用的平均耗时（微秒）"""
+    for _ in range(min(iterations, 100)):  # 预热
+        func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表响应序列化测试")
+    parser.add_argument("--page-sizes", default="10,100", help="逗号分隔的每页行数")
+    parser.add_argument("--iterations", type=int, default=2000, help="每种方式的调用次数")
+    args = parser.parse_args()
+
+    route = next(r for r in router.routes if r.path == "/users/" and "GET" in r.methods)
+    loop = asyncio.new_event_loop()
+
+    print(f"{'每页行数':<10}{'原方式(µs)':>14}{'现方式(µs)':>14}{'加速':>8}")
+    print("-" * 46)
+    for page_size in (int(s) for s in args.page_sizes.split(",")):
+        rows = make_rows(page_size)
+
+        def previous():
+            content = UserListResponse(**dict(page_data(rows), users=[UserResponse(**u) for u in rows]))
+            encoded = loop.run_until_complete(
+                serialize_response(field=route.response_field, response_content=content))
+            return JSONResponse(encoded).body
+
+        def current():
+            return model_response(UserListResponse, page_data(rows)).body
+
+        assert previous() == current()
+        before, after = bench(previous, args.iterations), bench(current, args.iterations)
+        print(f"{page_size:<10}{before:>14.1f}{after:>14.1f}{before / after:>7.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
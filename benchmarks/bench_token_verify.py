@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户身份验证性能测试脚本
+对比几种鉴权方式的吞吐量：
+- 令牌路径：进程内校验签名访问令牌（get_current_user 依赖使用的 verify_jwt_token）
+- 数据库路径：/auth/verify?user_id= 在用户缓存未命中时的主键查询（直接调用不经过缓存的 load_user_row）
+- 用户缓存：/auth/verify?user_id= 命中用户缓存时的路径
+
+用法:
+    python benchmarks/bench_token_verify.py --iterations 2000 --user-id 1
+    python benchmarks/bench_token_verify.py --iterations 2000 --backend sqlite
+    python benchmarks/bench_token_verify.py --skip-db   # 没有数据库时只测令牌路径
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from auth import _verify_user_status, generate_jwt_token, verify_jwt_token
+from cache import load_user_row, user_cache
+from config import STORAGE_CONFIG
+from db_pool import close_pool
+from storage import BACKENDS, use_backend
+
+
+def measure(name: str, iterations: int, func):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<14}{iterations / elapsed:>14.0f}{elapsed / iterations * 1e6:>14.1f}")
+    return iterations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户身份验证性能测试")
+    parser.add_argument("--iterations", type=int, default=2000, help="数据库路径的验证次数")
+    parser.add_argument("--user-id", type=int, default=1, help="数据库路径查询的用户ID")
+    parser.add_argument("--skip-db", action="store_true", help="只测试令牌路径")
+    parser.add_argument("--backend", choices=BACKENDS, default=STORAGE_CONFIG['backend'], help="存储后端")
+    parser.add_argument("--sqlite-path", help="SQLite数据库文件（默认 STORAGE_CONFIG['sqlite_path']）")
+    args = parser.parse_args()
+    use_backend(args.backend, args.sqlite_path)
+
+    token = generate_jwt_token({'id': args.user_id, 'user_type': 'admin'})
+
+    print(f"{'验证方式':<14}{'次/秒':>14}{'单次(us)':>14}")
+    print("-" * 42)
+    token_rate = measure("令牌(进程内)", args.iterations * 50, lambda: verify_jwt_token(token))
+
+    if not args.skip_db:
+        try:
+            db_rate = measure("数据库查询", args.iterations, lambda: load_user_row(args.user_id))
+            user_cache.clear()
+            _verify_user_status(args.user_id)  # 预热缓存
+            cached_rate = measure("用户缓存", args.iterations * 50, lambda: _verify_user_status(args.user_id))
+            print(f"\n令牌验证吞吐量是数据库查询的 {token_rate / db_rate:.1f} 倍，"
+                  f"是用户缓存命中的 {token_rate / cached_rate:.2f} 倍")
+        finally:
+            close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,24 @@
 """
 项目启动脚本
 用于启动学生数据平台API服务
+
+- 开发模式（默认）：单进程，修改代码后自动重新加载
+- 生产模式（--production）：多个worker进程（默认CPU核数），不监视文件变化；
+  安装了uvloop/httptools时自动使用；向主进程发送SIGHUP时逐个替换worker（新worker就绪后
+  才停止旧worker，旧worker处理完进行中的请求再退出），SIGTERM/SIGINT时平滑停止
+
+用法:
+    python run.py
+    python run.py --production --workers 8 --db-connections 120
 """
 
+import argparse
+import importlib.util
 import sys
 import os
 
+import uvicorn
+
 # 添加src目录到Python路径
 src_path = os.path.join(os.path.dirname(__file__), 'src')
 sys.path.insert(0, src_path)
@@ -16,10 +29,12 @@ sys.path.insert(0, src_path)
 os.environ['PYTHONPATH'] = src_path
 
 try:
-    # 导入配置
-    from src.config import API_CONFIG
-    
-    # 导入主应用
+    # 导入配置：应用内的模块以顶层模块名导入config（from config import ...），
+    # 这里必须导入同一个模块对象，修改连接池大小才会对本进程中的应用生效
+    from config import API_CONFIG, DB_EXECUTOR_CONFIG, DB_POOL_CONFIG, PASSWORD_HASH_CONFIG, SERVER_CONFIG
+    from passwords import password_hasher
+
+    # 导入主应用（提前发现导入错误；连接池和线程池在应用启动时才按配置创建）
     from src.main import app
 except ImportError as e:
     print(f"❌ 导入错误: {e}")
@@ -28,26 +43,140 @@ except ImportError as e:
     print(f"📁 Python路径: {sys.path}")
     sys.exit(1)
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="启动学生数据平台API服务")
+    parser.add_argument("--production", action="store_true", help="生产模式：多worker，不自动重新加载")
+    parser.add_argument("--host", default=API_CONFIG['host'])
+    parser.add_argument("--port", type=int, default=API_CONFIG['port'])
+    parser.add_argument("--workers", type=int, default=SERVER_CONFIG['workers'], help="worker进程数（生产模式）")
+    parser.add_argument("--keep-alive", type=int, default=SERVER_CONFIG['timeout_keep_alive'],
+                        help="空闲keep-alive连接保持时间（秒）")
+    parser.add_argument("--backlog", type=int, default=SERVER_CONFIG['backlog'], help="监听socket的等待队列长度")
+    parser.add_argument("--graceful-timeout", type=int, default=SERVER_CONFIG['timeout_graceful_shutdown'],
+                        help="停止/重启worker时等待进行中请求的最长时间（秒）")
+    parser.add_argument("--db-connections", type=int, default=SERVER_CONFIG['db_connection_budget'],
+                        help="所有worker合计的主库连接数上限")
+    parser.add_argument("--hash-workers", type=int, default=PASSWORD_HASH_CONFIG['workers'],
+                        help="所有worker合计的密码哈希进程数（生产模式按worker数平均分配）")
+    parser.add_argument("--bulk-hash-workers", type=int, default=PASSWORD_HASH_CONFIG['bulk_workers'],
+                        help="所有worker合计的批量哈希进程数（生产模式按worker数平均分配）")
+    parser.add_argument("--no-access-log", action="store_true", help="关闭uvicorn访问日志（生产模式）")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers 必须大于0")
+    return args
+
+
+def fastest_available(setting: str, module: str, fallback: str) -> str:
+    """auto时选择已安装的更快实现（uvloop/httptools），否则使用uvicorn的纯Python实现"""
+    if setting != "auto":
+        return setting
+    return module if importlib.util.find_spec(module) else fallback
+
+
+def worker_pool_size(budget: int, workers: int) -> int:
+    """
+    每个worker的连接池上限
+
+    多worker时按 workers + 1 份分配：平滑重启期间同一时间最多多出一个新worker，
+    新旧worker的连接合计仍不超过预算
+    """
+    slots = workers + 1 if workers > 1 else 1
+    return max(1, budget // slots)
+
+
+def apply_pool_size(size: int):
+    """设置本进程及之后启动的worker进程的连接池大小（worker重新导入config时读取环境变量）"""
+    os.environ['SDP_DB_POOL_MAX_SIZE'] = str(size)
+    DB_POOL_CONFIG['max_size'] = size
+    DB_POOL_CONFIG['min_size'] = min(DB_POOL_CONFIG['min_size'], size)
+    DB_EXECUTOR_CONFIG['max_workers'] = size
+
+
+def worker_hash_workers(budget: int, workers: int) -> int:
+    """每个worker的哈希进程数：按worker数平均分配，至少1个；预算为0时保持0（在调用线程中计算）"""
+    if budget <= 0:
+        return 0
+    return max(1, budget // workers)
+
+
+def apply_hash_workers(workers: int, bulk_workers: int):
+    """设置本进程及之后启动的worker进程的哈希进程数（进程池在第一次计算时才创建）"""
+    os.environ['SDP_HASH_WORKERS'] = str(workers)
+    os.environ['SDP_BULK_HASH_WORKERS'] = str(bulk_workers)
+    PASSWORD_HASH_CONFIG['workers'] = password_hasher.workers = workers
+    PASSWORD_HASH_CONFIG['bulk_workers'] = password_hasher.bulk_workers = bulk_workers
+
+
+def run_production(args):
+    # worker进程重新导入config时读取，未设置签名密钥（多worker时还有吊销记录文件）时拒绝启动
+    os.environ['SDP_PRODUCTION'] = '1'
+    if not os.environ.get('SDP_TOKEN_SECRET'):
+        print("❌ 生产模式必须设置环境变量 SDP_TOKEN_SECRET（所有worker共用的访问令牌签名密钥）")
+        sys.exit(1)
+    # 没有持久化文件时吊销记录只在一个worker的内存中，登出的令牌在其他worker上仍然有效
+    if args.workers > 1 and not os.environ.get('SDP_REVOCATION_JOURNAL'):
+        print("❌ 多worker生产模式必须设置环境变量 SDP_REVOCATION_JOURNAL（所有worker共用的令牌吊销记录文件）")
+        sys.exit(1)
+
+    loop = fastest_available(SERVER_CONFIG['loop'], "uvloop", "asyncio")
+    http = fastest_available(SERVER_CONFIG['http'], "httptools", "h11")
+    print(f"⚙️  生产模式: {args.workers} 个worker, 事件循环 {loop}, HTTP解析 {http}, "
+          f"keep-alive {args.keep_alive}s, backlog {args.backlog}")
+
+    if args.db_connections:
+        size = worker_pool_size(args.db_connections, args.workers)
+        if size * (args.workers + 1 if args.workers > 1 else 1) > args.db_connections:
+            print(f"⚠️ 数据库连接预算 {args.db_connections} 少于worker数，每个worker至少使用1个连接")
+        apply_pool_size(size)
+    print(f"🔌 每个worker的数据库连接池上限: {DB_POOL_CONFIG['max_size']}")
+    # 每个worker有自己的哈希进程池，按worker数分配，避免主机上的哈希进程数随worker数成倍增加
+    apply_hash_workers(worker_hash_workers(args.hash_workers, args.workers),
+                       worker_hash_workers(args.bulk_hash_workers, args.workers))
+    print(f"🔐 每个worker的密码哈希进程数: {PASSWORD_HASH_CONFIG['workers']}（批量 {PASSWORD_HASH_CONFIG['bulk_workers']}）")
+    if args.workers > 1:
+        print(f"🔄 平滑重启: kill -HUP {os.getpid()}")
+
+    # 多worker时每个worker进程重新导入应用，必须使用导入字符串
+    uvicorn.run(
+        "src.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=args.keep_alive,
+        backlog=args.backlog,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=not args.no_access_log,
+        log_level="info"
+    )
+
+
 if __name__ == "__main__":
-    import uvicorn
-    
+    args = parse_args()
+
     print("🚀 启动学生数据平台API服务...")
-    print(f"📍 服务地址: http://{API_CONFIG['host']}:{API_CONFIG['port']}")
-    print(f"📚 API文档: http://{API_CONFIG['host']}:{API_CONFIG['port']}/docs")
+    print(f"📍 服务地址: http://{args.host}:{args.port}")
+    print(f"📚 API文档: http://{args.host}:{args.port}/docs")
     print("=" * 50)
-    
+
     # 切换到src目录运行
     original_cwd = os.getcwd()
     os.chdir(src_path)
-    
+
     try:
-        uvicorn.run(
-            "src.main:app",
-            host=API_CONFIG['host'],
-            port=API_CONFIG['port'],
-            reload=True,
-            log_level="info"
-        )
+        if args.production:
+            run_production(args)
+        else:
+            uvicorn.run(
+                "src.main:app",
+                host=args.host,
+                port=args.port,
+                reload=True,
+                log_level="info"
+            )
     finally:
         # 恢复原始工作目录
         os.chdir(original_cwd)
@@ -0,0 +1,24 @@
+-- 花名册导入任务表脚本
+-- 保存 POST /users/import 创建的任务的状态、计数和逐行错误，
+-- 多个工作进程（uvicorn --workers）共享同一张表，GET /users/import/{job_id} 可以在任意进程上查询
+
+USE user_auth_db;
+
+CREATE TABLE IF NOT EXISTS import_jobs (
+    job_id CHAR(32) PRIMARY KEY COMMENT '任务ID',
+    filename VARCHAR(255) COMMENT '原始文件名',
+    status ENUM('pending', 'running', 'completed', 'failed') NOT NULL DEFAULT 'pending' COMMENT '任务状态',
+    processed INT NOT NULL DEFAULT 0 COMMENT '已处理的行数',
+    created INT NOT NULL DEFAULT 0 COMMENT '已创建的用户数',
+    skipped INT NOT NULL DEFAULT 0 COMMENT '用户名已存在而跳过的行数',
+    failed INT NOT NULL DEFAULT 0 COMMENT '失败的行数',
+    chunks INT NOT NULL DEFAULT 0 COMMENT '已提交的块数',
+    errors MEDIUMTEXT COMMENT '逐行错误（JSON数组）',
+    errors_truncated BOOLEAN NOT NULL DEFAULT FALSE COMMENT '错误数量是否超过上限',
+    message TEXT COMMENT '失败原因',
+    created_at DATETIME NOT NULL COMMENT '创建时间',
+    finished_at DATETIME NULL COMMENT '结束时间',
+    INDEX idx_finished_at (finished_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='花名册导入任务表';
+
+DESCRIBE import_jobs;
@@ -0,0 +1,22 @@
+-- 花名册导入任务表脚本（SQLite）
+-- 对应 add_import_jobs_table.sql：保存导入任务的状态、计数和逐行错误，供所有工作进程查询
+-- 服务首次连接SQLite数据库时，表不存在会自动执行该脚本
+
+CREATE TABLE IF NOT EXISTS import_jobs (
+    job_id TEXT PRIMARY KEY,
+    filename TEXT,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+    processed INTEGER NOT NULL DEFAULT 0,
+    created INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    errors TEXT,
+    errors_truncated BOOLEAN NOT NULL DEFAULT 0,
+    message TEXT,
+    created_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_jobs_finished_at ON import_jobs (finished_at);
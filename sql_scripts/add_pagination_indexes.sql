@@ -0,0 +1,13 @@
+-- 游标分页索引脚本
+-- 为 GET /users/ 和 GET /admin/ 的 (created_at, id) 游标分页添加复合索引
+
+USE user_auth_db;
+
+-- 无筛选条件的用户列表：ORDER BY created_at DESC, id DESC
+-- 按用户类型筛选（含管理员列表 user_type = 'admin'）：WHERE user_type = ? ORDER BY created_at DESC, id DESC
+ALTER TABLE users
+ADD INDEX idx_created_at_id (created_at, id),
+ADD INDEX idx_user_type_created_at_id (user_type, created_at, id);
+
+-- 显示索引信息
+SHOW INDEX FROM users;
@@ -0,0 +1,32 @@
+-- 用户搜索全文索引脚本（SQLite）
+-- 对应 add_search_fulltext_index.sql：为 GET /users/ 的 search 参数创建FTS5全文索引
+-- trigram 分词器需要 SQLite 3.34+，按3个字符切分，检索结果与 LIKE '%关键词%' 的子串匹配一致；
+-- API 用索引筛选候选行后仍用 LIKE 复核
+-- 服务首次连接SQLite数据库时会自动尝试执行该脚本，失败时搜索使用LIKE
+
+CREATE VIRTUAL TABLE IF NOT EXISTS ft_users_search USING fts5(
+    username, email, phone,
+    content = 'users', content_rowid = 'id', tokenize = 'trigram'
+);
+
+-- 外部内容表需要用触发器与users表保持同步
+CREATE TRIGGER IF NOT EXISTS trg_users_search_insert AFTER INSERT ON users BEGIN
+    INSERT INTO ft_users_search (rowid, username, email, phone)
+    VALUES (NEW.id, NEW.username, NEW.email, NEW.phone);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_search_delete AFTER DELETE ON users BEGIN
+    INSERT INTO ft_users_search (ft_users_search, rowid, username, email, phone)
+    VALUES ('delete', OLD.id, OLD.username, OLD.email, OLD.phone);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_search_update
+AFTER UPDATE OF username, email, phone ON users BEGIN
+    INSERT INTO ft_users_search (ft_users_search, rowid, username, email, phone)
+    VALUES ('delete', OLD.id, OLD.username, OLD.email, OLD.phone);
+    INSERT INTO ft_users_search (rowid, username, email, phone)
+    VALUES (NEW.id, NEW.username, NEW.email, NEW.phone);
+END;
+
+-- 为已有数据建立索引
+INSERT INTO ft_users_search (ft_users_search) VALUES ('rebuild');
@@ -0,0 +1,17 @@
+-- 用户搜索全文索引脚本
+-- 为 GET /users/ 的 search 参数添加 ngram 全文索引（需要 MySQL 5.7.6+）
+-- 前导通配符的 LIKE '%关键词%' 无法使用 idx_username / idx_email / idx_phone，
+-- API 会先用该索引筛选候选行，再用 LIKE 复核，保持原有的子串匹配语义
+
+USE user_auth_db;
+
+-- ngram 分词会丢弃包含停用词的词元（例如 "to"、"at"），建索引前关闭停用词，
+-- 否则包含这些字母组合的关键词会漏掉结果
+SET SESSION innodb_ft_enable_stopword = OFF;
+
+-- ngram_token_size 是服务器启动参数（默认2），需与 config.py 中 SEARCH_CONFIG['ngram_token_size'] 一致
+ALTER TABLE users
+ADD FULLTEXT INDEX ft_users_search (username, email, phone) WITH PARSER ngram;
+
+-- 显示索引信息
+SHOW INDEX FROM users WHERE Key_name = 'ft_users_search';
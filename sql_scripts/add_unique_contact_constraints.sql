@@ -0,0 +1,23 @@
+-- 邮箱/手机号唯一约束脚本
+-- 为 email、phone 添加唯一约束，创建和更新用户时直接写入并由数据库报告冲突，
+-- 不再在写入前逐字段查询
+
+USE user_auth_db;
+
+-- 空字符串按未填写处理（唯一约束允许多个NULL，但不允许多个空字符串）
+UPDATE users SET email = NULL WHERE email = '';
+UPDATE users SET phone = NULL WHERE phone = '';
+
+-- 执行前先检查已有的重复数据，以下查询应返回空结果，否则需要先人工处理重复行
+SELECT email, COUNT(*) AS cnt FROM users WHERE email IS NOT NULL GROUP BY email HAVING cnt > 1;
+SELECT phone, COUNT(*) AS cnt FROM users WHERE phone IS NOT NULL GROUP BY phone HAVING cnt > 1;
+
+-- 用唯一索引替换原来的普通索引
+ALTER TABLE users
+DROP INDEX idx_email,
+DROP INDEX idx_phone,
+ADD UNIQUE INDEX uk_email (email),
+ADD UNIQUE INDEX uk_phone (phone);
+
+-- 显示索引信息
+SHOW INDEX FROM users;
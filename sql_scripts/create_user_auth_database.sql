@@ -10,22 +10,28 @@ COLLATE utf8mb4_unicode_ci;
 -- 使用数据库
 USE user_auth_db;
 
+-- ngram 全文索引不使用停用词（见 add_search_fulltext_index.sql）
+SET SESSION innodb_ft_enable_stopword = OFF;
+
 -- 创建用户表
 CREATE TABLE IF NOT EXISTS users (
     id INT AUTO_INCREMENT PRIMARY KEY COMMENT '用户ID，自增主键',
     username VARCHAR(50) NOT NULL UNIQUE COMMENT '用户名，唯一',
     password VARCHAR(255) NOT NULL COMMENT '密码（建议使用加密存储）',
-    email VARCHAR(100) COMMENT '邮箱地址，可选',
-    phone VARCHAR(20) COMMENT '手机号码，可选',
+    email VARCHAR(100) COMMENT '邮箱地址，可选，唯一',
+    phone VARCHAR(20) COMMENT '手机号码，可选，唯一',
     user_type ENUM('teacher', 'student', 'admin') NOT NULL DEFAULT 'student' COMMENT '用户类型：老师、学生、管理员',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     is_active BOOLEAN DEFAULT TRUE COMMENT '账户是否激活',
     last_login TIMESTAMP NULL COMMENT '最后登录时间',
     INDEX idx_username (username),
-    INDEX idx_email (email),
-    INDEX idx_phone (phone),
-    INDEX idx_user_type (user_type)
+    UNIQUE INDEX uk_email (email),
+    UNIQUE INDEX uk_phone (phone),
+    INDEX idx_user_type (user_type),
+    INDEX idx_created_at_id (created_at, id),
+    INDEX idx_user_type_created_at_id (user_type, created_at, id),
+    FULLTEXT INDEX ft_users_search (username, email, phone) WITH PARSER ngram
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户登录验证信息表';
 
 -- 创建登录日志表（可选，用于记录登录历史）
@@ -43,6 +49,24 @@ CREATE TABLE IF NOT EXISTS login_logs (
     INDEX idx_login_status (login_status)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户登录日志表';
 
+-- 创建花名册导入任务表（多个工作进程共享任务状态）
+CREATE TABLE IF NOT EXISTS import_jobs (
+    job_id CHAR(32) PRIMARY KEY COMMENT '任务ID',
+    filename VARCHAR(255) COMMENT '原始文件名',
+    status ENUM('pending', 'running', 'completed', 'failed') NOT NULL DEFAULT 'pending' COMMENT '任务状态',
+    processed INT NOT NULL DEFAULT 0 COMMENT '已处理的行数',
+    created INT NOT NULL DEFAULT 0 COMMENT '已创建的用户数',
+    skipped INT NOT NULL DEFAULT 0 COMMENT '用户名已存在而跳过的行数',
+    failed INT NOT NULL DEFAULT 0 COMMENT '失败的行数',
+    chunks INT NOT NULL DEFAULT 0 COMMENT '已提交的块数',
+    errors MEDIUMTEXT COMMENT '逐行错误（JSON数组）',
+    errors_truncated BOOLEAN NOT NULL DEFAULT FALSE COMMENT '错误数量是否超过上限',
+    message TEXT COMMENT '失败原因',
+    created_at DATETIME NOT NULL COMMENT '创建时间',
+    finished_at DATETIME NULL COMMENT '结束时间',
+    INDEX idx_finished_at (finished_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='花名册导入任务表';
+
 -- 插入示例数据（可选）
 INSERT INTO users (username, password, email, phone, user_type) VALUES
 ('admin', 'admin123', 'admin@example.com', '13800138000', 'admin'),
@@ -55,6 +79,7 @@ INSERT INTO users (username, password, email, phone, user_type) VALUES
 -- 显示创建的表结构
 DESCRIBE users;
 DESCRIBE login_logs;
+DESCRIBE import_jobs;
 
 -- 显示数据库信息
 SELECT DATABASE() as current_database;
@@ -0,0 +1,70 @@
+-- 用户登录验证数据库创建脚本（SQLite）
+-- 描述: 与 create_user_auth_database.sql、update_admin_fields.sql、add_pagination_indexes.sql、
+--       add_unique_contact_constraints.sql 执行后的MySQL表结构相同，供嵌入式SQLite后端使用
+-- 使用SQLite后端（SDP_STORAGE_BACKEND=sqlite）时服务首次连接会自动执行该脚本，也可手动执行:
+--   sqlite3 data/student_platform.db < sql_scripts/create_user_auth_database_sqlite.sql
+
+PRAGMA journal_mode = WAL;
+PRAGMA foreign_keys = ON;
+
+-- 创建用户表
+-- ENUM改为CHECK约束；username、email按ASCII不区分大小写比较（对应MySQL的utf8mb4_unicode_ci）
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,                -- 用户ID，自增主键
+    username VARCHAR(50) NOT NULL UNIQUE COLLATE NOCASE, -- 用户名，唯一
+    password VARCHAR(255) NOT NULL,                      -- 密码哈希
+    email VARCHAR(100) COLLATE NOCASE,                   -- 邮箱地址，可选，唯一
+    phone VARCHAR(20),                                   -- 手机号码，可选，唯一
+    real_name VARCHAR(100),                              -- 真实姓名
+    department VARCHAR(100),                             -- 部门
+    role_level VARCHAR(20) DEFAULT 'admin'
+        CHECK (role_level IN ('admin', 'super_admin')),  -- 角色级别
+    permissions TEXT,                                    -- 权限列表（逗号分隔）
+    user_type VARCHAR(10) NOT NULL DEFAULT 'student'
+        CHECK (user_type IN ('teacher', 'student', 'admin')), -- 用户类型：老师、学生、管理员
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')), -- 创建时间
+    updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime')), -- 更新时间
+    is_active BOOLEAN DEFAULT TRUE,                      -- 账户是否激活
+    last_login TIMESTAMP NULL                            -- 最后登录时间
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uk_email ON users (email);
+CREATE UNIQUE INDEX IF NOT EXISTS uk_phone ON users (phone);
+CREATE INDEX IF NOT EXISTS idx_user_type ON users (user_type);
+CREATE INDEX IF NOT EXISTS idx_created_at_id ON users (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_user_type_created_at_id ON users (user_type, created_at, id);
+
+-- 对应MySQL的 ON UPDATE CURRENT_TIMESTAMP：语句没有修改updated_at时更新为当前时间
+CREATE TRIGGER IF NOT EXISTS trg_users_updated_at
+AFTER UPDATE ON users
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE users SET updated_at = datetime('now', 'localtime') WHERE id = NEW.id;
+END;
+
+-- 创建登录日志表
+CREATE TABLE IF NOT EXISTS login_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,                -- 日志ID
+    user_id INTEGER REFERENCES users(id) ON DELETE SET NULL, -- 用户ID
+    login_time TIMESTAMP DEFAULT (datetime('now', 'localtime')), -- 登录时间
+    login_ip VARCHAR(45),                                -- 登录IP地址
+    user_agent TEXT,                                     -- 用户代理信息
+    login_status VARCHAR(10) NOT NULL
+        CHECK (login_status IN ('success', 'failed')),   -- 登录状态
+    failure_reason VARCHAR(255)                          -- 失败原因
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_id ON login_logs (user_id);
+CREATE INDEX IF NOT EXISTS idx_login_time ON login_logs (login_time);
+CREATE INDEX IF NOT EXISTS idx_login_status ON login_logs (login_status);
+
+-- 插入示例数据（密码为 update_passwords.sql 中的SHA-256哈希，首次登录时自动升级为PBKDF2）
+INSERT OR IGNORE INTO users (username, password, email, phone, user_type) VALUES
+('admin', '240be518fabd2724ddb6f04eeb1da5967448d7e831c08c8fa822809f74c720a9', 'admin@example.com', '13800138000', 'admin'),
+('teacher_zhang', 'cde383eee8ee7a4400adf7a15f716f179a2eb97646b37e089eb8d6d04e663416', 'zhang@school.com', '13800138001', 'teacher'),
+('teacher_li', 'c4ae9d6be6070858f1555488238f26cce9c97204fb9c514bfe9ff5a6899fc524', 'li@school.com', '13800138002', 'teacher'),
+('student_wang', '703b0a3d6ad75b649a28adde7d83c6251da457549263bc7ff45ec709b0a8448b', 'wang@student.com', '13800138003', 'student'),
+('student_liu', '4349edb26bb041f4ec64bf736b6320e951002403c461c5df1a4705ef837b7106', 'liu@student.com', '13800138004', 'student'),
+('student_chen', '35503823ae8e063f908d703172c3fa35a7465a4c8e03f90c9c692117b3d06467', 'chen@student.com', '13800138005', 'student');
+
+UPDATE users SET permissions = 'user_manage,system_config' WHERE user_type = 'admin' AND permissions IS NULL;
@@ -10,14 +10,34 @@ from pydantic import BaseModel, EmailStr
 from typing import List, Optional
 import pymysql
 from datetime import datetime
-import hashlib
 try:
-    from .config import DB_CONFIG
+    from .db_pool import get_db_connection
+    from .db_router import get_read_connection
+    from .db_executor import run_db
+    from .pagination import (DEFAULT_ORDER, KEYSET_ORDER_BY, InvalidCursorError, keyset_condition,
+                             split_page, fetch_total)
+    from .cache import count_cache_key, invalidate_user_caches, get_user_row
+    from .unique_constraints import duplicate_field, find_conflict
+    from .passwords import password_hasher
+    from .permissions import UnknownPermissionError, parse_permissions, permission_mask, require_permissions
+    from .repository import AdminRepository
+    from .serialization import model_response
 except ImportError:
-    from config import DB_CONFIG
+    from db_pool import get_db_connection
+    from db_router import get_read_connection
+    from db_executor import run_db
+    from pagination import (DEFAULT_ORDER, KEYSET_ORDER_BY, InvalidCursorError, keyset_condition,
+                            split_page, fetch_total)
+    from cache import count_cache_key, invalidate_user_caches, get_user_row
+    from unique_constraints import duplicate_field, find_conflict
+    from passwords import password_hasher
+    from permissions import UnknownPermissionError, parse_permissions, permission_mask, require_permissions
+    from repository import AdminRepository
+    from serialization import model_response
 
 # 创建路由器
-router = APIRouter(prefix="/admin", tags=["管理员管理"])
+router = APIRouter(prefix="/admin", tags=["管理员管理"],
+                   dependencies=[Depends(require_permissions("admin_manage"))])
 
 # 数据模型定义
 class AdminCreate(BaseModel):
@@ -59,29 +79,18 @@ class AdminResponse(BaseModel):
 
 class AdminListResponse(BaseModel):
     """管理员列表响应模型"""
-    total: int
+    total: Optional[int] = None  # include_total=false时为None
+    total_estimated: bool = False  # total是否为估算值
     admins: List[AdminResponse]
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # 下一页游标，没有更多数据时为None
 
 class AdminPasswordUpdate(BaseModel):
     """管理员密码更新模型"""
     old_password: str
     new_password: str
 
-def get_db_connection():
-    """获取数据库连接"""
-    try:
-        connection = pymysql.connect(**DB_CONFIG)
-        return connection
-    except Exception as e:
-        print(f"数据库连接失败: {e}")
-        return None
-
-def hash_password(password: str) -> str:
-    """对密码进行哈希处理"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
 def verify_admin_exists(admin_id: int) -> bool:
     """验证管理员是否存在且为管理员类型"""
     connection = get_db_connection()
@@ -90,90 +99,88 @@ def verify_admin_exists(admin_id: int) -> bool:
     
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            sql = "SELECT id FROM users WHERE id = %s AND user_type = 'admin'"
-            cursor.execute(sql, (admin_id,))
-            return cursor.fetchone() is not None
+            return AdminRepository(cursor).exists(admin_id)
     except Exception as e:
         print(f"验证管理员失败: {e}")
         return False
     finally:
         connection.close()
 
-@router.post("/", response_model=AdminResponse, summary="创建新管理员")
-async def create_admin(admin_data: AdminCreate):
-    """
-    创建新管理员
+CREATE_CONFLICT_MESSAGES = {
+    "username": "用户名已存在",
+    "email": "邮箱地址已存在",
+    "phone": "手机号码已存在",
+}
+UPDATE_CONFLICT_MESSAGES = {
+    "username": "用户名已被使用",
+    "email": "邮箱已被使用",
+    "phone": "手机号码已被使用",
+}
+
+def _check_permissions(permissions: Optional[List[str]]):
+    try:
+        permission_mask(permissions or [])
+    except UnknownPermissionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _create_admin(admin_data: AdminCreate, hashed_password: str):
+    """创建新管理员（数据库操作部分），唯一约束齐全时只执行一条INSERT"""
+    # 空字符串视为未提供，避免与唯一约束冲突
+    email = admin_data.email or None
+    phone = admin_data.phone or None
+    # TIMESTAMP列不保存微秒，去掉后响应与数据库中的值一致
+    now = datetime.now().replace(microsecond=0)
+    _check_permissions(admin_data.permissions)
+    permissions_str = ",".join(admin_data.permissions) if admin_data.permissions else ""
     
-    - **username**: 用户名（必填，唯一）
-    - **password**: 密码（必填）
-    - **email**: 邮箱地址（可选）
-    - **phone**: 手机号码（可选）
-    - **real_name**: 真实姓名（可选）
-    - **department**: 部门（可选）
-    - **role_level**: 角色级别（admin/super_admin，默认为admin）
-    - **permissions**: 权限列表（可选）
-    """
     connection = get_db_connection()
     if not connection:
         raise HTTPException(status_code=500, detail="数据库连接失败")
     
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            # 检查用户名是否已存在
-            check_sql = "SELECT id FROM users WHERE username = %s"
-            cursor.execute(check_sql, (admin_data.username,))
-            if cursor.fetchone():
-                raise HTTPException(status_code=400, detail="用户名已存在")
-            
-            # 检查邮箱是否已存在（如果提供）
-            if admin_data.email:
-                check_email_sql = "SELECT id FROM users WHERE email = %s"
-                cursor.execute(check_email_sql, (admin_data.email,))
-                if cursor.fetchone():
-                    raise HTTPException(status_code=400, detail="邮箱地址已存在")
+            conflict = find_conflict(cursor, {"username": admin_data.username, "email": email, "phone": phone})
+            if conflict:
+                raise HTTPException(status_code=400, detail=CREATE_CONFLICT_MESSAGES[conflict])
             
             # 创建管理员用户
-            hashed_password = hash_password(admin_data.password)
-            permissions_str = ",".join(admin_data.permissions) if admin_data.permissions else ""
-            
-            insert_sql = """
-                INSERT INTO users (username, password, email, phone, user_type, 
-                                 real_name, department, role_level, permissions, 
-                                 is_active, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(insert_sql, (
-                admin_data.username,
-                hashed_password,
-                admin_data.email,
-                admin_data.phone,
-                'admin',  # 固定为admin类型
-                admin_data.real_name,
-                admin_data.department,
-                admin_data.role_level,
-                permissions_str,
-                True,
-                datetime.now(),
-                datetime.now()
-            ))
-            
-            admin_id = cursor.lastrowid
-            connection.commit()
-            
-            # 返回创建的管理员信息
-            return AdminResponse(
-                id=admin_id,
-                username=admin_data.username,
-                email=admin_data.email,
-                phone=admin_data.phone,
-                real_name=admin_data.real_name,
-                department=admin_data.department,
-                role_level=admin_data.role_level,
-                permissions=admin_data.permissions,
-                is_active=True,
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            )
+            try:
+                admin_id = AdminRepository(cursor).insert({
+                    "username": admin_data.username,
+                    "password": hashed_password,
+                    "email": email,
+                    "phone": phone,
+                    "user_type": 'admin',  # 固定为admin类型
+                    "real_name": admin_data.real_name,
+                    "department": admin_data.department,
+                    "role_level": admin_data.role_level,
+                    "permissions": permissions_str,
+                    "is_active": True,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+            except pymysql.err.IntegrityError as e:
+                field = duplicate_field(e)
+                if field:
+                    raise HTTPException(status_code=400, detail=CREATE_CONFLICT_MESSAGES[field])
+                raise
+        
+        invalidate_user_caches()
+        
+        # 返回创建的管理员信息
+        return AdminResponse(
+            id=admin_id,
+            username=admin_data.username,
+            email=email,
+            phone=phone,
+            real_name=admin_data.real_name,
+            department=admin_data.department,
+            role_level=admin_data.role_level,
+            permissions=admin_data.permissions,
+            is_active=True,
+            created_at=now,
+            updated_at=now
+        )
             
     except HTTPException:
         raise
@@ -183,24 +190,30 @@ async def create_admin(admin_data: AdminCreate):
     finally:
         connection.close()
 
-@router.get("/", response_model=AdminListResponse, summary="获取管理员列表")
-async def get_admins(
-    page: int = Query(1, ge=1, description="页码"),
-    page_size: int = Query(10, ge=1, le=100, description="每页数量"),
-    role_level: Optional[str] = Query(None, description="角色级别过滤"),
-    department: Optional[str] = Query(None, description="部门过滤"),
-    is_active: Optional[bool] = Query(None, description="活跃状态过滤")
-):
+@router.post("/", response_model=AdminResponse, summary="创建新管理员")
+async def create_admin(admin_data: AdminCreate):
     """
-    获取管理员列表，支持分页和过滤
+    创建新管理员
     
-    - **page**: 页码（默认1）
-    - **page_size**: 每页数量（默认10，最大100）
-    - **role_level**: 角色级别过滤
-    - **department**: 部门过滤
-    - **is_active**: 活跃状态过滤
+    - **username**: 用户名（必填，唯一）
+    - **password**: 密码（必填）
+    - **email**: 邮箱地址（可选）
+    - **phone**: 手机号码（可选）
+    - **real_name**: 真实姓名（可选）
+    - **department**: 部门（可选）
+    - **role_level**: 角色级别（admin/super_admin，默认为admin）
+    - **permissions**: 权限列表（可选）
     """
-    connection = get_db_connection()
+    # 权限无效时不必计算哈希；慢哈希在进程池中计算，不占用数据库线程和连接
+    _check_permissions(admin_data.permissions)
+    hashed_password = await password_hasher.hash_async(admin_data.password)
+    return await run_db(_create_admin, admin_data, hashed_password)
+
+def _get_admins(page: int, page_size: int, role_level: Optional[str],
+                department: Optional[str], is_active: Optional[bool], page_cursor: Optional[str],
+                include_total: bool = True, estimate_total: bool = False, order: str = DEFAULT_ORDER):
+    """获取管理员列表，支持分页和过滤（数据库操作部分）"""
+    connection = get_read_connection()
     if not connection:
         raise HTTPException(status_code=500, detail="数据库连接失败")
     
@@ -224,56 +237,92 @@ async def get_admins(
             
             where_clause = " AND ".join(where_conditions)
             
-            # 获取总数
-            count_sql = f"SELECT COUNT(*) as total FROM users WHERE {where_clause}"
-            cursor.execute(count_sql, params)
-            total = cursor.fetchone()['total']
-            
-            # 获取分页数据
-            offset = (page - 1) * page_size
-            select_sql = f"""
-                SELECT id, username, email, phone, real_name, department, 
-                       role_level, permissions, is_active, created_at, 
-                       updated_at, last_login
-                FROM users 
-                WHERE {where_clause}
-                ORDER BY created_at DESC
-                LIMIT %s OFFSET %s
-            """
-            cursor.execute(select_sql, params + [page_size, offset])
-            admins = cursor.fetchall()
-            
-            # 处理权限字段
-            admin_list = []
-            for admin in admins:
-                permissions = admin['permissions'].split(',') if admin['permissions'] else []
-                admin_list.append(AdminResponse(
-                    id=admin['id'],
-                    username=admin['username'],
-                    email=admin['email'],
-                    phone=admin['phone'],
-                    real_name=admin['real_name'],
-                    department=admin['department'],
-                    role_level=admin['role_level'],
-                    permissions=permissions,
-                    is_active=admin['is_active'],
-                    created_at=admin['created_at'],
-                    updated_at=admin['updated_at'],
-                    last_login=admin['last_login']
-                ))
-            
-            return AdminListResponse(
-                total=total,
-                admins=admin_list,
-                page=page,
-                page_size=page_size
-            )
-            
+            # 获取总数（优先使用缓存）
+            cache_key = count_cache_key("admins", role_level=role_level, department=department,
+                                        is_active=is_active)
+            repository = AdminRepository(cursor)
+            total, total_estimated = fetch_total(repository, cache_key, f" WHERE {where_clause}", params,
+                                                 include_total, estimate_total)
+            
+            # 获取分页数据：提供游标时从游标位置继续，否则按页码偏移
+            if page_cursor:
+                keyset_sql, keyset_params = keyset_condition(page_cursor, order)
+                page_where = f"{where_clause} AND {keyset_sql}"
+                page_params = params + keyset_params + [page_size + 1]
+                limit_clause = "LIMIT %s"
+            else:
+                page_where = where_clause
+                page_params = params + [page_size + 1, (page - 1) * page_size]
+                limit_clause = "LIMIT %s OFFSET %s"
+            
+            rows = repository.list_page(f" WHERE {page_where}", page_params, limit_clause, KEYSET_ORDER_BY[order])
+            admins, next_cursor = split_page(rows, page_size, order)
+            
+            # 数据库行直接按响应模型校验一次并编码为JSON
+            return model_response(AdminListResponse, {
+                "total": total,
+                "total_estimated": total_estimated,
+                "admins": [_admin_fields(admin) for admin in admins],
+                "page": page,
+                "page_size": page_size,
+                "next_cursor": next_cursor,
+            })
+            
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取管理员列表失败: {str(e)}")
     finally:
         connection.close()
 
+@router.get("/", response_model=AdminListResponse, summary="获取管理员列表")
+async def get_admins(
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(10, ge=1, le=100, description="每页数量"),
+    role_level: Optional[str] = Query(None, description="角色级别过滤"),
+    department: Optional[str] = Query(None, description="部门过滤"),
+    is_active: Optional[bool] = Query(None, description="活跃状态过滤"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor），提供时忽略page"),
+    include_total: bool = Query(True, description="是否返回总数"),
+    estimate_total: bool = Query(False, description="总数缓存未命中时是否接受估算值"),
+    order: str = Query(DEFAULT_ORDER, pattern="^(asc|desc)$", description="按创建时间排序的方向")
+):
+    """
+    获取管理员列表，支持分页和过滤
+    
+    - **page**: 页码（默认1）
+    - **page_size**: 每页数量（默认10，最大100）
+    - **role_level**: 角色级别过滤
+    - **department**: 部门过滤
+    - **is_active**: 活跃状态过滤
+    - **cursor**: 分页游标，深翻页时比page更快
+    - **include_total**: 为false时不计算总数（total返回null）
+    - **estimate_total**: 为true时允许返回估算的总数
+    - **order**: desc（默认，最新创建的在前）或 asc；游标只能用于签发它时的排序方向
+    """
+    return await run_db(_get_admins, page, page_size, role_level, department, is_active, cursor,
+                        include_total, estimate_total, order)
+
+def _admin_fields(admin: dict) -> dict:
+    """由users表的一行得到管理员响应的字段（权限字符串按值缓存解析结果）"""
+    return dict(admin, permissions=list(parse_permissions(admin['permissions'])[0]))
+
+def _admin_response(admin: dict) -> AdminResponse:
+    """由users表的一行构造管理员响应"""
+    return AdminResponse.model_validate(_admin_fields(admin))
+
+def _get_admin(admin_id: int):
+    """获取特定管理员的详细信息（数据库操作部分，优先读取用户缓存）"""
+    try:
+        admin = get_user_row(admin_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取管理员信息失败: {str(e)}")
+    
+    if not admin or admin['user_type'] != 'admin':
+        raise HTTPException(status_code=404, detail="管理员不存在")
+    
+    return model_response(AdminResponse, _admin_fields(admin))
+
 @router.get("/{admin_id}", response_model=AdminResponse, summary="获取特定管理员信息")
 async def get_admin(admin_id: int):
     """
@@ -281,46 +330,80 @@ async def get_admin(admin_id: int):
     
     - **admin_id**: 管理员ID
     """
+    return await run_db(_get_admin, admin_id)
+
+def _update_admin(admin_id: int, admin_data: AdminUpdate):
+    """
+    更新管理员信息（数据库操作部分）
+    
+    读取当前行、更新各一条语句（约束不全时多一条冲突检查），
+    响应由读取的行合并更新的值构造
+    """
+    # 构建更新字段
+    changes = {}
+    if admin_data.username is not None:
+        changes["username"] = admin_data.username
+    if admin_data.email is not None:
+        changes["email"] = admin_data.email or None
+    if admin_data.phone is not None:
+        changes["phone"] = admin_data.phone or None
+    if admin_data.real_name is not None:
+        changes["real_name"] = admin_data.real_name
+    if admin_data.department is not None:
+        changes["department"] = admin_data.department
+    if admin_data.role_level is not None:
+        changes["role_level"] = admin_data.role_level
+    if admin_data.permissions is not None:
+        try:
+            permission_mask(admin_data.permissions)
+        except UnknownPermissionError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        changes["permissions"] = ",".join(admin_data.permissions)
+    if admin_data.is_active is not None:
+        changes["is_active"] = admin_data.is_active
+    
     connection = get_db_connection()
     if not connection:
         raise HTTPException(status_code=500, detail="数据库连接失败")
     
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            sql = """
-                SELECT id, username, email, phone, real_name, department, 
-                       role_level, permissions, is_active, created_at, 
-                       updated_at, last_login
-                FROM users 
-                WHERE id = %s AND user_type = 'admin'
-            """
-            cursor.execute(sql, (admin_id,))
-            admin = cursor.fetchone()
-            
+            # 验证管理员是否存在，同时取得构造响应所需的其他字段
+            repository = AdminRepository(cursor)
+            admin = repository.get(admin_id)
             if not admin:
                 raise HTTPException(status_code=404, detail="管理员不存在")
             
-            permissions = admin['permissions'].split(',') if admin['permissions'] else []
+            if not changes:
+                raise HTTPException(status_code=400, detail="没有提供要更新的字段")
+            
+            conflict = find_conflict(cursor, changes, exclude_id=admin_id)
+            if conflict:
+                raise HTTPException(status_code=400, detail=UPDATE_CONFLICT_MESSAGES[conflict])
+            
+            changes["updated_at"] = datetime.now().replace(microsecond=0)
             
-            return AdminResponse(
-                id=admin['id'],
-                username=admin['username'],
-                email=admin['email'],
-                phone=admin['phone'],
-                real_name=admin['real_name'],
-                department=admin['department'],
-                role_level=admin['role_level'],
-                permissions=permissions,
-                is_active=admin['is_active'],
-                created_at=admin['created_at'],
-                updated_at=admin['updated_at'],
-                last_login=admin['last_login']
-            )
+            # 执行更新
+            try:
+                repository.update_fields(admin_id, changes)
+            except pymysql.err.IntegrityError as e:
+                field = duplicate_field(e)
+                if field:
+                    raise HTTPException(status_code=400, detail=UPDATE_CONFLICT_MESSAGES[field])
+                raise
+        
+        # 同时清除该管理员的权限掩码缓存，新权限在本worker立即生效
+        invalidate_user_caches(admin_id)
+        
+        # 返回更新后的信息
+        admin.update(changes)
+        return _admin_response(admin)
             
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取管理员信息失败: {str(e)}")
+        connection.rollback()
+        raise HTTPException(status_code=500, detail=f"更新管理员失败: {str(e)}")
     finally:
         connection.close()
 
@@ -332,152 +415,66 @@ async def update_admin(admin_id: int, admin_data: AdminUpdate):
     - **admin_id**: 管理员ID
     - **admin_data**: 更新的管理员信息
     """
-    # 验证管理员是否存在
-    if not verify_admin_exists(admin_id):
-        raise HTTPException(status_code=404, detail="管理员不存在")
-    
+    return await run_db(_update_admin, admin_id, admin_data)
+
+def _get_admin_password(admin_id: int) -> str:
+    """读取管理员当前的密码哈希（数据库操作部分），读取后立即归还连接"""
     connection = get_db_connection()
     if not connection:
         raise HTTPException(status_code=500, detail="数据库连接失败")
     
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            # 构建更新字段
-            update_fields = []
-            params = []
-            
-            if admin_data.username is not None:
-                # 检查用户名是否已被其他用户使用
-                check_sql = "SELECT id FROM users WHERE username = %s AND id != %s"
-                cursor.execute(check_sql, (admin_data.username, admin_id))
-                if cursor.fetchone():
-                    raise HTTPException(status_code=400, detail="用户名已被使用")
-                update_fields.append("username = %s")
-                params.append(admin_data.username)
-            
-            if admin_data.email is not None:
-                # 检查邮箱是否已被其他用户使用
-                check_sql = "SELECT id FROM users WHERE email = %s AND id != %s"
-                cursor.execute(check_sql, (admin_data.email, admin_id))
-                if cursor.fetchone():
-                    raise HTTPException(status_code=400, detail="邮箱已被使用")
-                update_fields.append("email = %s")
-                params.append(admin_data.email)
-            
-            if admin_data.phone is not None:
-                update_fields.append("phone = %s")
-                params.append(admin_data.phone)
-            
-            if admin_data.real_name is not None:
-                update_fields.append("real_name = %s")
-                params.append(admin_data.real_name)
-            
-            if admin_data.department is not None:
-                update_fields.append("department = %s")
-                params.append(admin_data.department)
-            
-            if admin_data.role_level is not None:
-                update_fields.append("role_level = %s")
-                params.append(admin_data.role_level)
-            
-            if admin_data.permissions is not None:
-                permissions_str = ",".join(admin_data.permissions)
-                update_fields.append("permissions = %s")
-                params.append(permissions_str)
-            
-            if admin_data.is_active is not None:
-                update_fields.append("is_active = %s")
-                params.append(admin_data.is_active)
-            
-            if not update_fields:
-                raise HTTPException(status_code=400, detail="没有提供要更新的字段")
-            
-            update_fields.append("updated_at = %s")
-            params.append(datetime.now())
-            params.append(admin_id)
-            
-            # 执行更新
-            update_sql = f"""
-                UPDATE users 
-                SET {', '.join(update_fields)}
-                WHERE id = %s AND user_type = 'admin'
-            """
-            cursor.execute(update_sql, params)
-            
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="管理员不存在或更新失败")
-            
-            connection.commit()
-            
-            # 返回更新后的信息
-            return await get_admin(admin_id)
-            
-    except HTTPException:
-        raise
+            admin = AdminRepository(cursor).get_password(admin_id)
     except Exception as e:
-        connection.rollback()
-        raise HTTPException(status_code=500, detail=f"更新管理员失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"更新密码失败: {str(e)}")
     finally:
         connection.close()
-
-@router.put("/{admin_id}/password", summary="更新管理员密码")
-async def update_admin_password(admin_id: int, password_data: AdminPasswordUpdate):
-    """
-    更新管理员密码
     
-    - **admin_id**: 管理员ID
-    - **password_data**: 密码更新数据
-    """
-    # 验证管理员是否存在
-    if not verify_admin_exists(admin_id):
+    if not admin:
         raise HTTPException(status_code=404, detail="管理员不存在")
-    
+    return admin['password']
+
+def _replace_admin_password(admin_id: int, old_hash: str, new_hash: str):
+    """写入新密码哈希（数据库操作部分），只有密码在验证之后没有被修改时才更新"""
     connection = get_db_connection()
     if not connection:
         raise HTTPException(status_code=500, detail="数据库连接失败")
     
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            # 验证旧密码
-            sql = "SELECT password FROM users WHERE id = %s AND user_type = 'admin'"
-            cursor.execute(sql, (admin_id,))
-            admin = cursor.fetchone()
-            
-            if not admin:
-                raise HTTPException(status_code=404, detail="管理员不存在")
-            
-            old_hashed_password = hash_password(password_data.old_password)
-            if old_hashed_password != admin['password']:
-                raise HTTPException(status_code=400, detail="旧密码不正确")
-            
-            # 更新密码
-            new_hashed_password = hash_password(password_data.new_password)
-            update_sql = """
-                UPDATE users 
-                SET password = %s, updated_at = %s
-                WHERE id = %s AND user_type = 'admin'
-            """
-            cursor.execute(update_sql, (new_hashed_password, datetime.now(), admin_id))
-            
-            connection.commit()
-            
-            return {"message": "密码更新成功"}
-            
-    except HTTPException:
-        raise
+            updated = AdminRepository(cursor).replace_password(admin_id, old_hash, new_hash)
+        connection.commit()
     except Exception as e:
         connection.rollback()
         raise HTTPException(status_code=500, detail=f"更新密码失败: {str(e)}")
     finally:
         connection.close()
+    
+    if not updated:
+        raise HTTPException(status_code=409, detail="密码已被修改，请重试")
+    invalidate_user_caches(admin_id)
+    return {"message": "密码更新成功"}
 
-@router.delete("/{admin_id}", summary="删除管理员")
-async def delete_admin(admin_id: int):
+@router.put("/{admin_id}/password", summary="更新管理员密码")
+async def update_admin_password(admin_id: int, password_data: AdminPasswordUpdate):
     """
-    删除管理员（软删除）
+    更新管理员密码
     
     - **admin_id**: 管理员ID
+    - **password_data**: 密码更新数据
+    
+    验证旧密码和计算新哈希在进程池中进行，期间不占用数据库连接；
+    最后的UPDATE以读取到的旧哈希为条件，并发修改时返回409
     """
+    stored = await run_db(_get_admin_password, admin_id)
+    if not await password_hasher.verify_async(password_data.old_password, stored):
+        raise HTTPException(status_code=400, detail="旧密码不正确")
+    new_hash = await password_hasher.hash_async(password_data.new_password)
+    return await run_db(_replace_admin_password, admin_id, stored, new_hash)
+
+def _delete_admin(admin_id: int):
+    """删除管理员（软删除）（数据库操作部分）"""
     # 验证管理员是否存在
     if not verify_admin_exists(admin_id):
         raise HTTPException(status_code=404, detail="管理员不存在")
@@ -489,17 +486,11 @@ async def delete_admin(admin_id: int):
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
             # 软删除：将is_active设置为False
-            sql = """
-                UPDATE users 
-                SET is_active = FALSE, updated_at = %s
-                WHERE id = %s AND user_type = 'admin'
-            """
-            cursor.execute(sql, (datetime.now(), admin_id))
-            
-            if cursor.rowcount == 0:
+            if AdminRepository(cursor).set_active(admin_id, False) == 0:
                 raise HTTPException(status_code=404, detail="管理员不存在或删除失败")
             
             connection.commit()
+            invalidate_user_caches(admin_id)
             
             return {"message": "管理员删除成功"}
             
@@ -511,13 +502,17 @@ async def delete_admin(admin_id: int):
     finally:
         connection.close()
 
-@router.post("/{admin_id}/restore", summary="恢复管理员")
-async def restore_admin(admin_id: int):
+@router.delete("/{admin_id}", summary="删除管理员")
+async def delete_admin(admin_id: int):
     """
-    恢复被删除的管理员
+    删除管理员（软删除）
     
     - **admin_id**: 管理员ID
     """
+    return await run_db(_delete_admin, admin_id)
+
+def _restore_admin(admin_id: int):
+    """恢复被删除的管理员（数据库操作部分）"""
     connection = get_db_connection()
     if not connection:
         raise HTTPException(status_code=500, detail="数据库连接失败")
@@ -525,23 +520,16 @@ async def restore_admin(admin_id: int):
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
             # 检查管理员是否存在（包括已删除的）
-            sql = "SELECT id FROM users WHERE id = %s AND user_type = 'admin'"
-            cursor.execute(sql, (admin_id,))
-            if not cursor.fetchone():
+            repository = AdminRepository(cursor)
+            if not repository.exists(admin_id):
                 raise HTTPException(status_code=404, detail="管理员不存在")
             
             # 恢复管理员
-            restore_sql = """
-                UPDATE users 
-                SET is_active = TRUE, updated_at = %s
-                WHERE id = %s AND user_type = 'admin'
-            """
-            cursor.execute(restore_sql, (datetime.now(), admin_id))
-            
-            if cursor.rowcount == 0:
+            if repository.set_active(admin_id, True) == 0:
                 raise HTTPException(status_code=404, detail="管理员不存在或恢复失败")
             
             connection.commit()
+            invalidate_user_caches(admin_id)
             
             return {"message": "管理员恢复成功"}
             
@@ -552,3 +540,12 @@ async def restore_admin(admin_id: int):
         raise HTTPException(status_code=500, detail=f"恢复管理员失败: {str(e)}")
     finally:
         connection.close()
+
+@router.post("/{admin_id}/restore", summary="恢复管理员")
+async def restore_admin(admin_id: int):
+    """
+    恢复被删除的管理员
+    
+    - **admin_id**: 管理员ID
+    """
+    return await run_db(_restore_admin, admin_id)
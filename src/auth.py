@@ -5,17 +5,39 @@
 包含用户登录验证和相关认证功能
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 from typing import Dict, Optional
 import pymysql
+import base64
 import hashlib
+import hmac
+import json
 import os
+import secrets
+import time
 from datetime import datetime
 try:
-    from .config import DB_CONFIG
+    from .config import SECURITY_CONFIG
+    from .db_pool import get_db_connection
+    from .db_executor import run_db
+    from .login_log_writer import record_login
+    from .token_revocation import is_token_revoked, revoke_token
+    from .cache import get_user_row, invalidate_user_row
+    from .login_throttle import check_login_allowed, client_ip, record_login_result
+    from .passwords import HashingBusyError, dummy_hash, needs_rehash, password_hasher
+    from .repository import UserRepository
 except ImportError:
-    from config import DB_CONFIG
+    from config import SECURITY_CONFIG
+    from db_pool import get_db_connection
+    from db_executor import run_db
+    from login_log_writer import record_login
+    from token_revocation import is_token_revoked, revoke_token
+    from cache import get_user_row, invalidate_user_row
+    from login_throttle import check_login_allowed, client_ip, record_login_result
+    from passwords import HashingBusyError, dummy_hash, needs_rehash, password_hasher
+    from repository import UserRepository
 
 # 创建路由器
 router = APIRouter(prefix="/auth", tags=["认证"])
@@ -32,7 +54,8 @@ class LoginResponse(BaseModel):
     message: str
     user_type: Optional[str] = None
     user_id: Optional[int] = None
-    token: Optional[str] = None  # 为未来JWT实现预留
+    token: Optional[str] = None  # 访问令牌，请求时放在 Authorization: Bearer 头中
+    expires_in: Optional[int] = None  # 令牌有效期（秒）
 
 class LogoutRequest(BaseModel):
     """登出请求模型"""
@@ -44,77 +67,69 @@ class LogoutResponse(BaseModel):
     success: bool
     message: str
 
-def get_db_connection():
-    """获取数据库连接"""
+def _fetch_login_user(username: str) -> Optional[Dict]:
+    """查询登录用户（数据库操作部分）"""
+    connection = get_db_connection()
+    if not connection:
+        raise RuntimeError("数据库连接失败")
+    
     try:
-        connection = pymysql.connect(**DB_CONFIG)
-        return connection
-    except Exception as e:
-        print(f"数据库连接失败: {e}")
-        return None
-
-def hash_password(password: str) -> str:
-    """对密码进行哈希处理"""
-    return hashlib.sha256(password.encode()).hexdigest()
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            return UserRepository(cursor).get_login_user(username)
+    finally:
+        connection.close()
 
-def verify_user_credentials(username: str, password: str) -> Optional[Dict]:
-    """验证用户凭据"""
+def _complete_login(user_id: int, old_hash: str, new_hash: Optional[str]):
+    """更新最后登录时间并记录日志；new_hash不为空时同时把密码哈希升级为当前算法（数据库操作部分）"""
     connection = get_db_connection()
     if not connection:
-        return None
+        raise RuntimeError("数据库连接失败")
     
     try:
-        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            # 查询用户信息
-            sql = """
-                SELECT id, username, password, user_type, is_active 
-                FROM users 
-                WHERE username = %s AND is_active = TRUE
-            """
-            cursor.execute(sql, (username,))
-            user = cursor.fetchone()
-            
-            if not user:
-                return None
-            
-            # 验证密码
-            hashed_password = hash_password(password)
-            if hashed_password == user['password']:
-                # 更新最后登录时间
-                update_sql = "UPDATE users SET last_login = %s WHERE id = %s"
-                cursor.execute(update_sql, (datetime.now(), user['id']))
-                
-                # 记录登录日志
-                log_sql = """
-                    INSERT INTO login_logs (user_id, login_ip, user_agent, login_status) 
-                    VALUES (%s, %s, %s, %s)
-                """
-                cursor.execute(log_sql, (user['id'], '127.0.0.1', 'API Client', 'success'))
-                
-                return {
-                    'id': user['id'],
-                    'username': user['username'],
-                    'user_type': user['user_type']
-                }
-            
-            # 记录失败的登录尝试
-            if user:
-                log_sql = """
-                    INSERT INTO login_logs (user_id, login_ip, user_agent, login_status, failure_reason) 
-                    VALUES (%s, %s, %s, %s, %s)
-                """
-                cursor.execute(log_sql, (user['id'], '127.0.0.1', 'API Client', 'failed', '密码错误'))
-            
-            return None
-            
-    except Exception as e:
-        print(f"验证用户凭据时出错: {e}")
-        return None
+        with connection.cursor() as cursor:
+            UserRepository(cursor).record_login(user_id, old_hash, new_hash)
+        # 只改了最后登录时间和密码哈希，总数和权限缓存不受影响
+        invalidate_user_row(user_id)
+        
+        # 记录登录日志（异步批量写入）
+        record_login(user_id, 'success')
     finally:
         connection.close()
 
+async def verify_user_credentials(username: str, password: str) -> Optional[Dict]:
+    """
+    验证用户凭据
+    
+    查询和更新在数据库线程池中执行，密码验证在哈希进程池中执行，
+    验证期间不占用数据库连接；旧格式的哈希在登录成功后升级
+
+    用户不存在或密码错误时返回None；数据库故障等其他错误直接抛出，由调用方区分，不计为登录失败
+    """
+    user = await run_db(_fetch_login_user, username)
+    if not user:
+        # 用户不存在或未激活时同样验证一次，登录耗时不暴露用户名是否存在
+        await password_hasher.verify_async(password, dummy_hash())
+        return None
+    
+    # 验证密码
+    if not await password_hasher.verify_async(password, user['password']):
+        # 记录失败的登录尝试
+        await run_db(record_login, user['id'], 'failed', '密码错误')
+        return None
+    
+    new_hash = None
+    if needs_rehash(user['password']):
+        new_hash = await password_hasher.hash_async(password)
+    await run_db(_complete_login, user['id'], user['password'], new_hash)
+    
+    return {
+        'id': user['id'],
+        'username': user['username'],
+        'user_type': user['user_type']
+    }
+
 @router.post("/login", response_model=LoginResponse, summary="用户登录")
-async def login(login_data: LoginRequest) -> LoginResponse:
+async def login(login_data: LoginRequest, request: Request) -> LoginResponse:
     """
     用户登录验证API
     
@@ -127,19 +142,45 @@ async def login(login_data: LoginRequest) -> LoginResponse:
     - message: 响应消息 (字符串)
     - user_type: 用户类型 (可选)
     - user_id: 用户ID (可选)
-    - token: 认证令牌 (可选，为未来JWT实现预留)
+    - token: 访问令牌 (登录成功时返回)
+    - expires_in: 令牌有效期，单位秒 (登录成功时返回)
+    
+    同一用户名或IP短时间内失败次数过多时返回429（带Retry-After头），不访问数据库
     """
+    ip = client_ip(request)
+    throttled = check_login_allowed(login_data.username, ip)
+    if throttled:
+        scope, retry_after = throttled
+        seconds = int(retry_after) + 1
+        target = "该IP" if scope == "ip" else "该账户"
+        raise HTTPException(
+            status_code=429,
+            detail=f"{target}登录失败次数过多，请在 {seconds} 秒后重试",
+            headers={"Retry-After": str(seconds)}
+        )
+    
+    # 验证用户凭据（哈希任务排满时抛出HashingBusyError，由全局处理器返回503）
+    try:
+        user_info = await verify_user_credentials(login_data.username, login_data.password)
+    except HashingBusyError:
+        raise
+    except Exception as e:
+        # 数据库故障、连接池耗尽等不是凭据错误，不计入限流，避免故障期间的重试锁定正常用户和整个IP
+        print(f"验证用户凭据时出错: {e}")
+        return LoginResponse(
+            success=False,
+            message="服务器内部错误，请稍后重试"
+        )
+    record_login_result(login_data.username, ip, user_info is not None)
     try:
-        # 验证用户凭据
-        user_info = verify_user_credentials(login_data.username, login_data.password)
-        
         if user_info:
             return LoginResponse(
                 success=True,
                 message="登录成功",
                 user_type=user_info['user_type'],
                 user_id=user_info['id'],
-                token=None  # 未来可返回JWT token
+                token=generate_jwt_token(user_info),
+                expires_in=SECURITY_CONFIG['session_timeout']
             )
         else:
             return LoginResponse(
@@ -168,8 +209,11 @@ async def logout(logout_data: LogoutRequest) -> LogoutResponse:
     - message: 响应消息 (字符串)
     """
     try:
-        # 这里可以添加token验证逻辑
-        # 目前只是简单的响应，未来可以实现token失效等逻辑
+        # 吊销令牌，令牌过期前再使用都会被拒绝
+        if logout_data.token:
+            claims = verify_jwt_token(logout_data.token)
+            if claims:
+                revoke_token(claims['jti'], claims['exp'])
         
         return LogoutResponse(
             success=True,
@@ -183,6 +227,26 @@ async def logout(logout_data: LogoutRequest) -> LogoutResponse:
             message="登出失败，请稍后重试"
         )
 
+def _verify_user_status(user_id: int):
+    """验证用户状态（数据库操作部分，优先读取用户缓存）"""
+    try:
+        user = get_user_row(user_id)
+    except Exception as e:
+        print(f"验证用户状态时出错: {e}")
+        raise HTTPException(status_code=500, detail="验证用户状态失败")
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="用户不存在")
+    
+    return {
+        "user_id": user['id'],
+        "username": user['username'],
+        "user_type": user['user_type'],
+        "is_active": user['is_active'],
+        "last_login": user['last_login'],
+        "status": "active" if user['is_active'] else "inactive"
+    }
+
 @router.get("/verify", summary="验证用户状态")
 async def verify_user_status(user_id: int):
     """
@@ -194,39 +258,30 @@ async def verify_user_status(user_id: int):
     返回:
     - 用户状态信息
     """
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="数据库连接失败")
-    
+    return await run_db(_verify_user_status, user_id)
+
+def _get_user_profile(user_id: int):
+    """获取用户资料（数据库操作部分，优先读取用户缓存）"""
     try:
-        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            sql = """
-                SELECT id, username, user_type, is_active, last_login
-                FROM users 
-                WHERE id = %s
-            """
-            cursor.execute(sql, (user_id,))
-            user = cursor.fetchone()
-            
-            if not user:
-                raise HTTPException(status_code=404, detail="用户不存在")
-            
-            return {
-                "user_id": user['id'],
-                "username": user['username'],
-                "user_type": user['user_type'],
-                "is_active": user['is_active'],
-                "last_login": user['last_login'],
-                "status": "active" if user['is_active'] else "inactive"
-            }
-            
-    except HTTPException:
-        raise
+        user = get_user_row(user_id)
     except Exception as e:
-        print(f"验证用户状态时出错: {e}")
-        raise HTTPException(status_code=500, detail="验证用户状态失败")
-    finally:
-        connection.close()
+        print(f"获取用户资料时出错: {e}")
+        raise HTTPException(status_code=500, detail="获取用户资料失败")
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="用户不存在")
+    
+    return {
+        "id": user['id'],
+        "username": user['username'],
+        "email": user['email'],
+        "phone": user['phone'],
+        "user_type": user['user_type'],
+        "is_active": user['is_active'],
+        "created_at": user['created_at'],
+        "updated_at": user['updated_at'],
+        "last_login": user['last_login']
+    }
 
 @router.get("/profile/{user_id}", summary="获取用户资料")
 async def get_user_profile(user_id: int):
@@ -239,56 +294,154 @@ async def get_user_profile(user_id: int):
     返回:
     - 用户资料信息
     """
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="数据库连接失败")
-    
-    try:
-        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            sql = """
-                SELECT id, username, email, phone, user_type, is_active, 
-                       created_at, updated_at, last_login
-                FROM users 
-                WHERE id = %s
-            """
-            cursor.execute(sql, (user_id,))
-            user = cursor.fetchone()
-            
-            if not user:
-                raise HTTPException(status_code=404, detail="用户不存在")
-            
-            return {
-                "id": user['id'],
-                "username": user['username'],
-                "email": user['email'],
-                "phone": user['phone'],
-                "user_type": user['user_type'],
-                "is_active": user['is_active'],
-                "created_at": user['created_at'],
-                "updated_at": user['updated_at'],
-                "last_login": user['last_login']
-            }
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"获取用户资料时出错: {e}")
-        raise HTTPException(status_code=500, detail="获取用户资料失败")
-    finally:
-        connection.close()
+    return await run_db(_get_user_profile, user_id)
+
+# 访问令牌（HS256签名的JWT），验证时无需访问数据库
+TOKEN_ALGORITHM = "HS256"
+_TOKEN_HEADER = base64.urlsafe_b64encode(
+    json.dumps({"alg": TOKEN_ALGORITHM, "typ": "JWT"}, separators=(',', ':')).encode()
+).rstrip(b'=')
+_TOKEN_KEY = SECURITY_CONFIG['token_secret'].encode()
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
 
-# 为未来扩展预留的函数
-def generate_jwt_token(user_info: Dict) -> str:
-    """生成JWT令牌（未来实现）"""
-    # TODO: 实现JWT token生成
-    pass
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def _sign(signing_input: bytes) -> bytes:
+    return _b64encode(hmac.new(_TOKEN_KEY, signing_input, hashlib.sha256).digest())
+
+def generate_jwt_token(user_info: Dict, auth_time: Optional[int] = None) -> str:
+    """
+    生成访问令牌
+
+    载荷包含 sub(用户ID)、user_type、iat、exp、auth_time(登录时间) 和 jti(令牌唯一ID)，
+    有效期为 SECURITY_CONFIG['session_timeout'] 秒，且不超过登录后的 max_session_age；
+    刷新时传入原令牌的auth_time
+    """
+    now = int(time.time())
+    auth_time = now if auth_time is None else auth_time
+    claims = {
+        "sub": str(user_info['id']),
+        "user_type": user_info['user_type'],
+        "iat": now,
+        "auth_time": auth_time,
+        "exp": min(now + SECURITY_CONFIG['session_timeout'], auth_time + SECURITY_CONFIG['max_session_age']),
+        "jti": secrets.token_hex(8),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+    signing_input = _TOKEN_HEADER + b'.' + payload
+    return (signing_input + b'.' + _sign(signing_input)).decode()
 
 def verify_jwt_token(token: str) -> Optional[Dict]:
-    """验证JWT令牌（未来实现）"""
-    # TODO: 实现JWT token验证
-    pass
-
-def refresh_token(token: str) -> str:
-    """刷新JWT令牌（未来实现）"""
-    # TODO: 实现token刷新
-    pass
+    """验证访问令牌的签名、有效期和吊销状态，成功时返回载荷，否则返回None"""
+    try:
+        header, payload, signature = token.split('.')
+    except (AttributeError, ValueError):
+        return None
+
+    signing_input = f"{header}.{payload}".encode()
+    if header.encode() != _TOKEN_HEADER or not hmac.compare_digest(_sign(signing_input), signature.encode()):
+        return None
+
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if not isinstance(claims, dict):
+        return None
+    expires_at = claims.get('exp')
+    if not isinstance(expires_at, (int, float)) or expires_at <= time.time():
+        return None
+    if is_token_revoked(claims.get('jti', '')):
+        return None
+    return claims
+
+def refresh_token(token: str) -> Optional[str]:
+    """
+    用仍然有效的令牌换取一个新令牌并吊销原令牌（数据库操作部分，优先读取用户缓存）
+
+    以下情况返回None：原令牌无效、用户已删除或停用、距登录超过 max_session_age；
+    新令牌沿用原令牌的auth_time，反复刷新不能延长会话，用户类型以数据库中的当前值为准
+    """
+    claims = verify_jwt_token(token)
+    if not claims:
+        return None
+    auth_time = claims.get('auth_time', claims['iat'])
+    if time.time() - auth_time >= SECURITY_CONFIG['max_session_age']:
+        return None
+    user = get_user_row(int(claims['sub']))
+    if not user or not user['is_active']:
+        return None
+    revoke_token(claims['jti'], claims['exp'])
+    return generate_jwt_token(user, auth_time)
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> Dict:
+    """
+    FastAPI依赖：从 Authorization: Bearer <token> 中解析当前用户
+
+    只做进程内的签名和有效期校验，不访问数据库；令牌缺失或无效时返回401
+    """
+    claims = verify_jwt_token(credentials.credentials) if credentials else None
+    if not claims:
+        raise HTTPException(
+            status_code=401,
+            detail="未登录或令牌已失效",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims
+
+@router.get("/token/verify", summary="验证访问令牌")
+async def verify_token(current_user: Dict = Depends(get_current_user)):
+    """
+    验证访问令牌API（不访问数据库）
+    
+    请求头:
+    - Authorization: Bearer <token>
+    
+    返回:
+    - 令牌中的用户信息及过期时间
+    """
+    return {
+        "user_id": int(current_user['sub']),
+        "user_type": current_user['user_type'],
+        "expires_at": datetime.fromtimestamp(current_user['exp']).isoformat(),
+        "status": "active"
+    }
+
+@router.post("/token/refresh", response_model=LoginResponse, summary="刷新访问令牌")
+async def refresh_access_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> LoginResponse:
+    """
+    刷新访问令牌API
+    
+    请求头:
+    - Authorization: Bearer <token>（仍在有效期内的令牌）
+    
+    用户已停用或距登录超过 SECURITY_CONFIG['max_session_age'] 时返回401，需要重新登录
+    
+    返回:
+    - 新的访问令牌
+    """
+    new_token = await run_db(refresh_token, credentials.credentials) if credentials else None
+    if not new_token:
+        raise HTTPException(
+            status_code=401,
+            detail="未登录或令牌已失效",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    claims = verify_jwt_token(new_token)
+    return LoginResponse(
+        success=True,
+        message="令牌已刷新",
+        user_type=claims['user_type'],
+        user_id=int(claims['sub']),
+        token=new_token,
+        expires_in=SECURITY_CONFIG['session_timeout']
+    )
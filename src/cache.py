@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存模块
+提供进程内的TTL缓存、LRU缓存，以及各路由共享的缓存实例
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import pymysql
+try:
+    from .config import CACHE_CONFIG, PERMISSION_CONFIG
+    from .db_router import get_read_connection, mark_write
+    from .repository import UserRepository
+except ImportError:
+    from config import CACHE_CONFIG, PERMISSION_CONFIG
+    from db_router import get_read_connection, mark_write
+    from repository import UserRepository
+
+_MISSING = object()
+
+
+class TTLCache:
+    """线程安全的TTL缓存，条目数超过max_entries时淘汰最早写入的条目"""
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: Dict[Hashable, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._data.pop(key, None)
+            while len(self._data) >= self.max_entries:
+                # dict保持插入顺序，第一个键即最早写入的条目
+                del self._data[next(iter(self._data))]
+            self._data[key] = (expires_at, value)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class LRUCache:
+    """
+    线程安全的LRU+TTL缓存，带命中/未命中/淘汰计数
+
+    get_or_load实现读穿透：未命中时调用loader加载并写入缓存。
+    加载期间如果发生过失效操作，加载结果不写入缓存，避免把旧数据放回去
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self._stats["misses"] += 1
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            generation = self._generation
+        value = loader(key)
+        if value is not None:
+            self.set(key, value, generation)
+        return value
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._generation += 1
+            self._stats["invalidations"] += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._data)
+        stats["max_entries"] = self.max_entries
+        return stats
+
+
+# 列表接口总数缓存，键为 (列表名, 规范化后的筛选条件)
+count_cache = TTLCache(CACHE_CONFIG['count_ttl'], CACHE_CONFIG['count_max_entries'])
+
+
+def count_cache_key(scope: str, **filters) -> tuple:
+    """生成总数缓存键：按条件名排序并忽略未提供的条件，使等价的筛选组合共用一个条目"""
+    normalized = tuple((name, value) for name, value in sorted(filters.items())
+                       if value is not None and value != "")
+    return (scope, normalized)
+
+
+# 用户详情缓存，键为用户ID，值为不含密码的用户行（只读，调用方不要修改）
+user_cache = LRUCache(CACHE_CONFIG['user_max_entries'], CACHE_CONFIG['user_ttl'])
+
+# 管理员权限掩码缓存，键为用户ID，值为int位掩码（见permissions.py）
+permission_cache = LRUCache(PERMISSION_CONFIG['cache_max_entries'], PERMISSION_CONFIG['cache_ttl'])
+
+def load_user_row(user_id: int) -> Optional[Dict]:
+    """从数据库读取用户行（只读副本，该用户刚被修改时读主库），用户不存在时返回None，数据库不可用时抛出异常"""
+    connection = get_read_connection(("user", user_id))
+    if not connection:
+        raise RuntimeError("数据库连接失败")
+    try:
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            return UserRepository(cursor).get_row(user_id)
+    finally:
+        connection.close()
+
+
+def get_user_row(user_id: int) -> Optional[Dict]:
+    """读穿透获取用户行：优先读缓存，未命中时查询数据库"""
+    return user_cache.get_or_load(user_id, load_user_row)
+
+
+def invalidate_user_row(user_id: int):
+    """
+    某个用户行被修改后调用：清除该用户的详情缓存，
+    并让随后一段时间内该用户行的重新加载读主库，避免把副本上的旧数据写回缓存
+    """
+    user_cache.invalidate(user_id)
+    mark_write(("user", user_id))
+
+
+def invalidate_user_caches(user_id: Optional[int] = None):
+    """
+    用户数据发生增删改后调用，清除依赖用户表的缓存；提供user_id时同时清除该用户的详情和权限缓存
+    （见 invalidate_user_row）
+    """
+    count_cache.clear()
+    if user_id is not None:
+        invalidate_user_row(user_id)
+        permission_cache.invalidate(user_id)
+
+
+def cache_stats() -> Dict:
+    """缓存统计信息"""
+    return {"user_cache": user_cache.stats(), "count_cache": {"size": len(count_cache)},
+            "permission_cache": permission_cache.stats()}
@@ -1,6 +1,9 @@
 # 数据库配置文件
 # 请根据实际情况修改以下配置
 
+import os
+import secrets
+
 DB_CONFIG = {
     'host': '119.45.196.184',
     'port': 3306,
@@ -11,6 +14,33 @@ DB_CONFIG = {
     'autocommit': True
 }
 
+# 存储后端：mysql（DB_CONFIG）或 sqlite（嵌入式数据库文件，适合单机部署、离线环境和CI）
+STORAGE_CONFIG = {
+    'backend': os.environ.get('SDP_STORAGE_BACKEND', 'mysql'),
+    'sqlite_path': os.environ.get('SDP_SQLITE_PATH',
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data',
+                                               'student_platform.db')),
+    'sqlite_busy_timeout': 5.0,  # 等待其他连接的写锁的最长时间（秒）
+    'sqlite_synchronous': 'NORMAL',  # WAL模式下NORMAL只在检查点时fsync，掉电可能丢失最近提交的事务；要求更高时设为FULL
+}
+
+# 只读副本：环境变量 SDP_DB_REPLICAS 为逗号分隔的 host:port 列表，其余连接参数与DB_CONFIG相同
+# 为空时所有读写都使用DB_CONFIG指定的主库
+DB_REPLICAS = [
+    dict(DB_CONFIG, host=host, port=int(port or 3306))
+    for host, _, port in (item.strip().partition(':')
+                          for item in os.environ.get('SDP_DB_REPLICAS', '').split(',') if item.strip())
+]
+
+# 读写分离配置（仅在配置了DB_REPLICAS时生效）
+DB_ROUTING_CONFIG = {
+    'strategy': os.environ.get('SDP_READ_STRATEGY', 'round_robin'),  # round_robin 或 least_latency
+    'sticky_seconds': 5,  # 调用方写请求后该时间内的读取走主库，应大于副本的正常复制延迟
+    'eject_after_failures': 3,  # 副本连续失败该次数后摘除
+    'eject_seconds': 30,  # 摘除时长（秒），到期后重新尝试；健康检查成功时提前恢复
+    'acquire_timeout': 1.0,  # 从副本连接池借连接的最长等待时间（秒），超时后改用其他副本或主库
+}
+
 # API配置
 API_CONFIG = {
     'host': '0.0.0.0',
@@ -18,8 +48,179 @@ API_CONFIG = {
     'debug': True
 }
 
+# 生产模式（python run.py --production）的服务器配置
+SERVER_CONFIG = {
+    'production': os.environ.get('SDP_PRODUCTION', '').lower() in ('1', 'true', 'yes'),  # run.py --production 时设置
+    'workers': int(os.environ.get('SDP_WORKERS') or os.cpu_count() or 1),  # worker进程数，默认CPU核数
+    'loop': os.environ.get('SDP_EVENT_LOOP', 'auto'),  # auto: 安装了uvloop时使用uvloop，否则asyncio
+    'http': os.environ.get('SDP_HTTP_PARSER', 'auto'),  # auto: 安装了httptools时使用httptools，否则h11
+    'timeout_keep_alive': int(os.environ.get('SDP_KEEP_ALIVE', '5')),  # 空闲keep-alive连接保持时间（秒）
+    'backlog': int(os.environ.get('SDP_BACKLOG', '2048')),  # 监听socket的等待队列长度
+    'timeout_graceful_shutdown': int(os.environ.get('SDP_GRACEFUL_TIMEOUT', '30')),  # 停止/重启时等待进行中请求的最长时间（秒）
+    # 所有worker合计的主库连接数上限，设置后按worker数计算每个worker的连接池大小；为空时每个worker使用DB_POOL_CONFIG
+    'db_connection_budget': int(os.environ['SDP_DB_CONNECTIONS']) if os.environ.get('SDP_DB_CONNECTIONS') else None,
+}
+
 # 安全配置
 SECURITY_CONFIG = {
-    'password_hash_algorithm': 'sha256',  # 密码哈希算法
-    'session_timeout': 3600,  # 会话超时时间（秒）
+    # 新密码使用的哈希算法：pbkdf2_sha256 / scrypt / sha256（旧格式，无盐，仅用于兼容）
+    # 数据库中已有的旧格式哈希仍可验证，并在用户下次登录时自动升级为此算法
+    'password_hash_algorithm': 'pbkdf2_sha256',
+    'session_timeout': 3600,  # 会话超时时间（秒），同时是访问令牌的有效期
+    'max_session_age': 12 * 3600,  # 从登录起算的最长会话时间（秒），超过后不能再刷新令牌，需要重新登录
+    # 访问令牌签名密钥，生产环境必须通过环境变量设置，且所有worker使用同一个值
+    'token_secret': os.environ.get('SDP_TOKEN_SECRET'),
+}
+
+if not SECURITY_CONFIG['token_secret']:
+    if SERVER_CONFIG['production']:
+        raise RuntimeError("生产模式必须通过环境变量 SDP_TOKEN_SECRET 设置访问令牌签名密钥")
+    # 开发模式使用进程内随机密钥：重启后已签发的令牌全部失效，多个worker之间也互不认可
+    SECURITY_CONFIG['token_secret'] = secrets.token_hex(32)
+    print("⚠️ 未设置 SDP_TOKEN_SECRET，使用本进程随机生成的令牌签名密钥："
+          "令牌在重启后失效，且不能在多个worker之间通用")
+
+# 数据库连接池配置
+DB_POOL_CONFIG = {
+    'min_size': 2,  # 启动时预先建立的连接数
+    'max_size': int(os.environ.get('SDP_DB_POOL_MAX_SIZE', '10')),  # 连接池最大连接数（run.py生产模式按连接预算设置）
+    'acquire_timeout': 5.0,  # 获取连接的最长等待时间（秒）
+    'max_lifetime': 1800,  # 单个连接的最长存活时间（秒），超过后重建
+    'health_check_interval': 30,  # 连接空闲超过该时间（秒）后，借出前执行ping检查
+}
+DB_POOL_CONFIG['min_size'] = min(DB_POOL_CONFIG['min_size'], DB_POOL_CONFIG['max_size'])
+
+# 数据库执行线程池配置
+DB_EXECUTOR_CONFIG = {
+    'max_workers': DB_POOL_CONFIG['max_size'],  # 同时执行阻塞数据库操作的线程数，与连接池max_size一致
+}
+
+# 缓存配置
+CACHE_CONFIG = {
+    'count_ttl': 30,  # 列表总数缓存有效期（秒）
+    'count_max_entries': 1024,  # 列表总数缓存最多保存的筛选组合数
+    'user_ttl': 10,  # 用户详情缓存有效期（秒），多worker部署时也是其他worker可能读到旧数据的最长时间
+    'user_max_entries': 10000,  # 用户详情缓存最多保存的用户数，超出后淘汰最久未访问的条目
+}
+
+# 用户搜索配置
+SEARCH_CONFIG = {
+    'use_fulltext': True,  # 存在ngram全文索引时使用索引加速search参数
+    'fulltext_index': 'ft_users_search',  # 全文索引名称，见 sql_scripts/add_search_fulltext_index.sql
+    'ngram_token_size': 2,  # 与MySQL服务器的ngram_token_size保持一致
+}
+
+# 登录日志异步写入配置
+LOGIN_LOG_CONFIG = {
+    'async_enabled': True,  # 为False时在登录请求中同步写入login_logs
+    'max_queue_size': 10000,  # 内存队列上限，队列满时登录请求会等待（背压）
+    'batch_size': 200,  # 单条INSERT最多写入的日志行数
+    'flush_interval': 0.5,  # 队列中最早的日志最多等待多久被写入（秒）
+    'enqueue_timeout': 0.05,  # 队列满时最多等待多久（秒），超时后改为同步写入，保证日志不丢失
+    'max_held_events': 10000,  # 数据库不可用时保留等待重试的日志数上限，超出时丢弃最早的日志
+    'retry_backoff': 0.5,  # 重试间隔的初始值（秒），连续失败时翻倍
+    'max_retry_backoff': 30.0,  # 重试间隔上限（秒）
+}
+
+# 令牌吊销配置
+TOKEN_REVOCATION_CONFIG = {
+    # 吊销记录持久化文件，为None时只保存在内存中（重启后已登出的令牌会重新生效）
+    # 多个worker指向同一个文件即可共享吊销记录；run.py 多worker生产模式未设置时拒绝启动
+    'journal_path': os.environ.get('SDP_REVOCATION_JOURNAL'),
+    'sync_interval': 1.0,  # 检查其他worker新写入吊销记录的最小间隔（秒）
+    # 文件行数超过有效记录数的compact_ratio倍（且超过compact_min_lines行）时，启动和同步时压缩文件
+    'compact_ratio': 2.0,
+    'compact_min_lines': 100,
+}
+
+# 健康检查配置
+HEALTH_CONFIG = {
+    'probe_interval': 5,  # 后台探测数据库的间隔（秒）
+    'probe_timeout': 2,  # 探测时等待连接池连接的最长时间（秒）
+}
+
+# 批量创建用户配置
+BULK_CREATE_CONFIG = {
+    'max_rows': 5000,  # 单次请求最多创建的用户数
+    'lookup_chunk_size': 1000,  # 唯一性检查时每条 IN (...) 查询包含的值数量
+    'insert_chunk_size': 500,  # 每条多行INSERT包含的行数
+}
+
+# 数据导出配置
+EXPORT_CONFIG = {
+    'fetch_size': 1000,  # 流式游标每次读取的行数，决定导出时的内存占用
+    'gzip_level': 6,  # 客户端接受gzip时的压缩级别
+    'net_write_timeout': 600,  # 客户端读取较慢时，MySQL等待发送结果的最长时间（秒）
+}
+
+# 花名册CSV导入配置
+IMPORT_CONFIG = {
+    'chunk_size': 500,  # 每个事务写入的行数
+    'max_upload_bytes': 50 * 1024 * 1024,  # 上传文件大小上限
+    'max_errors': 1000,  # 每个任务保留的行错误数量上限
+    'max_jobs': 100,  # 内存中保留的任务数量上限，超出时淘汰最早结束的任务（import_jobs表中的记录不受影响）
+    'retention_days': 7,  # import_jobs表中已结束任务的保留天数，登记新任务时删除更早的记录
+}
+
+# 登录限流配置（进程内，在访问数据库之前拒绝请求）
+# 每个维度在window秒内失败limit次后锁定base_lockout秒，
+# strike_reset秒内再次被锁定时锁定时间翻倍，最长max_lockout秒
+LOGIN_THROTTLE_CONFIG = {
+    'enabled': True,
+    'trust_forwarded_for': False,  # 部署在反向代理之后时设为True，从X-Forwarded-For取客户端IP
+    'username': {
+        'limit': 5,
+        'window': 300,
+        'base_lockout': 60,
+        'max_lockout': 3600,
+        'strike_reset': 3600,
+        'max_entries': 100000,  # 最多跟踪的用户名数量，超出时淘汰最久未访问的
+    },
+    'ip': {
+        'limit': 50,
+        'window': 300,
+        'base_lockout': 60,
+        'max_lockout': 3600,
+        'strike_reset': 3600,
+        'max_entries': 100000,
+    },
+}
+
+# 密码哈希服务配置
+PASSWORD_HASH_CONFIG = {
+    'pbkdf2_iterations': 600000,
+    'scrypt_n': 2 ** 14,
+    'scrypt_r': 8,
+    'scrypt_p': 1,
+    'salt_bytes': 16,
+    # 计算慢哈希的进程数，0表示在调用线程中直接计算；run.py --production 把它当作整台主机的预算，按worker数分配后传给各worker
+    'workers': int(os.environ.get('SDP_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2))),
+    'max_pending': 64,  # 同时排队的哈希任务上限，超出时拒绝请求（503）；不含批量哈希
+    # 批量创建/导入使用的哈希进程数（单独的进程池，不占用登录验证的进程）及其nice值
+    'bulk_workers': int(os.environ.get('SDP_BULK_HASH_WORKERS', '1')),
+    'bulk_nice': 10,
+}
+
+# 管理员权限配置
+PERMISSION_CONFIG = {
+    # 为True时管理员和用户管理接口要求携带具有相应权限的管理员令牌；默认关闭以兼容现有客户端
+    'enforce': os.environ.get('SDP_ENFORCE_PERMISSIONS', '').lower() in ('1', 'true', 'yes'),
+    'cache_ttl': 60,  # 管理员权限掩码缓存有效期（秒），多worker部署时也是权限变更在其他worker生效的最长时间
+    'cache_max_entries': 10000,
+}
+
+# 监控指标配置（/metrics）
+METRICS_CONFIG = {
+    'enabled': True,
+    # 请求和SQL语句耗时直方图的桶上限（秒）
+    'latency_buckets': (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+}
+
+# 请求级SQL统计和慢查询日志配置
+QUERY_TRACKING_CONFIG = {
+    'enabled': True,
+    # 单条语句耗时达到该值（毫秒）时输出慢查询日志，设为空字符串则关闭
+    'slow_query_ms': float(os.environ.get('SDP_SLOW_QUERY_MS', '200')) if os.environ.get('SDP_SLOW_QUERY_MS', '200') else None,
+    # 为True时在响应头 Server-Timing 中返回本次请求的数据库耗时；会暴露语句名称，默认关闭
+    'server_timing': os.environ.get('SDP_SERVER_TIMING', '').lower() in ('1', 'true', 'yes'),
 }
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试公共fixture
+backend: 全局连接池改为使用临时目录中的SQLite数据库（按 sql_scripts/ 中的SQLite脚本建表并写入示例用户），
+密码使用不需要进程池的旧哈希算法；前后重置唯一约束和全文索引检测结果并清空缓存。
+连接池上限默认为2，需要更多连接的测试用 @pytest.mark.parametrize("backend", [4], indirect=True) 指定
+"""
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import db_pool
+import passwords
+import search
+import unique_constraints
+from cache import count_cache, user_cache
+from config import DB_CONFIG
+from db_pool import ConnectionPool
+from storage import SQLiteBackend
+
+
+def _reset_state():
+    unique_constraints.reset_unique_constraint_detection()
+    search.reset_fulltext_detection()
+    count_cache.clear()
+    user_cache.clear()
+
+
+@pytest.fixture
+def backend(request, tmp_path, monkeypatch):
+    """全局连接池改为使用临时SQLite数据库，返回SQLite后端"""
+    sqlite = SQLiteBackend(str(tmp_path / "test.db"))
+    pool = ConnectionPool(DB_CONFIG, min_size=1, max_size=getattr(request, "param", 2), backend=sqlite)
+    monkeypatch.setattr(db_pool, "_pool", pool)
+    monkeypatch.setitem(passwords.SECURITY_CONFIG, "password_hash_algorithm", "sha256")
+    _reset_state()
+    yield sqlite
+    pool.close()
+    _reset_state()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库执行模块
+在独立的有界线程池中运行阻塞的pymysql调用，避免慢查询阻塞事件循环
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+try:
+    from .config import DB_EXECUTOR_CONFIG
+except ImportError:
+    from config import DB_EXECUTOR_CONFIG
+
+
+class DBExecutor:
+    """有界的数据库执行器：最多max_workers个数据库操作同时运行，其余排队等待"""
+
+    def __init__(self, max_workers: int = 10):
+        if max_workers < 1:
+            raise ValueError("max_workers必须大于0")
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._lock = threading.Lock()
+        self._running = 0
+        self._pending = 0
+        self._completed = 0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在线程池中执行func，并在当前协程中等待结果（保留调用方的contextvars）"""
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, self._call, func, *args, **kwargs)
+        with self._lock:
+            self._pending += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, call)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """提交func到线程池但不等待结果（用于不能await的清理工作）"""
+        ctx = contextvars.copy_context()
+        with self._lock:
+            self._pending += 1
+        return self._executor.submit(ctx.run, self._call, func, *args, **kwargs)
+
+    def _call(self, func: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self._pending -= 1
+            self._running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "running": self._running,
+                "pending": self._pending,
+                "completed": self._completed,
+            }
+
+
+_executor: Optional[DBExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> DBExecutor:
+    """获取全局数据库执行器，未初始化时按需创建"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = DBExecutor(**DB_EXECUTOR_CONFIG)
+    return _executor
+
+
+def shutdown_executor(wait: bool = True):
+    """关闭全局数据库执行器（在应用lifespan关闭阶段调用）"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def run_db(func: Callable, *args, **kwargs) -> Any:
+    """在数据库线程池中执行阻塞函数，供async路由处理函数await"""
+    return await get_executor().run(func, *args, **kwargs)
+
+
+def executor_stats() -> Dict:
+    """全局数据库执行器统计信息"""
+    if _executor is None:
+        return {}
+    return _executor.stats()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接池模块
+为所有路由提供共享的数据库连接，避免每个请求重新建立TCP连接和MySQL认证；
+连接的建立和状态检查由存储后端（storage.py，MySQL或SQLite）提供
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+try:
+    from .config import DB_CONFIG, DB_POOL_CONFIG
+    from .storage import MySQLBackend, StorageBackend, create_backend
+except ImportError:
+    from config import DB_CONFIG, DB_POOL_CONFIG
+    from storage import MySQLBackend, StorageBackend, create_backend
+
+
+class PoolTimeoutError(Exception):
+    """在acquire_timeout内没有可用连接"""
+
+
+class PoolClosedError(Exception):
+    """连接池已关闭"""
+
+
+class _PoolEntry:
+    """连接池内部记录：原始连接及其创建/最近使用时间"""
+
+    __slots__ = ("raw", "created_at", "last_used")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class PooledConnection:
+    """
+    从连接池借出的连接代理
+
+    除close()外的所有属性和方法都转发给底层pymysql连接，
+    close()会把连接归还连接池而不是真正断开，因此原有的
+    `try ... finally: connection.close()` 写法无需修改。
+    """
+
+    def __init__(self, pool: "ConnectionPool", entry: _PoolEntry):
+        self._pool = pool
+        self._entry = entry
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._entry.raw, name)
+
+    def close(self):
+        """归还连接到连接池"""
+        if not self._released:
+            self._released = True
+            self._pool._release(self._entry)
+
+    def invalidate(self):
+        """丢弃该连接（连接状态不可信时使用，例如未读完的流式查询）"""
+        if not self._released:
+            self._released = True
+            self._pool._release(self._entry, discard=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """线程安全的数据库连接池，backend未提供时按db_config建立MySQL连接"""
+
+    def __init__(self, db_config: Dict, min_size: int = 2, max_size: int = 10,
+                 acquire_timeout: float = 5.0, max_lifetime: float = 1800,
+                 health_check_interval: float = 30, backend: Optional[StorageBackend] = None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("连接池大小配置无效: 需要 0 <= min_size <= max_size 且 max_size >= 1")
+
+        self.db_config = dict(db_config)
+        self.backend = backend or MySQLBackend(db_config)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "borrowed": 0,
+            "returned": 0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "expired": 0,
+            "connect_errors": 0,
+            "wait_time_total": 0.0,
+        }
+
+    def _connect(self) -> _PoolEntry:
+        try:
+            raw = self.backend.connect()
+        except Exception:
+            with self._cond:
+                self._stats["connect_errors"] += 1
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        return _PoolEntry(raw)
+
+    def _close_raw(self, entry: _PoolEntry):
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
+
+    def _expired(self, entry: _PoolEntry, now: float) -> bool:
+        return self.max_lifetime > 0 and now - entry.created_at >= self.max_lifetime
+
+    def open(self):
+        """预先建立min_size个连接"""
+        for _ in range(self.min_size):
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                entry = self._connect()
+            except Exception as e:
+                with self._cond:
+                    self._size -= 1
+                print(f"连接池预热失败: {e}")
+                return
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """借出一个连接，必要时新建；连接池已满时最多等待timeout秒"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            entry = None
+            create = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolClosedError("连接池已关闭")
+                    if self._idle:
+                        # LIFO：优先复用最近归还的连接
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(f"等待数据库连接超时（{timeout}秒）")
+                    self._cond.wait(remaining)
+
+            if create:
+                try:
+                    entry = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._check_borrow(entry):
+                continue
+
+            with self._cond:
+                self._stats["borrowed"] += 1
+                self._stats["wait_time_total"] += time.monotonic() - start
+            return PooledConnection(self, entry)
+
+    def _check_borrow(self, entry: _PoolEntry) -> bool:
+        """借出前检查连接寿命与健康状态，不合格的连接直接丢弃"""
+        now = time.monotonic()
+        if self._expired(entry, now):
+            self._discard(entry, "expired")
+            return False
+        if self.health_check_interval >= 0 and now - entry.last_used >= self.health_check_interval:
+            try:
+                self.backend.ping(entry.raw)
+            except Exception:
+                self._discard(entry, "health_check_failures")
+                return False
+        return True
+
+    def _discard(self, entry: _PoolEntry, reason: Optional[str] = None):
+        self._close_raw(entry)
+        with self._cond:
+            self._size -= 1
+            self._stats["closed"] += 1
+            if reason:
+                self._stats[reason] += 1
+            self._cond.notify()
+
+    def _release(self, entry: _PoolEntry, discard: bool = False):
+        """归还连接；连接已断开、已过期或连接池已关闭时直接关闭"""
+        with self._cond:
+            self._stats["returned"] += 1
+
+        raw = entry.raw
+        if not discard and self.backend.is_open(raw) and self.backend.in_transaction(raw):
+            # 处理函数异常退出时可能留下未结束的事务
+            try:
+                raw.rollback()
+            except Exception:
+                discard = True
+
+        now = time.monotonic()
+        if self._expired(entry, now):
+            self._discard(entry, "expired")
+            return
+        if discard or not self.backend.is_open(raw):
+            self._discard(entry)
+            return
+
+        entry.last_used = now
+        with self._cond:
+            if not self._closed:
+                self._idle.append(entry)
+                self._cond.notify()
+                return
+        self._discard(entry)
+
+    def close(self):
+        """关闭连接池：立即关闭空闲连接，借出中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._stats["closed"] += len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_raw(entry)
+
+    def stats(self) -> Dict:
+        """连接池统计信息"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "closed_pool": self._closed,
+            })
+        stats["wait_time_total"] = round(stats["wait_time_total"], 6)
+        return stats
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def init_pool() -> ConnectionPool:
+    """创建并预热全局连接池（在应用lifespan启动阶段调用）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = ConnectionPool(DB_CONFIG, backend=create_backend(), **DB_POOL_CONFIG)
+            pool = _pool
+        else:
+            return _pool
+    pool.open()
+    return pool
+
+
+def get_pool() -> ConnectionPool:
+    """获取全局连接池，未初始化时按需创建（脚本场景）"""
+    if _pool is None or _pool._closed:
+        return init_pool()
+    return _pool
+
+
+def close_pool():
+    """关闭全局连接池（在应用lifespan关闭阶段调用）"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def get_db_connection() -> Optional[PooledConnection]:
+    """从连接池获取数据库连接，失败时返回None；使用完毕后调用close()归还"""
+    try:
+        return get_pool().acquire()
+    except Exception as e:
+        print(f"数据库连接失败: {e}")
+        return None
+
+
+def pool_stats() -> Dict:
+    """全局连接池统计信息"""
+    if _pool is None:
+        return {}
+    return _pool.stats()
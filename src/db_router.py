@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+读写分离模块
+写操作和事务始终使用主库连接池（db_pool.get_db_connection）；只读查询通过 get_read_connection
+按轮询或最低延迟选择一个只读副本，以下情况仍读主库：
+- 没有配置副本（DB_REPLICAS为空），或所有副本都被摘除/不可用
+- 不在HTTP请求中（后台任务、脚本）或当前请求本身是写请求（POST/PUT/DELETE等）
+- 同一调用方（按Authorization头，没有时按客户端IP）在 sticky_seconds 内发起过写请求，
+  保证写后立即读取能看到自己的修改（副本有复制延迟）
+- 调用方提供的key在 sticky_seconds 内被标记为刚写入（例如刚失效的用户缓存条目）
+
+副本健康：借出连接失败累计 eject_after_failures 次后摘除 eject_seconds 秒，到期后重新尝试；
+健康检查后台任务定时ping各副本，成功时立即恢复，并更新最低延迟策略使用的延迟（EWMA）
+"""
+
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+try:
+    from .config import DB_REPLICAS, DB_POOL_CONFIG, DB_ROUTING_CONFIG, STORAGE_CONFIG
+    from .db_pool import ConnectionPool, PooledConnection, get_db_connection
+    from .repository import ping
+except ImportError:
+    from config import DB_REPLICAS, DB_POOL_CONFIG, DB_ROUTING_CONFIG, STORAGE_CONFIG
+    from db_pool import ConnectionPool, PooledConnection, get_db_connection
+    from repository import ping
+
+STRATEGIES = ("round_robin", "least_latency")
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+class Replica:
+    """一个只读副本的连接池及健康状态"""
+
+    def __init__(self, name: str, pool):
+        self.name = name
+        self.pool = pool
+        self.failures = 0  # 连续失败次数
+        self.ejected_until = 0.0
+        self.latency_ms: Optional[float] = None
+        self.reads = 0
+        self.errors = 0
+        self.ejections = 0
+
+    def available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def to_dict(self, now: float) -> Dict:
+        return {
+            "name": self.name,
+            "available": self.available(now),
+            "latency_ms": None if self.latency_ms is None else round(self.latency_ms, 3),
+            "failures": self.failures,
+            "reads": self.reads,
+            "errors": self.errors,
+            "ejections": self.ejections,
+        }
+
+
+class ReplicaRouter:
+    """在多个只读副本之间分配读连接，并记录需要读主库的调用方"""
+
+    def __init__(self, replicas: Sequence[Tuple[str, object]], strategy: str = "round_robin",
+                 sticky_seconds: float = 5, eject_after_failures: int = 3, eject_seconds: float = 30,
+                 latency_alpha: float = 0.3, max_sticky_entries: int = 10000):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"读路由策略必须是: {', '.join(STRATEGIES)}")
+        self.replicas = [Replica(name, pool) for name, pool in replicas]
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds
+        self.eject_after_failures = eject_after_failures
+        self.eject_seconds = eject_seconds
+        self.latency_alpha = latency_alpha
+        self.max_sticky_entries = max_sticky_entries
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._recent_writes: Dict[Hashable, float] = {}  # 键 -> 读主库截止时间
+        self._primary_reads = 0
+
+    # ----- 写后读 -----
+
+    def mark_write(self, key: Optional[Hashable]):
+        """标记key刚写入，sticky_seconds内与之相关的读取走主库"""
+        if key is None or self.sticky_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._recent_writes) >= self.max_sticky_entries:
+                self._recent_writes = {k: t for k, t in self._recent_writes.items() if t > now}
+                while len(self._recent_writes) >= self.max_sticky_entries:
+                    del self._recent_writes[next(iter(self._recent_writes))]
+            self._recent_writes.pop(key, None)
+            self._recent_writes[key] = now + self.sticky_seconds
+
+    def is_sticky(self, key: Optional[Hashable]) -> bool:
+        if key is None:
+            return False
+        with self._lock:
+            deadline = self._recent_writes.get(key)
+            if deadline is None:
+                return False
+            if deadline <= time.monotonic():
+                del self._recent_writes[key]
+                return False
+            return True
+
+    # ----- 副本选择 -----
+
+    def _candidates(self) -> List[Replica]:
+        """按策略排好序的可用副本"""
+        now = time.monotonic()
+        available = [r for r in self.replicas if r.available(now)]
+        if len(available) < 2:
+            return available
+        if self.strategy == "least_latency":
+            # 尚未测得延迟的副本排在最前，以便尽快得到测量值
+            return sorted(available, key=lambda r: -1.0 if r.latency_ms is None else r.latency_ms)
+        start = next(self._counter) % len(available)
+        return available[start:] + available[:start]
+
+    def _record_failure(self, replica: Replica, error: Exception):
+        with self._lock:
+            replica.errors += 1
+            replica.failures += 1
+            if replica.failures >= self.eject_after_failures and replica.available(time.monotonic()):
+                replica.ejected_until = time.monotonic() + self.eject_seconds
+                replica.ejections += 1
+                print(f"只读副本 {replica.name} 连续失败 {replica.failures} 次，摘除 {self.eject_seconds} 秒: {error}")
+
+    def _record_success(self, replica: Replica, latency_ms: Optional[float] = None):
+        with self._lock:
+            replica.failures = 0
+            replica.ejected_until = 0.0
+            if latency_ms is not None:
+                if replica.latency_ms is None:
+                    replica.latency_ms = latency_ms
+                else:
+                    replica.latency_ms += self.latency_alpha * (latency_ms - replica.latency_ms)
+
+    def acquire_read(self, timeout: Optional[float] = None) -> Optional[PooledConnection]:
+        """从可用副本借出连接，全部失败时返回None（调用方改用主库）"""
+        for replica in self._candidates():
+            try:
+                connection = replica.pool.acquire(timeout=timeout)
+            except Exception as e:
+                self._record_failure(replica, e)
+                continue
+            with self._lock:
+                replica.reads += 1
+                replica.failures = 0
+            return connection
+        with self._lock:
+            self._primary_reads += 1
+        return None
+
+    def probe(self, timeout: float) -> List[Dict]:
+        """对每个副本（包括已摘除的）执行一次ping，更新健康状态和延迟"""
+        results = []
+        for replica in self.replicas:
+            start = time.perf_counter()
+            try:
+                connection = replica.pool.acquire(timeout=timeout)
+                try:
+                    with connection.cursor() as cursor:
+                        ping(cursor)
+                finally:
+                    connection.close()
+            except Exception as e:
+                self._record_failure(replica, e)
+                results.append({"name": replica.name, "healthy": False, "error": str(e)})
+                continue
+            latency_ms = (time.perf_counter() - start) * 1000
+            self._record_success(replica, latency_ms)
+            results.append({"name": replica.name, "healthy": True, "latency_ms": round(latency_ms, 3)})
+        return results
+
+    def close(self):
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "strategy": self.strategy,
+                "primary_reads": self._primary_reads,
+                "sticky_entries": len(self._recent_writes),
+                "replicas": {r.name: r.to_dict(now) for r in self.replicas},
+            }
+
+
+# 当前请求的读路由状态：(调用方标识, 是否允许读副本)；不在请求中时为None
+_request_route: ContextVar[Optional[Tuple[Optional[str], bool]]] = ContextVar("request_route", default=None)
+
+_router: Optional[ReplicaRouter] = None
+_router_lock = threading.Lock()
+
+
+def init_router() -> Optional[ReplicaRouter]:
+    """
+    按DB_REPLICAS创建副本连接池（在应用lifespan启动阶段调用）
+
+    没有配置副本或使用SQLite后端（单个数据库文件，没有副本）时返回None
+    """
+    global _router
+    with _router_lock:
+        if _router is not None or not DB_REPLICAS or STORAGE_CONFIG['backend'] != 'mysql':
+            return _router
+        pool_config = dict(DB_POOL_CONFIG, acquire_timeout=DB_ROUTING_CONFIG['acquire_timeout'])
+        replicas = [(f"{config['host']}:{config['port']}", ConnectionPool(config, **pool_config))
+                    for config in DB_REPLICAS]
+        _router = ReplicaRouter(
+            replicas,
+            strategy=DB_ROUTING_CONFIG['strategy'],
+            sticky_seconds=DB_ROUTING_CONFIG['sticky_seconds'],
+            eject_after_failures=DB_ROUTING_CONFIG['eject_after_failures'],
+            eject_seconds=DB_ROUTING_CONFIG['eject_seconds'],
+        )
+        router = _router
+    for replica in router.replicas:
+        replica.pool.open()
+    return router
+
+
+def get_router() -> Optional[ReplicaRouter]:
+    return _router
+
+
+def close_router():
+    """关闭所有副本连接池（在应用lifespan关闭阶段调用）"""
+    global _router
+    with _router_lock:
+        router, _router = _router, None
+    if router is not None:
+        router.close()
+
+
+def get_read_connection(key: Optional[Hashable] = None) -> Optional[PooledConnection]:
+    """
+    获取只读查询使用的连接，失败时返回None；使用完毕后调用close()归还
+
+    key为被读取数据的标识（如 ("user", 用户ID)），该数据刚被标记写入时读主库
+    """
+    router = _router
+    route = _request_route.get()
+    if router is None or route is None or not route[1] or router.is_sticky(key):
+        return get_db_connection()
+    connection = router.acquire_read()
+    return connection if connection is not None else get_db_connection()
+
+
+def mark_write(key: Hashable):
+    """标记数据刚被写入，sticky_seconds内读取该数据时走主库；没有配置副本时不做任何事"""
+    router = _router
+    if router is not None:
+        router.mark_write(key)
+
+
+def probe_replicas(timeout: float) -> List[Dict]:
+    """健康检查任务调用：ping所有副本（在数据库线程池中执行）"""
+    router = _router
+    return router.probe(timeout) if router is not None else []
+
+
+def router_stats() -> Dict:
+    """读写分离统计信息"""
+    router = _router
+    return router.stats() if router is not None else {}
+
+
+def caller_key(scope: Dict) -> Optional[str]:
+    """写后读的调用方标识：优先使用Authorization头（同一登录会话），否则使用客户端IP"""
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            return "auth:" + value.decode("latin-1")
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else None
+
+
+class ReadRoutingMiddleware:
+    """
+    为每个请求确定是否允许读副本的纯ASGI中间件
+
+    只读方法且调用方近期没有写请求时允许读副本；写请求结束后（无论成功与否）标记调用方，
+    sticky_seconds内该调用方的读取走主库
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        router = _router
+        if scope["type"] != "http" or router is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = caller_key(scope)
+        safe = scope["method"] in SAFE_METHODS
+        token = _request_route.set((key, safe and not router.is_sticky(key)))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_route.reset(token)
+            if not safe:
+                router.mark_write(key)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+健康检查模块
+后台定时探测数据库（主库和只读副本）可达性并缓存结果，/health 直接从内存返回，
+/health/deep 才会实时访问数据库
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Optional
+try:
+    from .config import HEALTH_CONFIG
+    from .db_pool import get_pool, pool_stats
+    from .db_executor import run_db
+    from .db_router import probe_replicas
+    from .repository import ping
+except ImportError:
+    from config import HEALTH_CONFIG
+    from db_pool import get_pool, pool_stats
+    from db_executor import run_db
+    from db_router import probe_replicas
+    from repository import ping
+
+
+def probe_database(timeout: float) -> Dict:
+    """借出一个连接执行 SELECT 1，返回探测结果（在数据库线程池中执行）"""
+    start = time.perf_counter()
+    try:
+        connection = get_pool().acquire(timeout=timeout)
+        try:
+            with connection.cursor() as cursor:
+                ping(cursor)
+        finally:
+            connection.close()
+        return {
+            "healthy": True,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+            "error": None,
+        }
+    except Exception as e:
+        return {
+            "healthy": False,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+            "error": str(e),
+        }
+
+
+class HealthProber:
+    """数据库健康状态后台探测器"""
+
+    def __init__(self, probe_interval: float = 5, probe_timeout: float = 2):
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self._task: Optional[asyncio.Task] = None
+        self._state: Dict = {
+            "healthy": False,
+            "latency_ms": None,
+            "error": "尚未探测",
+            "checked_at": None,
+            "pool": {},
+            "replicas": [],
+        }
+
+    @property
+    def state(self) -> Dict:
+        """最近一次探测结果（只读）"""
+        return self._state
+
+    async def check_now(self) -> Dict:
+        """立即探测一次并更新缓存结果"""
+        result = await run_db(probe_database, self.probe_timeout)
+        result["checked_at"] = datetime.now().isoformat()
+        result["pool"] = pool_stats()
+        # 副本探测结果同时用于摘除/恢复副本和更新最低延迟策略的延迟
+        result["replicas"] = await run_db(probe_replicas, self.probe_timeout)
+        self._state = result
+        return result
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await self.check_now()
+            except Exception as e:
+                print(f"数据库健康探测失败: {e}")
+
+    async def start(self):
+        """先同步探测一次，再启动后台定时探测"""
+        if self._task is not None:
+            return
+        await self.check_now()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+prober = HealthProber(**HEALTH_CONFIG)
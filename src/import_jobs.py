@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+花名册导入任务模块
+上传的CSV先写入临时文件，再由后台任务逐块读取、校验并写入数据库；
+任务的进度和逐行错误在每块提交后写入 import_jobs 表，多个工作进程（uvicorn --workers）
+都能查询到任意进程上运行的任务。运行任务的进程同时在内存中保留任务对象，轮询落到该进程时不查询数据库。
+服务停止时 cancel_job_tasks 取消本进程未完成的任务，任务被标记为失败（已提交的块不会回滚）
+"""
+
+import asyncio
+import csv
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import pymysql
+try:
+    from .config import IMPORT_CONFIG
+    from .db_pool import get_db_connection
+    from .repository import ImportJobRepository
+except ImportError:
+    from config import IMPORT_CONFIG
+    from db_pool import get_db_connection
+    from repository import ImportJobRepository
+
+REQUIRED_COLUMNS = ("username", "password")
+ROSTER_COLUMNS = REQUIRED_COLUMNS + ("email", "phone", "user_type")
+
+
+class RosterFormatError(Exception):
+    """CSV表头缺少必需的列"""
+
+
+class RosterReader:
+    """按块读取花名册CSV，任意时刻只有一个块在内存中"""
+
+    def __init__(self, path: str, chunk_size: int = 500):
+        self.path = path
+        self.chunk_size = chunk_size
+        # utf-8-sig 兼容Excel导出的带BOM文件
+        self._file = open(path, "r", encoding="utf-8-sig", newline="")
+        self._reader = csv.DictReader(self._file)
+        columns = [c.strip() for c in (self._reader.fieldnames or [])]
+        missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+        if missing:
+            self.close()
+            raise RosterFormatError(f"CSV缺少必需的列: {', '.join(missing)}")
+        self._reader.fieldnames = columns
+
+    def next_chunk(self) -> List[Tuple[int, Dict[str, str]]]:
+        """返回下一块 [(行号, 行数据)]，读完时返回空列表；行号从表头所在的第1行开始计数"""
+        rows = []
+        for row in self._reader:
+            rows.append((self._reader.line_num, row))
+            if len(rows) >= self.chunk_size:
+                break
+        return rows
+
+    def close(self):
+        """关闭并删除临时文件"""
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class ImportJob:
+    """一次导入任务的进度与错误报告"""
+
+    def __init__(self, filename: Optional[str] = None, max_errors: int = 1000):
+        self.job_id = uuid.uuid4().hex
+        self.filename = filename
+        self.max_errors = max_errors
+        self.status = "pending"
+        self.processed = 0
+        self.created = 0
+        self.skipped = 0  # 用户名已存在的行（重复导入同一文件时全部跳过）
+        self.failed = 0
+        self.chunks = 0
+        self.errors: List[Dict] = []
+        self.errors_truncated = False
+        self.message: Optional[str] = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def add_error(self, row: int, username: Optional[str], error: str):
+        with self._lock:
+            self.failed += 1
+            if len(self.errors) < self.max_errors:
+                self.errors.append({"row": row, "username": username, "error": error})
+            else:
+                self.errors_truncated = True
+
+    def record_chunk(self, processed: int, created: int, skipped: int):
+        """一个块提交成功后更新计数"""
+        with self._lock:
+            self.chunks += 1
+            self.processed += processed
+            self.created += created
+            self.skipped += skipped
+
+    def finish(self, status: str, message: Optional[str] = None):
+        self.status = status
+        self.message = message
+        self.finished_at = datetime.now()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "filename": self.filename,
+                "status": self.status,
+                "processed": self.processed,
+                "created": self.created,
+                "skipped": self.skipped,
+                "failed": self.failed,
+                "chunks": self.chunks,
+                "errors": list(self.errors),
+                "errors_truncated": self.errors_truncated,
+                "message": self.message,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+    def to_record(self) -> Dict:
+        """import_jobs表的一行，逐行错误保存为JSON"""
+        record = self.to_dict()
+        record["errors"] = json.dumps(record["errors"], ensure_ascii=False)
+        return record
+
+
+def _record_to_dict(record: Dict) -> Dict:
+    """import_jobs表的一行转换为与 ImportJob.to_dict 相同的格式"""
+    job = dict(record)
+    job["errors"] = json.loads(job["errors"]) if job["errors"] else []
+    job["errors_truncated"] = bool(job["errors_truncated"])
+    return job
+
+
+_jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+_tasks = set()  # 保存后台任务的引用，避免被垃圾回收
+
+
+def create_job(filename: Optional[str] = None) -> ImportJob:
+    """登记一个新任务；超过max_jobs时淘汰最早结束的任务"""
+    job = ImportJob(filename, IMPORT_CONFIG['max_errors'])
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+        while len(_jobs) > IMPORT_CONFIG['max_jobs']:
+            finished = next((key for key, j in _jobs.items() if j.done), None)
+            if finished is None:
+                break
+            del _jobs[finished]
+    return job
+
+
+def get_job(job_id: str) -> Optional[ImportJob]:
+    """本进程中的任务；其他进程上运行的任务用load_job从数据库读取"""
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def save_job(job: ImportJob, purge: bool = False) -> bool:
+    """
+    把任务的当前状态写入import_jobs表（数据库操作部分），写入失败时只打印日志
+
+    purge为True时先删除结束超过retention_days天的任务（新任务登记时执行）
+    """
+    connection = get_db_connection()
+    if not connection:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            repository = ImportJobRepository(cursor)
+            if purge:
+                repository.delete_finished_before(datetime.now() - timedelta(days=IMPORT_CONFIG['retention_days']))
+            repository.save(job.to_record())
+        connection.commit()
+        return True
+    except Exception as e:
+        print(f"保存导入任务状态时出错: {e}")
+        return False
+    finally:
+        connection.close()
+
+
+def load_job(job_id: str) -> Optional[Dict]:
+    """从import_jobs表读取任务（数据库操作部分），格式与 ImportJob.to_dict 相同"""
+    connection = get_db_connection()
+    if not connection:
+        raise RuntimeError("数据库连接失败")
+    try:
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            record = ImportJobRepository(cursor).get(job_id)
+    finally:
+        connection.close()
+    return _record_to_dict(record) if record else None
+
+
+def start_job_task(coro) -> asyncio.Task:
+    """在事件循环中启动导入任务，任务引用保存在_tasks中直到结束"""
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def cancel_job_tasks():
+    """取消并等待本进程所有未完成的导入任务（应用关闭时在关闭数据库线程池和连接池之前调用）"""
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
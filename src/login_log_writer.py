@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录日志异步写入模块
+登录请求只把日志放入有界内存队列，由后台线程按批量大小或时间间隔
+合并为多行INSERT写入login_logs，关闭时清空队列保证日志不丢失。
+数据库暂时不可用时，写入失败的日志保留在待重试区（有上限），后台线程按指数退避重试，
+写入成功前不再从队列取新的日志
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+try:
+    from .config import LOGIN_LOG_CONFIG
+    from .db_pool import get_db_connection
+    from .repository import LoginLogRepository
+except ImportError:
+    from config import LOGIN_LOG_CONFIG
+    from db_pool import get_db_connection
+    from repository import LoginLogRepository
+
+# (user_id, login_time, login_ip, user_agent, login_status, failure_reason)
+LoginEvent = Tuple[Optional[int], datetime, str, str, str, Optional[str]]
+
+WRITE_ATTEMPTS = 3
+
+
+def write_login_events(events: List[LoginEvent]):
+    """用一条多行INSERT写入一批登录日志"""
+    connection = get_db_connection()
+    if not connection:
+        raise RuntimeError("数据库连接失败")
+    try:
+        with connection.cursor() as cursor:
+            LoginLogRepository(cursor).insert_batch(events)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+class LoginLogWriter:
+    """登录日志批量写入器"""
+
+    def __init__(self, max_queue_size: int = 10000, batch_size: int = 200,
+                 flush_interval: float = 0.5, enqueue_timeout: float = 0.05,
+                 max_held_events: int = 10000, retry_backoff: float = 0.5, max_retry_backoff: float = 30.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_held_events = max_held_events
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self._queue: "queue.Queue[LoginEvent]" = queue.Queue(maxsize=max_queue_size)
+        # 写入失败、等待重试的日志（按提交顺序，最早的在左侧）
+        self._held: "deque[LoginEvent]" = deque()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "inline_writes": 0,
+            "failed": 0,  # 待重试区超出上限或关闭时仍无法写入而丢弃的日志数
+            "retries": 0,
+            "max_queue_depth": 0,
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="login-log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, event: LoginEvent):
+        """
+        提交一条登录日志
+
+        队列满时最多等待enqueue_timeout秒（背压），仍然放不进去就在当前线程同步写入
+        """
+        if self._thread is None or self._stop.is_set():
+            self._write_inline([event])
+            return
+        try:
+            self._queue.put(event, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self._write_inline([event])
+            return
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats["enqueued"] += 1
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+
+    def _write_inline(self, events: List[LoginEvent]):
+        self._count("inline_writes", len(events))
+        self._flush(events)
+
+    def _next_batch(self) -> List[LoginEvent]:
+        """阻塞直到拿到第一条日志，然后在flush_interval内尽量凑满一批"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0 or self._stop.is_set():
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _written(self, events: List[LoginEvent]):
+        with self._lock:
+            self._stats["written"] += len(events)
+            self._stats["batches"] += 1
+
+    def _flush(self, events: List[LoginEvent]) -> bool:
+        """写入一批日志，连续失败WRITE_ATTEMPTS次后放入待重试区"""
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                write_login_events(events)
+                self._written(events)
+                return True
+            except Exception as e:
+                print(f"写入登录日志失败（第{attempt}次）: {e}")
+                if attempt < WRITE_ATTEMPTS:
+                    time.sleep(0.1 * attempt)
+        self._hold(events)
+        return False
+
+    def _hold(self, events: List[LoginEvent], at_head: bool = False):
+        """放入待重试区；超出max_held_events时丢弃最早的日志"""
+        with self._lock:
+            if at_head:
+                self._held.extendleft(reversed(events))
+            else:
+                self._held.extend(events)
+            dropped = 0
+            while len(self._held) > self.max_held_events:
+                self._held.popleft()
+                dropped += 1
+            self._stats["failed"] += dropped
+        if dropped:
+            print(f"登录日志待重试区已满，丢弃最早的 {dropped} 条日志")
+
+    def _write_held(self) -> bool:
+        """重试待重试区最前面的一批，失败时放回最前面"""
+        with self._lock:
+            batch = [self._held.popleft() for _ in range(min(self.batch_size, len(self._held)))]
+            self._stats["retries"] += 1
+        if not batch:
+            return True
+        try:
+            write_login_events(batch)
+        except Exception as e:
+            print(f"重试写入登录日志失败: {e}")
+            self._hold(batch, at_head=True)
+            return False
+        self._written(batch)
+        return True
+
+    def _has_held(self) -> bool:
+        with self._lock:
+            return bool(self._held)
+
+    def _run(self):
+        backoff = 0.0
+        while not (self._stop.is_set() and self._queue.empty() and not self._has_held()):
+            if self._has_held():
+                if self._write_held():
+                    backoff = 0.0
+                    continue
+                # 数据库仍不可用：退避后重试，期间新日志留在队列中（队列满时由请求线程同步写入）
+                backoff = min(max(backoff * 2, self.retry_backoff), self.max_retry_backoff)
+                if self._stop.wait(backoff):
+                    break
+                continue
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台线程，返回前写完队列中剩余的所有日志"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # 停止过程中仍可能有请求放入队列
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._flush(batch)
+        # 最后再重试一次待重试区，数据库仍不可用时剩余的日志无法保存
+        while self._has_held() and self._write_held():
+            pass
+        with self._lock:
+            lost = len(self._held)
+            self._held.clear()
+            self._stats["failed"] += lost
+        if lost:
+            print(f"停止时数据库仍不可用，{lost} 条登录日志未能写入")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["held"] = len(self._held)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["running"] = self._thread is not None and self._thread.is_alive()
+        return stats
+
+
+_writer: Optional[LoginLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def start_login_log_writer() -> Optional[LoginLogWriter]:
+    """启动全局登录日志写入器（在应用lifespan启动阶段调用）"""
+    global _writer
+    if not LOGIN_LOG_CONFIG['async_enabled']:
+        return None
+    with _writer_lock:
+        if _writer is None:
+            settings = {k: v for k, v in LOGIN_LOG_CONFIG.items() if k != 'async_enabled'}
+            _writer = LoginLogWriter(**settings)
+        _writer.start()
+        return _writer
+
+
+def stop_login_log_writer():
+    """停止全局登录日志写入器并写完剩余日志（在应用lifespan关闭阶段、连接池关闭前调用）"""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+
+def record_login(user_id: Optional[int], login_status: str, failure_reason: Optional[str] = None,
+                 login_ip: str = '127.0.0.1', user_agent: str = 'API Client'):
+    """记录一次登录；写入器未启动时（例如脚本调用）直接同步写入"""
+    event = (user_id, datetime.now(), login_ip, user_agent, login_status, failure_reason)
+    writer = _writer
+    if writer is not None:
+        writer.submit(event)
+        return
+    try:
+        write_login_events([event])
+    except Exception as e:
+        print(f"写入登录日志失败: {e}")
+
+
+def login_log_stats() -> Dict:
+    """全局登录日志写入器统计信息"""
+    if _writer is None:
+        return {}
+    return _writer.stats()
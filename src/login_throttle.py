@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录限流模块
+按用户名和客户端IP分别统计滑动窗口内的登录失败次数，超过阈值后锁定，
+锁定期间的登录请求在访问数据库之前直接拒绝；重复被锁定时锁定时间逐级翻倍。
+每个维度最多跟踪max_entries个键，超出时按LRU淘汰，内存占用有上限
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+try:
+    from .config import LOGIN_THROTTLE_CONFIG
+except ImportError:
+    from config import LOGIN_THROTTLE_CONFIG
+
+
+class _KeyState:
+    __slots__ = ("failures", "locked_until", "strikes", "last_lockout")
+
+    def __init__(self, limit: int):
+        self.failures = deque(maxlen=limit)  # 最近limit次失败的时间
+        self.locked_until = 0.0
+        self.strikes = 0
+        self.last_lockout = 0.0
+
+
+class SlidingWindowLimiter:
+    """单一维度（用户名或IP）的滑动窗口失败计数与锁定"""
+
+    def __init__(self, limit: int = 5, window: float = 300, base_lockout: float = 60,
+                 max_lockout: float = 3600, strike_reset: float = 3600, max_entries: int = 100000):
+        if limit < 1:
+            raise ValueError("limit必须大于0")
+        self.limit = limit
+        self.window = window
+        self.base_lockout = base_lockout
+        self.max_lockout = max_lockout
+        self.strike_reset = strike_reset
+        self.max_entries = max_entries
+        self._states: "OrderedDict[str, _KeyState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"shed": 0, "lockouts": 0, "evictions": 0}
+
+    def retry_after(self, key: str, now: Optional[float] = None) -> float:
+        """key处于锁定状态时返回剩余秒数并计入shed，否则返回0"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or state.locked_until <= now:
+                return 0.0
+            self._states.move_to_end(key)
+            self._stats["shed"] += 1
+            return state.locked_until - now
+
+    def record_failure(self, key: str, now: Optional[float] = None) -> float:
+        """记录一次失败，触发锁定时返回锁定秒数，否则返回0"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                while len(self._states) >= self.max_entries:
+                    self._states.popitem(last=False)
+                    self._stats["evictions"] += 1
+                state = self._states[key] = _KeyState(self.limit)
+            else:
+                self._states.move_to_end(key)
+
+            state.failures.append(now)
+            if len(state.failures) < self.limit or now - state.failures[0] > self.window:
+                return 0.0
+
+            # 窗口内失败达到limit次：锁定，strike_reset内重复锁定时时间翻倍
+            if now - state.last_lockout > self.strike_reset:
+                state.strikes = 0
+            state.strikes += 1
+            duration = min(self.base_lockout * 2 ** (state.strikes - 1), self.max_lockout)
+            state.locked_until = now + duration
+            state.last_lockout = now
+            state.failures.clear()
+            self._stats["lockouts"] += 1
+            return duration
+
+    def reset(self, key: str):
+        """清除key的失败记录（例如登录成功后），保留锁定升级的次数"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                state.failures.clear()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["tracked"] = len(self._states)
+        return stats
+
+
+class LoginThrottle:
+    """组合用户名和IP两个维度的登录限流"""
+
+    def __init__(self, username: Dict, ip: Dict):
+        self.by_username = SlidingWindowLimiter(**username)
+        self.by_ip = SlidingWindowLimiter(**ip)
+
+    @staticmethod
+    def _username_key(username: str) -> str:
+        # users表使用_ci排序规则，大小写不同的用户名是同一个账户
+        return username.strip().casefold()
+
+    def check(self, username: str, ip: str) -> Optional[Tuple[str, float]]:
+        """返回 (被限流的维度, 剩余秒数)，允许登录时返回None"""
+        retry = self.by_ip.retry_after(ip)
+        if retry:
+            return "ip", retry
+        retry = self.by_username.retry_after(self._username_key(username))
+        if retry:
+            return "username", retry
+        return None
+
+    def record_failure(self, username: str, ip: str):
+        self.by_ip.record_failure(ip)
+        self.by_username.record_failure(self._username_key(username))
+
+    def record_success(self, username: str):
+        self.by_username.reset(self._username_key(username))
+
+    def stats(self) -> Dict:
+        return {"username": self.by_username.stats(), "ip": self.by_ip.stats()}
+
+
+_throttle = LoginThrottle(LOGIN_THROTTLE_CONFIG['username'], LOGIN_THROTTLE_CONFIG['ip'])
+
+
+def client_ip(request) -> str:
+    """取得客户端IP；配置信任代理时使用X-Forwarded-For中的第一个地址"""
+    if LOGIN_THROTTLE_CONFIG['trust_forwarded_for']:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def check_login_allowed(username: str, ip: str) -> Optional[Tuple[str, float]]:
+    """登录前调用，返回None表示允许，否则返回 (维度, 剩余秒数)"""
+    if not LOGIN_THROTTLE_CONFIG['enabled']:
+        return None
+    return _throttle.check(username, ip)
+
+
+def record_login_result(username: str, ip: str, success: bool):
+    """登录验证完成后调用，更新失败计数"""
+    if not LOGIN_THROTTLE_CONFIG['enabled']:
+        return
+    if success:
+        _throttle.record_success(username)
+    else:
+        _throttle.record_failure(username, ip)
+
+
+def login_throttle_stats() -> Dict:
+    """登录限流统计信息（shed为被拒绝的请求数）"""
+    return _throttle.stats()
@@ -1,19 +1,55 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Dict, Optional
-import pymysql
-import hashlib
-import os
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 # 导入模块 - 使用绝对导入
 from user_management import router as user_router
 from auth import router as auth_router
 from admin_management import router as admin_router
+from db_pool import init_pool, close_pool
+from db_router import ReadRoutingMiddleware, init_router, close_router, router_stats
+from db_executor import get_executor, shutdown_executor
+from login_log_writer import start_login_log_writer, stop_login_log_writer
+from import_jobs import cancel_job_tasks
+from token_revocation import load_revocations
+from health import prober
+from passwords import HashingBusyError, shutdown_password_hasher, password_hash_stats
+from metrics import CONTENT_TYPE, MetricsMiddleware, registry, render_metrics
+from query_tracking import QueryTrackingMiddleware
+from db_pool import pool_stats
+from db_executor import executor_stats
+from cache import cache_stats
+from login_log_writer import login_log_stats
+from login_throttle import login_throttle_stats
+from token_revocation import revocation_stats
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时创建连接池，关闭时释放所有连接"""
+    init_pool()
+    init_router()
+    get_executor()
+    start_login_log_writer()
+    load_revocations()
+    await prober.start()
+    try:
+        yield
+    finally:
+        await prober.stop()
+        # 导入任务在取消时还要通过数据库线程池保存状态，必须先于线程池和连接池关闭
+        await cancel_job_tasks()
+        stop_login_log_writer()
+        shutdown_executor()
+        shutdown_password_hasher()
+        close_router()
+        close_pool()
 
 # 创建FastAPI应用实例
-app = FastAPI(title="学生数据平台", description="用户登录验证API", version="1.0.0")
+app = FastAPI(title="学生数据平台", description="用户登录验证API", version="1.0.0", lifespan=lifespan)
 
 # 配置CORS中间件
 app.add_middleware(
@@ -25,7 +61,31 @@ app.add_middleware(
 )
 
 # 导入配置 - 使用绝对导入
-from config import DB_CONFIG, API_CONFIG
+from config import DB_REPLICAS, API_CONFIG, METRICS_CONFIG, QUERY_TRACKING_CONFIG
+
+# 请求指标中间件（最后添加的中间件最先执行，计时包含CORS处理）
+if METRICS_CONFIG['enabled']:
+    app.add_middleware(MetricsMiddleware)
+
+# 请求级SQL统计、慢查询日志和可选的 Server-Timing 响应头
+if QUERY_TRACKING_CONFIG['enabled']:
+    app.add_middleware(QueryTrackingMiddleware)
+
+# 读写分离：为每个请求确定读副本还是主库（没有配置只读副本时不添加）
+if DB_REPLICAS:
+    app.add_middleware(ReadRoutingMiddleware)
+
+# /metrics 抓取时读取的各模块统计信息
+for component, source in (("pool", pool_stats), ("executor", executor_stats), ("cache", cache_stats),
+                          ("login_log", login_log_stats), ("login_throttle", login_throttle_stats),
+                          ("password_hash", password_hash_stats), ("revocation", revocation_stats),
+                          ("read_routing", router_stats)):
+    registry.register_stats(component, source)
+
+@app.exception_handler(HashingBusyError)
+async def hashing_busy_handler(request: Request, exc: HashingBusyError):
+    """密码哈希任务排满时快速失败，让客户端稍后重试"""
+    return JSONResponse(status_code=503, content={"detail": "服务繁忙，请稍后重试"}, headers={"Retry-After": "1"})
 
 # 注册路由
 app.include_router(auth_router)
@@ -37,34 +97,48 @@ class HealthResponse(BaseModel):
     status: str
     database: str
     timestamp: str
+    latency_ms: Optional[float] = None
+    checked_at: Optional[str] = None
+    error: Optional[str] = None
+    pool: Optional[Dict[str, Any]] = None
+    replicas: Optional[List[Dict[str, Any]]] = None
+
+def build_health_response(state: Dict) -> HealthResponse:
+    """根据探测结果构造健康检查响应"""
+    return HealthResponse(
+        status="running",
+        database="正常" if state["healthy"] else "异常",
+        timestamp=datetime.now().isoformat(),
+        latency_ms=state["latency_ms"],
+        checked_at=state["checked_at"],
+        error=state["error"],
+        pool=state["pool"],
+        replicas=state.get("replicas")
+    )
 
 @app.get("/")
 async def root():
-    """根路径，返回API信息"""
+    """根路径，返回API信息（数据库状态来自后台探测结果）"""
     return {
         "message": "学生数据平台 - 用户登录验证API", 
         "docs": "/docs",
-        "database": "MySQL连接正常" if get_db_connection() else "MySQL连接失败"
+        "database": "MySQL连接正常" if prober.state["healthy"] else "MySQL连接失败"
     }
 
-def get_db_connection():
-    """获取数据库连接"""
-    try:
-        connection = pymysql.connect(**DB_CONFIG)
-        return connection
-    except Exception as e:
-        print(f"数据库连接失败: {e}")
-        return None
-
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """健康检查接口"""
-    db_status = "正常" if get_db_connection() else "异常"
-    return HealthResponse(
-        status="running",
-        database=db_status,
-        timestamp=datetime.now().isoformat()
-    )
+    """健康检查接口，直接返回后台最近一次探测的结果，不访问数据库"""
+    return build_health_response(prober.state)
+
+@app.get("/health/deep", response_model=HealthResponse)
+async def deep_health_check():
+    """深度健康检查接口，实时探测一次数据库"""
+    return build_health_response(await prober.check_now())
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus文本格式的监控指标（不访问数据库）"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
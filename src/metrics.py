@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控指标模块
+以Prometheus文本格式（0.0.4）输出指标，不依赖prometheus_client：
+- MetricsMiddleware（纯ASGI中间件）按路由模板、方法和状态码统计请求数和延迟直方图，并记录处理中的请求数
+- 每条命名SQL语句的执行耗时直方图（通过 repository.add_statement_listener 记录）
+- 抓取时读取连接池、执行器、缓存等模块已有的 *_stats() 函数，数值项输出为gauge
+
+记录路径只做一次二分查找和几次加法（持锁），开销见 benchmarks/bench_metrics_overhead.py
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+try:
+    from .config import METRICS_CONFIG
+    from .repository import add_statement_listener
+except ImportError:
+    from config import METRICS_CONFIG
+    from repository import add_statement_listener
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """带标签的指标基类，各标签组合的值保存在 _values 中"""
+
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in items]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"] + self._samples()
+
+
+class Counter(Metric):
+    TYPE = "counter"
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple[str, ...] = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+
+class Gauge(Counter):
+    TYPE = "gauge"
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def set(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    """累积直方图；每个标签组合保存 [各桶计数..., 总和, 总数]"""
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets or METRICS_CONFIG['latency_buckets']))
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 3)
+            state[index] += 1  # index == len(buckets) 对应 +Inf 桶
+            state[-2] += value
+            state[-1] += 1
+
+    def snapshot(self, labels: Tuple[str, ...]) -> Optional[Dict]:
+        with self._lock:
+            state = self._values.get(labels)
+            state = list(state) if state else None
+        if state is None:
+            return None
+        return {"count": state[-1], "sum": state[-2]}
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(state)) for labels, state in self._values.items())
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{label_text} {state[-1]}")
+        return lines
+
+
+class Registry:
+    """指标注册表；stats_sources为抓取时调用的 (组件名, 返回dict的函数)"""
+
+    def __init__(self, prefix: str = "sdp"):
+        self.prefix = prefix
+        self._metrics: List[Metric] = []
+        self._stats_sources: List[Tuple[str, Callable[[], Dict]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = ()) -> Histogram:
+        return self.register(Histogram(f"{self.prefix}_{name}", documentation, labelnames, buckets))
+
+    def register_stats(self, component: str, source: Callable[[], Dict]):
+        self._stats_sources.append((component, source))
+
+    def _render_stats(self) -> List[str]:
+        lines = []
+        for component, source in self._stats_sources:
+            try:
+                stats = source()
+            except Exception as e:
+                print(f"读取 {component} 统计信息失败: {e}")
+                continue
+            for key, value in _flatten(stats):
+                name = f"{self.prefix}_{component}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        lines.extend(self._render_stats())
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(stats: Dict, prefix: str = "") -> Iterable[Tuple[str, float]]:
+    """展开嵌套的统计dict，只保留数值和布尔值"""
+    for key, value in stats.items():
+        name = f"{prefix}{key}".replace(".", "_").replace("-", "_")
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}_")
+        elif isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+
+
+registry = Registry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP请求数", ("method", "route", "status"))
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP请求处理时间（秒），含流式响应的发送时间", ("method", "route"))
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "正在处理的HTTP请求数", ("method",))
+db_statement_duration = registry.histogram(
+    "db_statement_duration_seconds", "命名SQL语句的执行时间（秒）", ("statement",))
+db_statement_errors = registry.counter(
+    "db_statement_errors_total", "命名SQL语句执行失败次数", ("statement",))
+
+
+def _observe_statement(name: str, elapsed: float, failed: bool, params):
+    db_statement_duration.observe((name,), elapsed)
+    if failed:
+        db_statement_errors.inc((name,))
+
+
+add_statement_listener(_observe_statement)
+
+
+def route_label(scope: Dict) -> str:
+    """使用路由模板（如 /users/{user_id}）作为标签，避免按实际路径产生无限多的标签组合"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """记录请求数、延迟和处理中请求数的纯ASGI中间件"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500  # 应用抛出异常且未发送响应时按500统计
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = (method,)
+        http_requests_in_flight.inc(in_flight)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec(in_flight)
+            route = route_label(scope)
+            http_requests_total.inc((method, route, str(status)))
+            http_request_duration.observe((method, route), elapsed)
+
+
+def render_metrics() -> str:
+    """以Prometheus文本格式输出全部指标"""
+    return registry.render()
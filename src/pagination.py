@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分页工具模块
+实现基于 (created_at, id) 的游标分页（keyset pagination），
+深翻页时无需扫描并丢弃前面的所有行
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+try:
+    from .cache import count_cache
+except ImportError:
+    from cache import count_cache
+
+
+class InvalidCursorError(ValueError):
+    """分页游标格式错误"""
+
+
+# 列表接口按创建时间排序的两个方向，都由复合索引 (created_at, id) 支持（升序时正向扫描索引）
+KEYSET_ORDER_BY = {
+    "desc": "ORDER BY created_at DESC, id DESC",
+    "asc": "ORDER BY created_at ASC, id ASC",
+}
+DEFAULT_ORDER = "desc"
+
+
+def encode_cursor(row: Dict, order: str = DEFAULT_ORDER) -> str:
+    """根据一页中最后一行生成不透明的游标字符串，游标中记录排序方向"""
+    created_at = row['created_at']
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    position = [created_at, row['id']]
+    if order != DEFAULT_ORDER:
+        position.append(order)
+    payload = json.dumps(position, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    """解析游标字符串，返回 (created_at, id, 排序方向)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(position) == 2:
+            position.append(DEFAULT_ORDER)  # 降序游标不记录方向，与之前签发的游标兼容
+        created_at, row_id, order = position
+        if order not in KEYSET_ORDER_BY:
+            raise ValueError(order)
+        return datetime.fromisoformat(created_at), int(row_id), order
+    except Exception:
+        raise InvalidCursorError("无效的分页游标")
+
+
+def keyset_condition(cursor: str, order: str = DEFAULT_ORDER) -> Tuple[str, List]:
+    """生成按order排序时位于游标之后的行的WHERE条件及参数；游标的排序方向必须与order一致"""
+    created_at, row_id, cursor_order = decode_cursor(cursor)
+    if cursor_order != order:
+        raise InvalidCursorError("分页游标与排序方向不一致")
+    op = "<" if order == "desc" else ">"
+    return (f"(created_at {op} %s OR (created_at = %s AND id {op} %s))",
+            [created_at, created_at, row_id])
+
+
+def split_page(rows: List[Dict], page_size: int, order: str = DEFAULT_ORDER) -> Tuple[List[Dict], Optional[str]]:
+    """
+    截取一页数据并生成下一页游标
+
+    查询时应多取一行（LIMIT page_size + 1），多出的一行只用于判断是否还有下一页
+    """
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1], order)
+    return rows, None
+
+
+def fetch_total(repository, cache_key: tuple, where_clause: str, params: List,
+                include_total: bool = True, estimate_total: bool = False) -> Tuple[Optional[int], bool]:
+    """
+    获取列表总数，返回 (总数, 是否为估算值)；repository为UserRepository或AdminRepository
+
+    - include_total为False时不计算总数，返回None
+    - 优先使用总数缓存中的精确值
+    - estimate_total为True且缓存未命中时，使用EXPLAIN的行数估算代替COUNT(*)
+    - 否则执行COUNT(*)并写入缓存
+    """
+    if not include_total:
+        return None, False
+
+    total = count_cache.get(cache_key)
+    if total is not None:
+        return total, False
+
+    if estimate_total:
+        return repository.estimate_count(where_clause, params), True
+
+    total = repository.count(where_clause, params)
+    count_cache.set(cache_key, total)
+    return total, False
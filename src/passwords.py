@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+密码哈希模块
+统一的密码哈希与验证服务：
+- 算法由 SECURITY_CONFIG['password_hash_algorithm'] 选择（pbkdf2_sha256 / scrypt / sha256）
+- 能验证旧的无盐SHA-256十六进制哈希和新的带盐格式，登录时可判断是否需要升级
+- 慢哈希在独立的进程池中计算，不占用事件循环和GIL；排队任务数有上限
+- 批量哈希（批量创建、导入）使用单独的低优先级进程池，不占用登录验证的进程和排队名额
+
+存储格式:
+    旧格式        <64位十六进制>
+    pbkdf2_sha256$<迭代次数>$<盐>$<哈希>
+    scrypt$<n>$<r>$<p>$<盐>$<哈希>
+盐和哈希使用不带填充的base64编码
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional
+try:
+    from .config import PASSWORD_HASH_CONFIG, SECURITY_CONFIG
+except ImportError:
+    from config import PASSWORD_HASH_CONFIG, SECURITY_CONFIG
+
+LEGACY_ALGORITHM = "sha256"
+HASH_CHUNK_SIZE = 32  # 批量哈希时每个进程任务包含的密码数
+
+
+class HashingBusyError(Exception):
+    """排队的哈希任务达到上限"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _is_legacy(stored: str) -> bool:
+    return len(stored) == 64 and all(c in "0123456789abcdef" for c in stored.lower())
+
+
+def algorithm_of(stored: str) -> Optional[str]:
+    """返回哈希值使用的算法，无法识别时返回None"""
+    if not stored:
+        return None
+    if _is_legacy(stored):
+        return LEGACY_ALGORITHM
+    algorithm = stored.split("$", 1)[0]
+    return algorithm if algorithm in ("pbkdf2_sha256", "scrypt") else None
+
+
+def compute_hash(password: str, algorithm: str, params: Dict) -> str:
+    """计算密码哈希（纯函数，可在子进程中执行）"""
+    data = password.encode("utf-8")
+    if algorithm == LEGACY_ALGORITHM:
+        return hashlib.sha256(data).hexdigest()
+    salt = secrets.token_bytes(params['salt_bytes'])
+    if algorithm == "pbkdf2_sha256":
+        iterations = params['pbkdf2_iterations']
+        digest = hashlib.pbkdf2_hmac("sha256", data, salt, iterations)
+        return f"pbkdf2_sha256${iterations}${_b64encode(salt)}${_b64encode(digest)}"
+    if algorithm == "scrypt":
+        n, r, p = params['scrypt_n'], params['scrypt_r'], params['scrypt_p']
+        digest = hashlib.scrypt(data, salt=salt, n=n, r=r, p=p, maxmem=2 * 128 * r * n + 1024 * 1024)
+        return f"scrypt${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+    raise ValueError(f"不支持的密码哈希算法: {algorithm}")
+
+
+def check_hash(password: str, stored: str) -> bool:
+    """验证密码与存储的哈希是否匹配（纯函数，可在子进程中执行）"""
+    data = password.encode("utf-8")
+    try:
+        algorithm = algorithm_of(stored)
+        if algorithm == LEGACY_ALGORITHM:
+            return hmac.compare_digest(hashlib.sha256(data).hexdigest(), stored.lower())
+        if algorithm == "pbkdf2_sha256":
+            _, iterations, salt, digest = stored.split("$")
+            expected = _b64decode(digest)
+            actual = hashlib.pbkdf2_hmac("sha256", data, _b64decode(salt), int(iterations), len(expected))
+            return hmac.compare_digest(actual, expected)
+        if algorithm == "scrypt":
+            _, n, r, p, salt, digest = stored.split("$")
+            n, r, p = int(n), int(r), int(p)
+            expected = _b64decode(digest)
+            actual = hashlib.scrypt(data, salt=_b64decode(salt), n=n, r=r, p=p,
+                                    maxmem=2 * 128 * r * n + 1024 * 1024, dklen=len(expected))
+            return hmac.compare_digest(actual, expected)
+    except (ValueError, TypeError):
+        pass
+    return False
+
+
+def _hash_chunk(passwords: List[str], algorithm: str, params: Dict) -> List[str]:
+    return [compute_hash(password, algorithm, params) for password in passwords]
+
+
+def _lower_priority(nice: int):
+    """批量哈希进程的初始化函数：降低调度优先级，CPU紧张时让出给登录验证进程"""
+    if nice > 0 and hasattr(os, "nice"):
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+
+
+def needs_rehash(stored: str) -> bool:
+    """存储的哈希不是当前配置的算法或参数时返回True（登录成功后据此升级）"""
+    algorithm = SECURITY_CONFIG['password_hash_algorithm']
+    if algorithm_of(stored) != algorithm:
+        return True
+    if algorithm == "pbkdf2_sha256":
+        return int(stored.split("$")[1]) < PASSWORD_HASH_CONFIG['pbkdf2_iterations']
+    if algorithm == "scrypt":
+        _, n, r, p = stored.split("$")[:4]
+        return (int(n), int(r), int(p)) != (PASSWORD_HASH_CONFIG['scrypt_n'], PASSWORD_HASH_CONFIG['scrypt_r'],
+                                            PASSWORD_HASH_CONFIG['scrypt_p'])
+    return False
+
+
+_dummy_hashes: Dict[tuple, str] = {}
+
+
+def dummy_hash() -> str:
+    """
+    当前算法和参数下格式正确、不对应任何密码的固定哈希（随机的盐和摘要，生成时不做计算）
+
+    用户不存在或未激活时用它验证一次，耗时与验证真实账户相同，登录延迟不会暴露用户名是否存在
+    """
+    algorithm = SECURITY_CONFIG['password_hash_algorithm']
+    params = PASSWORD_HASH_CONFIG
+    key = (algorithm, params['pbkdf2_iterations'], params['scrypt_n'], params['scrypt_r'], params['scrypt_p'])
+    stored = _dummy_hashes.get(key)
+    if stored is None:
+        salt = _b64encode(secrets.token_bytes(params['salt_bytes']))
+        if algorithm == "pbkdf2_sha256":
+            stored = f"pbkdf2_sha256${params['pbkdf2_iterations']}${salt}${_b64encode(secrets.token_bytes(32))}"
+        elif algorithm == "scrypt":
+            stored = (f"scrypt${params['scrypt_n']}${params['scrypt_r']}${params['scrypt_p']}"
+                      f"${salt}${_b64encode(secrets.token_bytes(64))}")
+        else:
+            stored = secrets.token_hex(32)
+        stored = _dummy_hashes.setdefault(key, stored)
+    return stored
+
+
+class PasswordHasher:
+    """
+    进程池密码哈希服务
+
+    旧的SHA-256只需微秒级，直接在调用线程中计算；慢哈希提交到进程池。
+    同时排队的任务超过max_pending时抛出HashingBusyError，避免登录洪峰时无限排队。
+    hash_many的分块提交到另一个bulk_workers个进程的进程池（以bulk_nice降低优先级），
+    单独计数，不会让登录排队或被拒绝
+    """
+
+    def __init__(self, workers: int = 1, max_pending: int = 64, bulk_workers: int = 1, bulk_nice: int = 10):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.bulk_workers = bulk_workers
+        self.bulk_nice = bulk_nice
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._bulk_executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._bulk_pending = 0
+        self._stats = {"hashed": 0, "verified": 0, "rejected": 0}
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # spawn启动的子进程不继承父进程的线程和数据库连接
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _get_bulk_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0 or self.bulk_workers <= 0:
+            return None
+        with self._lock:
+            if self._bulk_executor is None:
+                self._bulk_executor = ProcessPoolExecutor(
+                    self.bulk_workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_lower_priority, initargs=(self.bulk_nice,))
+            return self._bulk_executor
+
+    @staticmethod
+    def _run_inline(func, *args) -> Future:
+        """在当前线程中计算，结果包装为已完成的Future"""
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _submit_bulk(self, func, *args) -> Future:
+        """提交批量任务，只计入批量排队数"""
+        executor = self._get_bulk_executor()
+        if executor is None:
+            return self._run_inline(func, *args)
+        with self._lock:
+            self._bulk_pending += 1
+        future = executor.submit(func, *args)
+        future.add_done_callback(self._bulk_done)
+        return future
+
+    def _bulk_done(self, future: Future):
+        with self._lock:
+            self._bulk_pending -= 1
+
+    def _submit(self, func, *args, inline: bool = False) -> Future:
+        """提交到进程池；inline为True或未配置进程池时在当前线程中计算"""
+        executor = None if inline else self._get_executor()
+        if executor is None:
+            return self._run_inline(func, *args)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise HashingBusyError("密码哈希任务过多")
+            self._pending += 1
+        future = executor.submit(func, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _hash_future(self, password: str) -> Future:
+        algorithm = SECURITY_CONFIG['password_hash_algorithm']
+        self._count("hashed")
+        return self._submit(compute_hash, password, algorithm, dict(PASSWORD_HASH_CONFIG),
+                            inline=algorithm == LEGACY_ALGORITHM)
+
+    def _verify_future(self, password: str, stored: str) -> Future:
+        self._count("verified")
+        return self._submit(check_hash, password, stored or "",
+                            inline=algorithm_of(stored) in (LEGACY_ALGORITHM, None))
+
+    def hash(self, password: str) -> str:
+        """同步计算哈希（在数据库线程或脚本中调用）"""
+        return self._hash_future(password).result()
+
+    def verify(self, password: str, stored: str) -> bool:
+        """同步验证密码"""
+        return self._verify_future(password, stored).result()
+
+    async def hash_async(self, password: str) -> str:
+        """在协程中计算哈希，等待期间不阻塞事件循环"""
+        return await asyncio.wrap_future(self._hash_future(password))
+
+    async def verify_async(self, password: str, stored: str) -> bool:
+        """在协程中验证密码"""
+        return await asyncio.wrap_future(self._verify_future(password, stored))
+
+    def _hash_many_futures(self, passwords: List[str]) -> List[Future]:
+        """
+        批量计算哈希，返回每块一个Future
+
+        按HASH_CHUNK_SIZE分块并行提交到批量进程池，不受max_pending限制，也不占用登录验证的进程；
+        bulk_workers为0时在调用线程中计算
+        """
+        algorithm = SECURITY_CONFIG['password_hash_algorithm']
+        self._count("hashed", len(passwords))
+        params = dict(PASSWORD_HASH_CONFIG)
+        if algorithm == LEGACY_ALGORITHM or self.workers <= 0:
+            return [self._run_inline(_hash_chunk, passwords, algorithm, params)]
+        return [self._submit_bulk(_hash_chunk, passwords[i:i + HASH_CHUNK_SIZE], algorithm, params)
+                for i in range(0, len(passwords), HASH_CHUNK_SIZE)]
+
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        """批量计算哈希（脚本和基准测试使用）"""
+        return [hashed for future in self._hash_many_futures(passwords) for hashed in future.result()]
+
+    async def hash_many_async(self, passwords: List[str]) -> List[str]:
+        """在协程中批量计算哈希（批量创建、导入使用），等待期间不占用数据库线程"""
+        chunks = await asyncio.gather(*(asyncio.wrap_future(f) for f in self._hash_many_futures(passwords)))
+        return [hashed for chunk in chunks for hashed in chunk]
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executors = (self._executor, self._bulk_executor)
+            self._executor = self._bulk_executor = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=wait)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = self._pending
+            stats["bulk_pending"] = self._bulk_pending
+        stats["workers"] = self.workers
+        stats["bulk_workers"] = self.bulk_workers
+        stats["algorithm"] = SECURITY_CONFIG['password_hash_algorithm']
+        return stats
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_CONFIG['workers'], PASSWORD_HASH_CONFIG['max_pending'],
+                                 PASSWORD_HASH_CONFIG['bulk_workers'], PASSWORD_HASH_CONFIG['bulk_nice'])
+dummy_hash()  # 导入时生成，登录路径上不再生成
+
+
+def hash_password(password: str) -> str:
+    """使用当前配置的算法计算密码哈希"""
+    return password_hasher.hash(password)
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """并行计算一批密码的哈希"""
+    return password_hasher.hash_many(passwords)
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """验证密码是否与存储的哈希（新旧格式均可）匹配"""
+    return password_hasher.verify(password, stored)
+
+
+def shutdown_password_hasher():
+    """关闭哈希进程池（在应用lifespan关闭阶段调用）"""
+    password_hasher.shutdown()
+
+
+def password_hash_stats() -> Dict:
+    """密码哈希服务统计信息"""
+    return password_hasher.stats()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+管理员权限模块
+- 权限注册表：每个权限名对应一个固定的位，权限集合用int位掩码表示
+- 数据库中的逗号分隔字符串只解析一次（按字符串缓存），列表接口不再逐行split
+- 每个管理员的位掩码缓存在 cache.permission_cache 中，
+  require_permissions 依赖在缓存命中时只做一次按位与，不访问数据库；
+  更新/删除管理员时由 invalidate_user_caches(admin_id) 清除
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+try:
+    from .config import PERMISSION_CONFIG
+    from .db_executor import run_db
+    from .cache import get_user_row, permission_cache
+    from .auth import bearer_scheme, verify_jwt_token
+except ImportError:
+    from config import PERMISSION_CONFIG
+    from db_executor import run_db
+    from cache import get_user_row, permission_cache
+    from auth import bearer_scheme, verify_jwt_token
+
+# 权限注册表：只能在末尾追加，已有权限的位置不能改变
+PERMISSIONS = (
+    "user_manage",    # 用户增删改查、导入导出
+    "system_config",  # 系统配置
+    "admin_manage",   # 管理员账号管理
+)
+PERMISSION_BITS: Dict[str, int] = {name: 1 << index for index, name in enumerate(PERMISSIONS)}
+ALL_PERMISSIONS = (1 << len(PERMISSIONS)) - 1
+SUPER_ADMIN = "super_admin"  # 该角色级别拥有全部权限
+
+
+class UnknownPermissionError(ValueError):
+    """权限名不在注册表中"""
+
+
+def permission_mask(names: Iterable[str]) -> int:
+    """把权限名列表转换为位掩码，遇到未注册的权限名时抛出UnknownPermissionError"""
+    mask = 0
+    for name in names:
+        bit = PERMISSION_BITS.get(name)
+        if bit is None:
+            raise UnknownPermissionError(f"未知权限: {name}")
+        mask |= bit
+    return mask
+
+
+def permission_names(mask: int) -> List[str]:
+    """把位掩码转换回权限名列表（按注册顺序）"""
+    return [name for name in PERMISSIONS if mask & PERMISSION_BITS[name]]
+
+
+@lru_cache(maxsize=1024)
+def parse_permissions(text: Optional[str]) -> Tuple[Tuple[str, ...], int]:
+    """
+    解析数据库中逗号分隔的权限字符串，返回 (权限名元组, 位掩码)
+
+    管理员的权限组合很少，按字符串缓存后同样的组合只解析一次；
+    未注册的旧权限名保留在名称中但不占位
+    """
+    names = tuple(name for name in (text or "").split(",") if name)
+    mask = 0
+    for name in names:
+        mask |= PERMISSION_BITS.get(name, 0)
+    return names, mask
+
+
+def admin_mask(row: Optional[Dict]) -> int:
+    """由users表的一行计算管理员的有效权限掩码；非管理员或已停用的账号为0"""
+    if not row or row['user_type'] != 'admin' or not row['is_active']:
+        return 0
+    if row['role_level'] == SUPER_ADMIN:
+        return ALL_PERMISSIONS
+    return parse_permissions(row['permissions'])[1]
+
+
+def load_admin_mask(admin_id: int) -> int:
+    """读取管理员权限掩码（阻塞，需在数据库线程中调用；优先读取用户缓存）"""
+    return admin_mask(get_user_row(admin_id))
+
+
+async def get_admin_mask(admin_id: int) -> int:
+    """获取管理员权限掩码：命中缓存时直接返回，未命中时在数据库线程中加载并写入缓存"""
+    mask = permission_cache.get(admin_id)
+    if mask is None:
+        mask = await run_db(permission_cache.get_or_load, admin_id, load_admin_mask)
+    return mask
+
+
+def require_permissions(*names: str):
+    """
+    生成检查管理员权限的FastAPI依赖
+
+    PERMISSION_CONFIG['enforce'] 在创建依赖（即导入路由模块）时读取：
+    为False时返回不做检查、也不声明Bearer认证的依赖，OpenAPI文档中的接口不标记为需要令牌；
+    否则要求 Authorization: Bearer <token> 属于同时拥有全部指定权限的管理员，
+    令牌无效返回401，权限不足返回403
+    """
+    required = permission_mask(names)
+
+    if not PERMISSION_CONFIG['enforce']:
+        async def unchecked() -> None:
+            return None
+
+        return unchecked
+
+    async def dependency(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+    ) -> Optional[Dict]:
+        claims = verify_jwt_token(credentials.credentials) if credentials else None
+        if not claims:
+            raise HTTPException(
+                status_code=401,
+                detail="未登录或令牌已失效",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if claims['user_type'] != 'admin':
+            raise HTTPException(status_code=403, detail="权限不足")
+        try:
+            mask = await get_admin_mask(int(claims['sub']))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"获取管理员权限失败: {str(e)}")
+        if mask & required != required:
+            raise HTTPException(status_code=403, detail="权限不足")
+        return claims
+
+    return dependency
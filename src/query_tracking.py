@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求级SQL统计模块
+- QueryTrackingMiddleware 为每个HTTP请求创建一个 RequestQueries，放在contextvar中；
+  run_db 会把contextvar带到数据库线程，因此请求中执行的每条命名语句都记到该请求名下
+- 记录语句数、数据库总耗时和最慢的语句；开启 server_timing 时在响应头
+  Server-Timing 中返回，浏览器开发者工具可直接显示
+- 单条语句超过 slow_query_ms 时输出慢查询日志：语句名称、参数形态（只记类型和个数，不记录值）和耗时
+"""
+
+import threading
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+try:
+    from .config import QUERY_TRACKING_CONFIG
+    from .repository import add_statement_listener
+except ImportError:
+    from config import QUERY_TRACKING_CONFIG
+    from repository import add_statement_listener
+
+
+class RequestQueries:
+    """一个请求内执行的SQL语句统计（可能在多个数据库线程中更新）"""
+
+    def __init__(self, method: str = "", path: str = ""):
+        self.method = method
+        self.path = path
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.slowest_name: Optional[str] = None
+        self.slowest_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, name: str, elapsed_ms: float, failed: bool = False):
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            if failed:
+                self.errors += 1
+            if elapsed_ms > self.slowest_ms:
+                self.slowest_ms = elapsed_ms
+                self.slowest_name = name
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "errors": self.errors,
+                "total_ms": round(self.total_ms, 3),
+                "slowest": self.slowest_name,
+                "slowest_ms": round(self.slowest_ms, 3),
+            }
+
+    def server_timing(self) -> str:
+        """Server-Timing 头的值：数据库总耗时和最慢的语句"""
+        with self._lock:
+            parts = [f'db;dur={self.total_ms:.1f};desc="{self.count} queries"']
+            if self.slowest_name:
+                parts.append(f'db-slowest;dur={self.slowest_ms:.1f};desc="{self.slowest_name}"')
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+def current_queries() -> Optional[RequestQueries]:
+    """当前请求的SQL统计，不在请求中时返回None"""
+    return _current.get()
+
+
+def params_shape(params) -> str:
+    """描述参数的形态（个数和类型），不包含参数值"""
+    if params is None:
+        return "无参数"
+    if isinstance(params, dict):
+        params = list(params.values())
+    if not isinstance(params, (list, tuple)):
+        return type(params).__name__
+    counts: Dict[str, int] = {}
+    for value in params:
+        name = type(value).__name__
+        counts[name] = counts.get(name, 0) + 1
+    types: List[str] = [f"{name}×{count}" if count > 1 else name for name, count in counts.items()]
+    return f"{len(params)}个({', '.join(types)})"
+
+
+def _on_statement(name: str, elapsed: float, failed: bool, params):
+    elapsed_ms = elapsed * 1000
+    queries = _current.get()
+    if queries is not None:
+        queries.record(name, elapsed_ms, failed)
+    threshold = QUERY_TRACKING_CONFIG['slow_query_ms']
+    if threshold is not None and elapsed_ms >= threshold:
+        where = f" 请求: {queries.method} {queries.path}" if queries is not None else ""
+        print(f"[慢查询] {name} {elapsed_ms:.1f}ms 参数: {params_shape(params)}{where}")
+
+
+add_statement_listener(_on_statement)
+
+
+class QueryTrackingMiddleware:
+    """为每个请求建立SQL统计的纯ASGI中间件，可选在响应头中加入 Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope["method"], scope["path"])
+        token = _current.set(queries)
+
+        if QUERY_TRACKING_CONFIG['server_timing']:
+            async def send_wrapper(message):
+                # 普通响应在处理函数返回后才发送响应头，此时统计已经完整
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", queries.server_timing().encode("latin-1", "replace")))
+                    # 前端与API不同源时，浏览器需要该头才会向页面脚本暴露 Server-Timing
+                    headers.append((b"timing-allow-origin", b"*"))
+                    message = dict(message, headers=headers)
+                await send(message)
+        else:
+            send_wrapper = send
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
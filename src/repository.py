@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据访问模块
+集中管理所有SQL语句，路由和后台任务只通过这里的仓库类访问数据库：
+- 每条语句有一个名称（如 users.get_row），执行时以SQL注释的形式附加在语句末尾，
+  可以在 SHOW PROCESSLIST 和慢查询日志中直接识别
+- 每次执行按名称统计次数、失败次数和耗时（statement_stats）
+- 动态拼接的语句（筛选条件、IN列表、更新字段）由仓库方法生成，仍按固定名称统计
+
+仓库类只包装调用方传入的游标，不负责借出连接和事务，
+连接的借出、提交和回滚仍由调用方按原来的方式处理；
+少数MySQL专有语句（SHOW INDEX、EXPLAIN、IF()、SET SESSION）按游标的dialect使用SQLite写法
+"""
+
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+try:
+    from .storage import SQLITE, cursor_dialect
+except ImportError:
+    from storage import SQLITE, cursor_dialect
+
+_NAME_PATTERN = re.compile(r"^[a-z_]+(\.[a-z_]+)+$")
+
+
+class StatementStats:
+    """按语句名称统计的执行次数和耗时（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {}
+
+    def record(self, name: str, elapsed: float, failed: bool = False):
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed_ms
+            if elapsed_ms > stats["max_ms"]:
+                stats["max_ms"] = elapsed_ms
+            if failed:
+                stats["errors"] += 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            snapshot = {name: dict(stats) for name, stats in self._stats.items()}
+        for stats in snapshot.values():
+            stats["avg_ms"] = round(stats["total_ms"] / stats["calls"], 3) if stats["calls"] else 0.0
+            stats["total_ms"] = round(stats["total_ms"], 3)
+            stats["max_ms"] = round(stats["max_ms"], 3)
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+_statement_stats = StatementStats()
+# 每条语句执行后调用的回调 (名称, 耗时秒数, 是否失败, 参数)，由监控等模块注册
+StatementListener = Callable[[str, float, bool, object], None]
+_listeners: List[StatementListener] = []
+
+
+def add_statement_listener(listener: StatementListener):
+    """注册语句执行回调；回调在执行语句的线程中调用，应当很快返回"""
+    _listeners.append(listener)
+
+
+def tag_sql(name: str, sql: str) -> str:
+    """在语句末尾附加名称注释"""
+    if not _NAME_PATTERN.match(name):
+        raise ValueError(f"无效的语句名称: {name}")
+    return f"{sql.strip()} /* {name} */"
+
+
+def execute(cursor, name: str, sql: str, params=None):
+    """执行一条命名语句并记录耗时，返回 cursor.execute 的返回值"""
+    tagged = tag_sql(name, sql)
+    start = time.perf_counter()
+    failed = True
+    try:
+        result = cursor.execute(tagged, params)
+        failed = False
+        return result
+    finally:
+        elapsed = time.perf_counter() - start
+        _statement_stats.record(name, elapsed, failed)
+        for listener in _listeners:
+            listener(name, elapsed, failed, params)
+
+
+def statement_stats() -> Dict[str, Dict]:
+    """各命名语句的执行统计"""
+    return _statement_stats.snapshot()
+
+
+def reset_statement_stats():
+    _statement_stats.reset()
+
+
+def _placeholders(count: int) -> str:
+    return ", ".join(["%s"] * count)
+
+
+class Repository:
+    """仓库基类，包装一个游标"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.sqlite = cursor_dialect(cursor) == SQLITE
+
+    def _execute(self, name: str, sql: str, params=None):
+        return execute(self.cursor, name, sql, params)
+
+    def _fetchone(self, name: str, sql: str, params=None) -> Optional[Dict]:
+        self._execute(name, sql, params)
+        return self.cursor.fetchone()
+
+    def _fetchall(self, name: str, sql: str, params=None) -> List:
+        self._execute(name, sql, params)
+        return self.cursor.fetchall()
+
+
+# 用户详情缓存保存的列（不含密码）
+USER_ROW_COLUMNS = """id, username, email, phone, user_type, is_active,
+           created_at, updated_at, last_login,
+           real_name, department, role_level, permissions"""
+# 用户列表、导出和更新接口返回的列
+USER_COLUMNS = """id, username, email, phone, user_type, is_active,
+           created_at, updated_at, last_login"""
+# 管理员接口返回的列
+ADMIN_COLUMNS = """id, username, email, phone, real_name, department,
+           role_level, permissions, is_active, created_at,
+           updated_at, last_login"""
+# 批量创建和导入写入的列
+BULK_INSERT_COLUMNS = ("username", "password", "email", "phone", "user_type", "created_at", "updated_at")
+# 允许按值批量查询的列（唯一性检查）
+LOOKUP_COLUMNS = ("username", "email", "phone")
+
+
+class UserRepository(Repository):
+    """users表的语句；list/get/update等方法的作用范围由SCOPE和SCOPE_CONDITION决定"""
+
+    SCOPE = "users"
+    SCOPE_CONDITION = ""
+    COLUMNS = USER_COLUMNS
+
+    # ---- 单行读取 ----
+
+    def get_row(self, user_id: int) -> Optional[Dict]:
+        """读取用户详情缓存使用的整行（不含密码）"""
+        return self._fetchone("users.get_row", f"SELECT {USER_ROW_COLUMNS} FROM users WHERE id = %s",
+                              (user_id,))
+
+    def get(self, user_id: int) -> Optional[Dict]:
+        """读取接口响应所需的列（更新前读取当前行）"""
+        return self._fetchone(f"{self.SCOPE}.get",
+                              f"SELECT {self.COLUMNS} FROM users WHERE id = %s{self.SCOPE_CONDITION}",
+                              (user_id,))
+
+    def get_name(self, user_id: int) -> Optional[Dict]:
+        return self._fetchone(f"{self.SCOPE}.get_name",
+                              f"SELECT id, username FROM users WHERE id = %s{self.SCOPE_CONDITION}",
+                              (user_id,))
+
+    def exists(self, user_id: int) -> bool:
+        return self._fetchone(f"{self.SCOPE}.exists",
+                              f"SELECT id FROM users WHERE id = %s{self.SCOPE_CONDITION}",
+                              (user_id,)) is not None
+
+    def get_password(self, user_id: int) -> Optional[Dict]:
+        return self._fetchone(f"{self.SCOPE}.get_password",
+                              f"SELECT password FROM users WHERE id = %s{self.SCOPE_CONDITION}",
+                              (user_id,))
+
+    def get_login_user(self, username: str) -> Optional[Dict]:
+        """登录时按用户名读取活跃用户（含密码哈希）"""
+        sql = """
+            SELECT id, username, password, user_type, is_active
+            FROM users
+            WHERE username = %s AND is_active = TRUE
+        """
+        return self._fetchone("users.get_login_user", sql, (username,))
+
+    # ---- 列表与总数 ----
+
+    def list_page(self, where_clause: str, params: List, limit_clause: str, order_by: str) -> List[Dict]:
+        """读取一页；where_clause为空或以 WHERE 开头"""
+        sql = f"""
+            SELECT {self.COLUMNS}
+            FROM users{where_clause}
+            {order_by}
+            {limit_clause}
+        """
+        return self._fetchall(f"{self.SCOPE}.list", sql, params)
+
+    def count(self, where_clause: str, params: List) -> int:
+        return self._fetchone(f"{self.SCOPE}.count",
+                              f"SELECT COUNT(*) as total FROM users{where_clause}", params)['total']
+
+    def estimate_count(self, where_clause: str, params: List) -> int:
+        """用EXPLAIN的行数估算总数（SQLite的查询计划不含行数，直接执行COUNT(*)）"""
+        if self.sqlite:
+            return self.count(where_clause, params)
+        plan = self._fetchone(f"{self.SCOPE}.estimate_count",
+                              f"EXPLAIN SELECT id FROM users{where_clause}", params)
+        return int(plan['rows'] or 0) if plan else 0
+
+    @staticmethod
+    def export_sql(columns: Sequence[str], where_clause: str) -> Tuple[str, str]:
+        """返回导出查询的 (语句名称, SQL)，由服务端游标执行"""
+        return "users.export", f"SELECT {', '.join(columns)} FROM users{where_clause} ORDER BY id"
+
+    # ---- 唯一性 ----
+
+    def unique_indexes(self) -> List[Dict]:
+        """唯一索引的 Key_name 和 Column_name（与 SHOW INDEX 的列名相同）"""
+        if self.sqlite:
+            sql = """
+                SELECT il.name AS Key_name, ii.name AS Column_name
+                FROM pragma_index_list('users') AS il, pragma_index_info(il.name) AS ii
+                WHERE il."unique" = 1
+                ORDER BY il.name, ii.seqno
+            """
+            return self._fetchall("users.unique_indexes", sql)
+        return self._fetchall("users.unique_indexes", "SHOW INDEX FROM users WHERE Non_unique = 0")
+
+    def has_index(self, key_name: str) -> bool:
+        """索引是否存在；SQLite的FTS5全文索引是一张虚拟表，按名称在sqlite_master中查找"""
+        if self.sqlite:
+            return self._fetchone("users.has_index",
+                                  "SELECT name FROM sqlite_master WHERE type IN ('index', 'table') AND name = %s",
+                                  (key_name,)) is not None
+        return self._fetchone("users.has_index", "SHOW INDEX FROM users WHERE Key_name = %s",
+                              (key_name,)) is not None
+
+    def find_conflict(self, values: Dict[str, str], exclude_id: Optional[int] = None) -> Optional[Dict]:
+        """一条查询检查多个字段是否与其他用户冲突，返回 {字段: 是否冲突}"""
+        fields = list(values)
+        select_parts = ", ".join(f"MAX({f} = %s) AS {f}" for f in fields)
+        where = " OR ".join(f"{f} = %s" for f in fields)
+        params = list(values.values()) * 2
+        sql = f"SELECT {select_parts} FROM users WHERE ({where})"
+        if exclude_id is not None:
+            sql += " AND id != %s"
+            params.append(exclude_id)
+        return self._fetchone("users.find_conflict", sql, params)
+
+    def find_existing(self, column: str, values: Sequence[str]) -> List[Dict]:
+        """查询column取值在values中的行"""
+        if column not in LOOKUP_COLUMNS:
+            raise ValueError(f"不支持按 {column} 批量查询")
+        return self._fetchall("users.find_existing",
+                              f"SELECT {column} FROM users WHERE {column} IN ({_placeholders(len(values))})",
+                              list(values))
+
+    def ids_by_username(self, usernames: Sequence[str]) -> List[Dict]:
+        return self._fetchall("users.ids_by_username",
+                              f"SELECT id, username FROM users WHERE username IN ({_placeholders(len(usernames))})",
+                              list(usernames))
+
+    # ---- 写入 ----
+
+    def insert(self, fields: Dict) -> int:
+        """插入一行，返回新ID"""
+        sql = f"""
+            INSERT INTO users ({', '.join(fields)})
+            VALUES ({_placeholders(len(fields))})
+        """
+        self._execute(f"{self.SCOPE}.insert", sql, list(fields.values()))
+        return self.cursor.lastrowid
+
+    def insert_many(self, rows: List[Sequence]):
+        """多行INSERT，每行的值按BULK_INSERT_COLUMNS的顺序"""
+        row_placeholder = f"({_placeholders(len(BULK_INSERT_COLUMNS))})"
+        sql = f"""
+            INSERT INTO users ({', '.join(BULK_INSERT_COLUMNS)})
+            VALUES
+        """ + ", ".join([row_placeholder] * len(rows))
+        self._execute("users.insert_many", sql, [value for row in rows for value in row])
+
+    def update_fields(self, user_id: int, changes: Dict) -> int:
+        """更新指定字段（字段名由调用方的模型决定），返回受影响的行数"""
+        sql = f"""
+            UPDATE users
+            SET {', '.join(f'{field} = %s' for field in changes)}
+            WHERE id = %s{self.SCOPE_CONDITION}
+        """
+        return self._execute(f"{self.SCOPE}.update", sql, list(changes.values()) + [user_id])
+
+    def set_active(self, user_id: int, active: bool) -> int:
+        """软删除或恢复，返回受影响的行数"""
+        sql = f"UPDATE users SET is_active = %s, updated_at = %s WHERE id = %s{self.SCOPE_CONDITION}"
+        self._execute(f"{self.SCOPE}.set_active", sql, (active, datetime.now(), user_id))
+        return self.cursor.rowcount
+
+    def set_password(self, user_id: int, hashed_password: str):
+        sql = f"UPDATE users SET password = %s, updated_at = %s WHERE id = %s{self.SCOPE_CONDITION}"
+        self._execute(f"{self.SCOPE}.set_password", sql, (hashed_password, datetime.now(), user_id))
+
+    def replace_password(self, user_id: int, old_hash: str, new_hash: str) -> int:
+        """只有密码仍为old_hash时才替换，返回受影响的行数（0表示密码在读取之后被修改）"""
+        sql = f"""
+            UPDATE users SET password = %s, updated_at = %s
+            WHERE id = %s AND password = %s{self.SCOPE_CONDITION}
+        """
+        self._execute(f"{self.SCOPE}.replace_password", sql, (new_hash, datetime.now(), user_id, old_hash))
+        return self.cursor.rowcount
+
+    def record_login(self, user_id: int, old_hash: str, new_hash: Optional[str]):
+        """更新最后登录时间；new_hash不为空时，只有密码在验证之后没有被修改时才替换哈希"""
+        if new_hash:
+            replace = ("CASE WHEN password = %s THEN %s ELSE password END" if self.sqlite
+                       else "IF(password = %s, %s, password)")
+            sql = f"""
+                UPDATE users SET last_login = %s, password = {replace}
+                WHERE id = %s
+            """
+            self._execute("users.record_login_rehash", sql, (datetime.now(), old_hash, new_hash, user_id))
+        else:
+            self._execute("users.record_login", "UPDATE users SET last_login = %s WHERE id = %s",
+                          (datetime.now(), user_id))
+
+
+class AdminRepository(UserRepository):
+    """只作用于管理员（user_type = 'admin'）的users表语句"""
+
+    SCOPE = "admins"
+    SCOPE_CONDITION = " AND user_type = 'admin'"
+    COLUMNS = ADMIN_COLUMNS
+
+
+class LoginLogRepository(Repository):
+    """login_logs表的语句"""
+
+    COLUMNS = ("user_id", "login_time", "login_ip", "user_agent", "login_status", "failure_reason")
+
+    def insert_batch(self, events: Iterable[Sequence]):
+        """用一条多行INSERT写入一批登录日志，每个事件的值按COLUMNS的顺序"""
+        events = list(events)
+        row_placeholder = f"({_placeholders(len(self.COLUMNS))})"
+        sql = f"""
+            INSERT INTO login_logs ({', '.join(self.COLUMNS)})
+            VALUES
+        """ + ", ".join([row_placeholder] * len(events))
+        self._execute("login_logs.insert_batch", sql, [value for event in events for value in event])
+
+
+class ImportJobRepository(Repository):
+    """import_jobs表的语句（花名册导入任务的状态，所有工作进程共享）"""
+
+    COLUMNS = ("job_id", "filename", "status", "processed", "created", "skipped", "failed", "chunks",
+               "errors", "errors_truncated", "message", "created_at", "finished_at")
+
+    def save(self, fields: Dict):
+        """插入或更新一个任务，fields包含COLUMNS中的所有列"""
+        values = [fields[column] for column in self.COLUMNS]
+        updates = [column for column in self.COLUMNS if column not in ("job_id", "created_at")]
+        if self.sqlite:
+            assignments = ", ".join(f"{column} = excluded.{column}" for column in updates)
+            conflict = f"ON CONFLICT (job_id) DO UPDATE SET {assignments}"
+        else:
+            assignments = ", ".join(f"{column} = VALUES({column})" for column in updates)
+            conflict = f"ON DUPLICATE KEY UPDATE {assignments}"
+        sql = f"""
+            INSERT INTO import_jobs ({', '.join(self.COLUMNS)})
+            VALUES ({_placeholders(len(self.COLUMNS))})
+            {conflict}
+        """
+        self._execute("import_jobs.save", sql, values)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self._fetchone("import_jobs.get",
+                              f"SELECT {', '.join(self.COLUMNS)} FROM import_jobs WHERE job_id = %s", (job_id,))
+
+    def delete_finished_before(self, cutoff: datetime) -> int:
+        """删除结束时间早于cutoff的任务，返回删除的行数"""
+        self._execute("import_jobs.delete_finished", "DELETE FROM import_jobs WHERE finished_at < %s", (cutoff,))
+        return self.cursor.rowcount
+
+
+class SchemaRepository(Repository):
+    """表结构维护语句（update_database.py 使用）"""
+
+    # 管理员字段: 列名 -> 列定义
+    ADMIN_FIELDS = {
+        "real_name": "VARCHAR(100) COMMENT '真实姓名' AFTER phone",
+        "department": "VARCHAR(100) COMMENT '部门' AFTER real_name",
+        "role_level": "ENUM('admin', 'super_admin') DEFAULT 'admin' COMMENT '角色级别' AFTER department",
+        "permissions": "TEXT COMMENT '权限列表（逗号分隔）' AFTER role_level",
+    }
+
+    def describe_users(self) -> List:
+        return self._fetchall("schema.describe_users", "DESCRIBE users")
+
+    def add_user_column(self, column: str):
+        self._execute("schema.add_user_column",
+                      f"ALTER TABLE users ADD COLUMN {column} {self.ADMIN_FIELDS[column]}")
+
+    def reset_admin_role_level(self):
+        self._execute("schema.reset_admin_role_level",
+                      "UPDATE users SET role_level = 'admin' WHERE user_type = 'admin'")
+
+    def set_default_admin_permissions(self, permissions: str):
+        self._execute("schema.set_default_admin_permissions",
+                      "UPDATE users SET permissions = %s WHERE user_type = 'admin'", (permissions,))
+
+    def list_admins(self) -> List:
+        sql = """
+            SELECT id, username, email, real_name, department, role_level, permissions, is_active
+            FROM users
+            WHERE user_type = 'admin'
+        """
+        return self._fetchall("schema.list_admins", sql)
+
+
+def set_session_timeout(cursor, seconds: int):
+    """设置当前连接的 net_write_timeout（长时间导出使用）；SQLite没有网络写超时，不做任何事"""
+    if cursor_dialect(cursor) == SQLITE:
+        return
+    execute(cursor, "session.net_write_timeout", "SET SESSION net_write_timeout = %s", (seconds,))
+
+
+def ping(cursor):
+    """健康检查探测语句"""
+    execute(cursor, "health.ping", "SELECT 1")
+    cursor.fetchone()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户搜索模块
+为 GET /users/ 的search参数构建查询条件：
+关键词足够长时先用ngram全文索引缩小范围，再用原来的LIKE条件复核，
+保证结果与 `LIKE '%关键词%'` 的子串匹配语义完全一致
+
+SQLite后端使用同名的FTS5虚拟表（trigram分词器，见 sql_scripts/add_search_fts5_index_sqlite.sql），
+关键词至少3个字符
+"""
+
+import threading
+from typing import List, Optional, Tuple
+try:
+    from .config import SEARCH_CONFIG
+    from .repository import UserRepository
+    from .storage import SQLITE, cursor_dialect
+except ImportError:
+    from config import SEARCH_CONFIG
+    from repository import UserRepository
+    from storage import SQLITE, cursor_dialect
+
+# 原有的子串匹配条件；参数中的 %、_ 和反斜杠由escape_like转义，MySQL默认以反斜杠为LIKE转义字符
+LIKE_CONDITION = "(username LIKE %s OR email LIKE %s OR phone LIKE %s)"
+# SQLite的LIKE没有默认转义字符，需要显式指定
+SQLITE_LIKE_CONDITION = "(username LIKE %s ESCAPE '\\' OR email LIKE %s ESCAPE '\\' OR phone LIKE %s ESCAPE '\\')"
+FULLTEXT_CONDITION = "MATCH(username, email, phone) AGAINST (%s IN BOOLEAN MODE)"
+FTS5_CONDITION = f"id IN (SELECT rowid FROM {SEARCH_CONFIG['fulltext_index']} WHERE {SEARCH_CONFIG['fulltext_index']} MATCH %s)"
+# trigram分词器按3个字符切分，更短的关键词无法用索引检索
+FTS5_MIN_LENGTH = 3
+
+_fulltext_available: Optional[bool] = None
+_lock = threading.Lock()
+
+
+def fulltext_available(cursor) -> bool:
+    """检查全文索引是否存在，结果在进程内缓存"""
+    global _fulltext_available
+    if not SEARCH_CONFIG['use_fulltext']:
+        return False
+    if _fulltext_available is None:
+        with _lock:
+            if _fulltext_available is None:
+                _fulltext_available = UserRepository(cursor).has_index(SEARCH_CONFIG['fulltext_index'])
+                if not _fulltext_available:
+                    print(f"未找到全文索引 {SEARCH_CONFIG['fulltext_index']}，用户搜索将使用LIKE全表扫描")
+    return _fulltext_available
+
+
+def reset_fulltext_detection():
+    """重新检测全文索引（执行索引迁移脚本后调用）"""
+    global _fulltext_available
+    with _lock:
+        _fulltext_available = None
+
+
+def can_use_fulltext(search: str, min_length: Optional[int] = None) -> bool:
+    """
+    判断关键词能否走全文索引
+
+    ngram短语检索只对由字母、数字（含中文）组成且长度不小于ngram_token_size的关键词
+    与子串匹配等价；含有空白、标点或LIKE通配符的关键词仍使用LIKE
+    """
+    if min_length is None:
+        min_length = SEARCH_CONFIG['ngram_token_size']
+    return len(search) >= min_length and search.isalnum()
+
+
+def escape_like(value: str) -> str:
+    """转义LIKE通配符，使关键词中的 % 和 _ 按字面匹配（转义字符为反斜杠）"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_search_condition(cursor, search: str) -> Tuple[str, List]:
+    """
+    返回search参数对应的WHERE条件及参数
+
+    关键词按字面做子串匹配；只有字母数字组成的关键词才会放进全文检索的短语中，
+    引号、通配符等字符不会进入MATCH参数
+    """
+    like_param = f"%{escape_like(search)}%"
+    like_params = [like_param, like_param, like_param]
+    if cursor_dialect(cursor) == SQLITE:
+        if can_use_fulltext(search, FTS5_MIN_LENGTH) and fulltext_available(cursor):
+            return f"{FTS5_CONDITION} AND {SQLITE_LIKE_CONDITION}", [f'"{search}"'] + like_params
+        return SQLITE_LIKE_CONDITION, like_params
+    if can_use_fulltext(search) and fulltext_available(cursor):
+        return f"{FULLTEXT_CONDITION} AND {LIKE_CONDITION}", [f'"{search}"'] + like_params
+    return LIKE_CONDITION, like_params
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应序列化模块
+列表和详情接口直接由数据库行（dict）构造响应：用响应模型校验一次，再由pydantic-core编码为JSON字节，
+返回的 Response 不再经过FastAPI按 response_model 的二次校验和序列化。
+路由上仍声明 response_model，OpenAPI文档保持不变。
+
+与逐行构造模型再交给FastAPI相比的耗时见 benchmarks/bench_serialization.py
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Type
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def model_json(model: Type[BaseModel], data: Dict[str, Any]) -> bytes:
+    """按model校验data（嵌套的行也是dict）并编码为JSON字节；行中多余的列会被忽略"""
+    adapter = _adapter(model)
+    return adapter.dump_json(adapter.validate_python(data))
+
+
+def model_response(model: Type[BaseModel], data: Dict[str, Any], status_code: int = 200) -> Response:
+    """构造已编码的JSON响应，校验失败时抛出 pydantic.ValidationError"""
+    return Response(model_json(model, data), status_code=status_code, media_type=JSON_MEDIA_TYPE)
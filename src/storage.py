@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储后端模块
+连接池通过后端对象建立和检查连接，应用代码（仓库类、路由）不区分具体数据库：
+- MySQLBackend：原有的pymysql连接（默认）
+- SQLiteBackend：嵌入式SQLite（WAL模式），用于单机部署、离线环境和CI。首次连接时按
+  sql_scripts/create_user_auth_database_sqlite.sql 建表，并尝试创建FTS5全文索引
+  （add_search_fts5_index_sqlite.sql，需要SQLite 3.34+的trigram分词器，不可用时搜索使用LIKE）
+  以及花名册导入任务表（add_import_jobs_table_sqlite.sql）
+
+SQLite连接被包装成与pymysql相同的用法：cursor(DictCursor)返回dict行，语句中的 %s 占位符
+转换为 ?，begin/commit/rollback、lastrowid/rowcount 语义相同；唯一约束冲突等错误转换为
+pymysql.err 中对应的异常（唯一约束冲突为1062），调用方原有的异常处理不需要修改。
+少数MySQL专有语句（SHOW INDEX、EXPLAIN、IF()、全文检索）在 repository.py 和 search.py 中按
+cursor.dialect 选择SQLite写法
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional
+import pymysql
+from pymysql.constants import SERVER_STATUS
+try:
+    from .config import DB_CONFIG, STORAGE_CONFIG
+except ImportError:
+    from config import DB_CONFIG, STORAGE_CONFIG
+
+MYSQL = "mysql"
+SQLITE = "sqlite"
+BACKENDS = (MYSQL, SQLITE)
+
+SQL_SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sql_scripts")
+SQLITE_SCHEMA_SCRIPT = "create_user_auth_database_sqlite.sql"
+SQLITE_FTS_SCRIPT = "add_search_fts5_index_sqlite.sql"
+SQLITE_IMPORT_JOBS_SCRIPT = "add_import_jobs_table_sqlite.sql"
+
+
+class StorageBackend:
+    """存储后端基类：建立原始连接，并提供连接池需要的状态检查"""
+
+    name = ""
+
+    def connect(self):
+        raise NotImplementedError
+
+    def in_transaction(self, raw) -> bool:
+        raise NotImplementedError
+
+    def is_open(self, raw) -> bool:
+        raise NotImplementedError
+
+    def ping(self, raw):
+        raise NotImplementedError
+
+
+class MySQLBackend(StorageBackend):
+    """pymysql连接"""
+
+    name = MYSQL
+
+    def __init__(self, db_config: Dict):
+        self.db_config = dict(db_config)
+
+    def connect(self):
+        return pymysql.connect(**self.db_config)
+
+    def in_transaction(self, raw) -> bool:
+        return bool(raw.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+
+    def is_open(self, raw) -> bool:
+        return raw.open
+
+    def ping(self, raw):
+        raw.ping(reconnect=False)
+
+
+# ----- SQLite -----
+
+def _adapt_datetime(value: datetime) -> str:
+    # 与MySQL TIMESTAMP一样精确到秒，游标分页的等值比较依赖统一的格式
+    return value.replace(microsecond=0).isoformat(" ")
+
+
+def _convert_timestamp(value: bytes) -> datetime:
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_converter("TIMESTAMP", _convert_timestamp)
+sqlite3.register_converter("BOOLEAN", lambda value: value not in (b"0", b""))
+
+
+@lru_cache(maxsize=1024)
+def translate_placeholders(sql: str) -> str:
+    """把pymysql的 %s 占位符转换为SQLite的 ?（仓库中的语句不在字符串字面量里使用 %s）"""
+    return sql.replace("%s", "?")
+
+
+_UNIQUE_FAILED = re.compile(r"UNIQUE constraint failed: ([\w.]+)")
+# SQLite约束错误 -> MySQL错误码
+_INTEGRITY_CODES = (
+    ("NOT NULL constraint failed", 1048),
+    ("FOREIGN KEY constraint failed", 1452),
+    ("CHECK constraint failed", 3819),
+)
+
+
+def _translate_error(error: sqlite3.Error) -> pymysql.err.MySQLError:
+    """把sqlite3异常转换为调用方已经在处理的pymysql异常"""
+    message = str(error)
+    if isinstance(error, sqlite3.IntegrityError):
+        match = _UNIQUE_FAILED.search(message)
+        if match:
+            # 与MySQL的 "Duplicate entry ... for key 'users.email'" 格式一致，供 duplicate_field 解析
+            return pymysql.err.IntegrityError(1062, f"Duplicate entry for key '{match.group(1)}'")
+        code = next((code for prefix, code in _INTEGRITY_CODES if message.startswith(prefix)), 1062)
+        return pymysql.err.IntegrityError(code, message)
+    if isinstance(error, sqlite3.OperationalError):
+        return pymysql.err.OperationalError(2013 if "locked" in message else 1105, message)
+    if isinstance(error, sqlite3.ProgrammingError):
+        return pymysql.err.ProgrammingError(1064, message)
+    return pymysql.err.DatabaseError(1105, message)
+
+
+def _dict_row(cursor: sqlite3.Cursor, row: tuple) -> Dict:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    """与pymysql游标用法相同的SQLite游标；dialect供仓库类选择SQLite专用语句"""
+
+    dialect = SQLITE
+
+    def __init__(self, raw: sqlite3.Cursor, as_dict: bool):
+        self._raw = raw
+        if as_dict:
+            raw.row_factory = _dict_row
+
+    def execute(self, sql: str, params=None) -> int:
+        """执行语句，返回受影响的行数（与pymysql一致）"""
+        try:
+            self._raw.execute(translate_placeholders(sql), tuple(params) if params else ())
+        except sqlite3.Error as e:
+            raise _translate_error(e) from e
+        return max(self._raw.rowcount, 0)
+
+    def executemany(self, sql: str, seq_of_params) -> int:
+        try:
+            self._raw.executemany(translate_placeholders(sql), [tuple(params) for params in seq_of_params])
+        except sqlite3.Error as e:
+            raise _translate_error(e) from e
+        return max(self._raw.rowcount, 0)
+
+    def fetchone(self):
+        return self._raw.fetchone()
+
+    def fetchall(self):
+        return self._raw.fetchall()
+
+    def fetchmany(self, size: int):
+        return self._raw.fetchmany(size)
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._raw.rowcount
+
+    def close(self):
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SQLiteConnection:
+    """与pymysql连接用法相同的SQLite连接（自动提交模式，begin()开启显式事务）"""
+
+    dialect = SQLITE
+
+    def __init__(self, raw: sqlite3.Connection):
+        self._raw = raw
+        self.open = True
+
+    def cursor(self, cursorclass=None) -> SQLiteCursor:
+        as_dict = cursorclass is not None and issubclass(cursorclass, pymysql.cursors.DictCursorMixin)
+        return SQLiteCursor(self._raw.cursor(), as_dict)
+
+    def begin(self):
+        # IMMEDIATE在事务开始时取得写锁，避免读锁升级为写锁时因并发写入失败
+        self._raw.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        if self._raw.in_transaction:
+            self._raw.commit()
+
+    def rollback(self):
+        if self._raw.in_transaction:
+            self._raw.rollback()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._raw.in_transaction
+
+    def ping(self, reconnect: bool = False):
+        try:
+            self._raw.execute("SELECT 1").fetchone()
+        except sqlite3.Error as e:
+            raise _translate_error(e) from e
+
+    def close(self):
+        if self.open:
+            self.open = False
+            self._raw.close()
+
+
+class SQLiteBackend(StorageBackend):
+    """嵌入式SQLite数据库文件（WAL模式：读不阻塞写，同一时间只有一个写事务）"""
+
+    name = SQLITE
+
+    def __init__(self, path: str, busy_timeout: float = 5.0, synchronous: str = "NORMAL"):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.synchronous = synchronous
+        self.fts_available: Optional[bool] = None
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        raw = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                              detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        raw.execute("PRAGMA journal_mode = WAL")
+        raw.execute(f"PRAGMA synchronous = {self.synchronous}")
+        raw.execute("PRAGMA foreign_keys = ON")
+        return raw
+
+    def initialize(self):
+        """数据库文件中还没有users表时执行建表脚本（只在首次连接时检查）"""
+        with self._lock:
+            if self._initialized:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            raw = self._open()
+            try:
+                exists = raw.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'").fetchone()
+                if not exists:
+                    raw.executescript(_read_script(SQLITE_SCHEMA_SCRIPT))
+                    print(f"已在 {self.path} 创建SQLite数据库表")
+                # 导入任务表晚于其他表加入，已有的数据库文件也要补建
+                jobs = raw.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'import_jobs'").fetchone()
+                if not jobs:
+                    raw.executescript(_read_script(SQLITE_IMPORT_JOBS_SCRIPT))
+                fts = raw.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ft_users_search'").fetchone()
+                if not fts:
+                    try:
+                        raw.executescript(_read_script(SQLITE_FTS_SCRIPT))
+                        fts = True
+                    except sqlite3.Error as e:
+                        if raw.in_transaction:
+                            raw.rollback()
+                        print(f"无法创建FTS5全文索引（{e}），用户搜索将使用LIKE")
+                self.fts_available = bool(fts)
+            finally:
+                raw.close()
+            self._initialized = True
+
+    def connect(self) -> SQLiteConnection:
+        self.initialize()
+        return SQLiteConnection(self._open())
+
+    def in_transaction(self, raw: SQLiteConnection) -> bool:
+        return raw.in_transaction
+
+    def is_open(self, raw: SQLiteConnection) -> bool:
+        return raw.open
+
+    def ping(self, raw: SQLiteConnection):
+        raw.ping()
+
+
+def _read_script(name: str) -> str:
+    with open(os.path.join(SQL_SCRIPTS_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def create_backend(name: Optional[str] = None, db_config: Optional[Dict] = None,
+                   sqlite_path: Optional[str] = None) -> StorageBackend:
+    """按名称创建后端，参数未提供时使用 STORAGE_CONFIG / DB_CONFIG"""
+    name = name or STORAGE_CONFIG['backend']
+    if name == MYSQL:
+        return MySQLBackend(db_config or DB_CONFIG)
+    if name == SQLITE:
+        return SQLiteBackend(sqlite_path or STORAGE_CONFIG['sqlite_path'],
+                             busy_timeout=STORAGE_CONFIG['sqlite_busy_timeout'],
+                             synchronous=STORAGE_CONFIG['sqlite_synchronous'])
+    raise ValueError(f"存储后端必须是: {', '.join(BACKENDS)}")
+
+
+def use_backend(name: str, sqlite_path: Optional[str] = None):
+    """切换之后创建的全局连接池使用的后端（基准测试脚本在init_pool之前调用）"""
+    if name not in BACKENDS:
+        raise ValueError(f"存储后端必须是: {', '.join(BACKENDS)}")
+    STORAGE_CONFIG['backend'] = name
+    if sqlite_path:
+        STORAGE_CONFIG['sqlite_path'] = sqlite_path
+
+
+def cursor_dialect(cursor) -> str:
+    """游标所属的数据库类型；pymysql游标没有dialect属性"""
+    return getattr(cursor, "dialect", MYSQL)
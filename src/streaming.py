@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式导出模块
+用无缓冲的服务端游标（SSDictCursor）逐批读取查询结果，编码为CSV或NDJSON
+（可选gzip压缩）后交给StreamingResponse发送，内存占用与结果行数无关
+"""
+
+import csv
+import io
+import json
+import threading
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+import pymysql
+try:
+    from .config import EXPORT_CONFIG
+    from .db_executor import get_executor, run_db
+    from .repository import execute, set_session_timeout
+except ImportError:
+    from config import EXPORT_CONFIG
+    from db_executor import get_executor, run_db
+    from repository import execute, set_session_timeout
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _export_value(value):
+    """把数据库值转换为可写入CSV/JSON的值"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+class CursorStream:
+    """
+    流式导出的同步部分，所有方法都在数据库线程池中调用
+
+    持有借出的连接直到读完或中止：读完时正常归还连接，
+    中止时（客户端断开）结果集没有读完，连接状态不可信，直接丢弃
+    """
+
+    def __init__(self, connection, columns: Sequence[str], fmt: str,
+                 fetch_size: int = 1000, gzip_level: Optional[int] = None,
+                 bool_columns: Sequence[str] = ()):
+        self.connection = connection
+        self.columns = list(columns)
+        self.fmt = fmt
+        self.fetch_size = fetch_size
+        self.bool_columns = set(bool_columns)
+        self.rows = 0
+        self._cursor = None
+        self._lock = threading.Lock()
+        self._finished = False
+        self._header_sent = False
+        self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31) if gzip_level is not None else None
+
+    def execute(self, name: str, sql: str, params: List):
+        """执行查询；失败时丢弃连接并抛出异常（此时还没有开始发送响应）"""
+        try:
+            with self.connection.cursor() as cursor:
+                set_session_timeout(cursor, EXPORT_CONFIG['net_write_timeout'])
+            self._cursor = self.connection.cursor(pymysql.cursors.SSDictCursor)
+            execute(self._cursor, name, sql, params)
+        except Exception:
+            self.abort()
+            raise
+
+    def _encode(self, rows: List[Dict]) -> str:
+        if self.fmt == "ndjson":
+            return "".join(
+                json.dumps({c: self._value(c, row[c]) for c in self.columns}, ensure_ascii=False) + "\n"
+                for row in rows
+            )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not self._header_sent:
+            writer.writerow(self.columns)
+            self._header_sent = True
+        writer.writerows([self._value(c, row[c]) for c in self.columns] for row in rows)
+        return buffer.getvalue()
+
+    def _value(self, column: str, value):
+        if column in self.bool_columns and value is not None:
+            return bool(value)
+        return _export_value(value)
+
+    def next_chunk(self) -> Optional[bytes]:
+        """读取并编码下一批行，全部读完后返回None"""
+        with self._lock:
+            if self._finished:
+                return None
+            rows = self._cursor.fetchmany(self.fetch_size)
+            if rows or (self.fmt == "csv" and not self._header_sent):
+                self.rows += len(rows)
+                data = self._encode(rows).encode("utf-8")
+                return self._compressor.compress(data) if self._compressor else data
+            self._finished = True
+            self._cursor.close()
+            self.connection.close()
+            if self._compressor:
+                return self._compressor.flush()
+            return None
+
+    def abort(self):
+        """中止导出并丢弃连接（会等待正在进行的读取结束）"""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            self.connection.invalidate()
+
+
+async def iter_stream(stream: CursorStream) -> AsyncIterator[bytes]:
+    """
+    StreamingResponse使用的异步迭代器
+
+    每一批都在数据库线程池中读取和编码；客户端断开导致迭代被取消时，
+    在线程池中中止流并丢弃连接（不能在已取消的协程里再await）
+    """
+    try:
+        while True:
+            chunk = await run_db(stream.next_chunk)
+            if chunk is None:
+                return
+            if chunk:
+                yield chunk
+    finally:
+        if not stream._finished:
+            try:
+                get_executor().submit(stream.abort)
+            except RuntimeError:  # 线程池已关闭
+                stream.abort()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存测试脚本
+验证LRU缓存的淘汰顺序、TTL过期、加载期间失效时不写回旧数据，
+以及更新、删除用户和登录成功后用户详情缓存失效、该用户行标记为刚写入
+（读写分离时随后的读取走主库；在临时SQLite数据库上执行）
+"""
+
+import threading
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import auth
+import cache
+import user_management
+from cache import LRUCache, TTLCache, get_user_row, user_cache
+
+
+class FakeClock:
+    """替换cache模块使用的time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", fake.monotonic)
+    return fake
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=3, ttl=60)
+    for key in "abc":
+        lru.set(key, key.upper())
+    assert lru.get("a") == "A"  # a变为最近使用
+    lru.set("d", "D")
+    assert lru.get("b") is None
+    assert [lru.get(key) for key in "acd"] == ["A", "C", "D"]
+
+    lru.set("e", "E")  # 此时最久未使用的是a
+    assert lru.get("a") is None
+    stats = lru.stats()
+    assert stats["evictions"] == 2 and stats["size"] == 3
+
+
+def test_lru_entries_expire(clock):
+    lru = LRUCache(max_entries=10, ttl=30)
+    lru.set("a", 1)
+    clock.now += 29
+    assert lru.get("a") == 1
+    # 命中不延长有效期
+    clock.now += 1
+    assert lru.get("a") is None
+    assert lru.stats()["expirations"] == 1 and len(lru) == 0
+
+
+def test_ttl_cache_expires_and_evicts_oldest(clock):
+    ttl = TTLCache(ttl=10, max_entries=2)
+    ttl.set("a", 1)
+    ttl.set("b", 2)
+    ttl.set("c", 3)
+    assert ttl.get("a") is None and ttl.get("b") == 2
+    clock.now += 10
+    assert ttl.get("b") is None and ttl.get("c", "missing") == "missing"
+
+
+def test_get_or_load_caches_result():
+    lru = LRUCache(max_entries=10, ttl=60)
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        return {"id": key}
+
+    assert lru.get_or_load(1, loader) == {"id": 1}
+    assert lru.get_or_load(1, loader) == {"id": 1}
+    assert calls == [1]
+    # 不存在的行（None）不缓存
+    assert lru.get_or_load(2, lambda key: None) is None
+    assert len(lru) == 1
+
+
+def test_invalidate_during_load_does_not_store_stale_row():
+    lru = LRUCache(max_entries=10, ttl=60)
+    loading, invalidated = threading.Event(), threading.Event()
+
+    def slow_loader(key):
+        loading.set()
+        invalidated.wait(5)
+        return {"id": key, "username": "old_name"}
+
+    result = {}
+    reader = threading.Thread(target=lambda: result.update(row=lru.get_or_load(7, slow_loader)))
+    reader.start()
+    assert loading.wait(5)
+    lru.invalidate(7)  # 加载期间用户被修改
+    invalidated.set()
+    reader.join(5)
+
+    # 本次调用仍返回读到的行，但不写入缓存，下一次读取重新加载
+    assert result["row"]["username"] == "old_name"
+    assert lru.get(7) is None
+    assert lru.get_or_load(7, lambda key: {"id": key, "username": "new_name"})["username"] == "new_name"
+
+
+def test_clear_during_load_does_not_store_stale_row():
+    lru = LRUCache(max_entries=10, ttl=60)
+
+    def loader(key):
+        lru.clear()
+        return {"id": key}
+
+    lru.get_or_load(1, loader)
+    assert len(lru) == 0
+
+
+def test_update_and_delete_invalidate_user_cache(backend):
+    assert get_user_row(4)["username"] == "student_wang"
+    assert user_cache.get(4) is not None
+
+    user_management._update_user(4, user_management.UserUpdate(username="student_wang2"))
+    assert user_cache.get(4) is None
+    assert get_user_row(4)["username"] == "student_wang2"
+
+    user_management._delete_user(4)
+    assert user_cache.get(4) is None
+    assert get_user_row(4)["is_active"] in (False, 0)
+
+
+def test_login_invalidates_user_cache_and_marks_write(backend, monkeypatch):
+    writes = []
+    monkeypatch.setattr(cache, "mark_write", writes.append)
+    cache.count_cache.set("users", 6)
+    assert get_user_row(4)["last_login"] is None
+
+    auth._complete_login(4, "old_hash", None)
+    assert user_cache.get(4) is None and writes == [("user", 4)]
+    assert get_user_row(4)["last_login"] is not None
+    # 登录不改变总数
+    assert cache.count_cache.get("users") == 6
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
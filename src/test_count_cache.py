@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列表总数缓存测试脚本
+验证缓存键覆盖所有筛选条件、缓存条目按TTL过期，
+以及创建、更新、删除和导入用户后总数缓存失效（在临时SQLite数据库上执行）
+"""
+
+import asyncio
+import json
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import admin_management
+import cache
+import pagination
+import passwords
+import user_management
+from cache import count_cache, count_cache_key
+from import_jobs import RosterReader, create_job
+from pagination import fetch_total
+
+
+class FakeRepository:
+    """记录COUNT(*)和EXPLAIN估算的调用次数"""
+
+    def __init__(self, total=10, estimate=12):
+        self.total = total
+        self.estimate = estimate
+        self.counts = 0
+        self.estimates = 0
+
+    def count(self, where_clause, params):
+        self.counts += 1
+        return self.total
+
+    def estimate_count(self, where_clause, params):
+        self.estimates += 1
+        return self.estimate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_cache_key_normalizes_filters():
+    key = count_cache_key("users", user_type="student", is_active=True, search="wang")
+    assert key == count_cache_key("users", search="wang", is_active=True, user_type="student")
+    # 未提供的条件不影响键
+    assert count_cache_key("users", user_type=None, search="") == count_cache_key("users")
+    # is_active=False 是有效的筛选条件
+    assert count_cache_key("users", is_active=False) != count_cache_key("users")
+    assert count_cache_key("users", is_active=False) != count_cache_key("users", is_active=True)
+    assert count_cache_key("users", user_type="student") != count_cache_key("admins", user_type="student")
+
+
+def test_fetch_total_uses_cache_until_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(pagination, "count_cache", cache.TTLCache(ttl=30))
+
+    repository = FakeRepository()
+    key = count_cache_key("users", user_type="student")
+    assert fetch_total(repository, key, "", []) == (10, False)
+    assert fetch_total(repository, key, "", []) == (10, False)
+    assert repository.counts == 1
+
+    clock.now += 30
+    repository.total = 11
+    assert fetch_total(repository, key, "", []) == (11, False)
+    assert repository.counts == 2
+
+
+def test_fetch_total_opt_out_and_estimate(monkeypatch):
+    monkeypatch.setattr(pagination, "count_cache", cache.TTLCache(ttl=30))
+    repository = FakeRepository()
+    key = count_cache_key("users")
+    assert fetch_total(repository, key, "", [], include_total=False) == (None, False)
+    assert fetch_total(repository, key, "", [], estimate_total=True) == (12, True)
+    # 估算值不写入缓存；之后的精确总数写入缓存，再请求估算时直接返回精确值
+    assert fetch_total(repository, key, "", []) == (10, False)
+    assert fetch_total(repository, key, "", [], estimate_total=True) == (10, False)
+    assert (repository.counts, repository.estimates) == (1, 1)
+
+
+def user_total(**filters):
+    params = dict(page=1, page_size=1, user_type=None, is_active=None, search=None, page_cursor=None)
+    params.update(filters)
+    return json.loads(user_management._get_users(**params).body)["total"]
+
+
+def admin_total(role_level=None, department=None, is_active=None):
+    body = admin_management._get_admins(1, 1, role_level, department, is_active, None).body
+    return json.loads(body)["total"]
+
+
+def test_every_filter_gets_its_own_entry(backend):
+    totals = [
+        user_total(),
+        user_total(user_type="student"),
+        user_total(user_type="teacher"),
+        user_total(is_active=True),
+        user_total(is_active=False),
+        user_total(search="school"),
+        user_total(user_type="teacher", search="school"),
+        admin_total(),
+        admin_total(role_level="super_admin"),
+        admin_total(department="信息中心"),
+        admin_total(is_active=False),
+    ]
+    assert totals == [6, 3, 2, 6, 0, 2, 2, 1, 0, 0, 0]
+    assert len(count_cache) == len(totals)
+
+
+def test_create_update_delete_invalidate_totals(backend):
+    assert user_total(user_type="student") == 3
+    user_management._create_user(user_management.UserCreate(username="stu_new", password="pw"),
+                                 passwords.hash_password("pw"))
+    assert len(count_cache) == 0
+    assert user_total(user_type="student") == 4
+
+    user_management._update_user(7, user_management.UserUpdate(user_type="teacher"))
+    assert user_total(user_type="student") == 3
+
+    assert user_total(is_active=True) == 7
+    user_management._delete_user(7)
+    assert user_total(is_active=True) == 6
+
+
+def test_import_invalidates_totals(backend, tmp_path):
+    path = tmp_path / "roster.csv"
+    path.write_text("username,password\nstu_x,pw\nstu_y,pw\n", encoding="utf-8")
+    assert user_total() == 6
+
+    async def run_import():
+        await user_management._run_import(create_job("roster.csv"), RosterReader(str(path), chunk_size=10))
+    asyncio.run(run_import())
+    assert user_total() == 8
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
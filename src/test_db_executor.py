@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库执行层测试脚本
+验证慢查询在数据库线程池中执行时不会阻塞并发的 /health 请求
+"""
+
+import asyncio
+import json
+import time
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import main
+import cache
+import user_management
+
+SLOW_QUERY_SECONDS = 0.5
+
+
+class FakeCursor:
+    """模拟pymysql游标，execute耗时由delay指定"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        time.sleep(self.delay)
+
+    def fetchone(self):
+        return {
+            "id": 1, "username": "slow_user", "email": None, "phone": None,
+            "user_type": "student", "is_active": True,
+            "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00",
+            "last_login": None,
+        }
+
+
+class FakeConnection:
+    """模拟连接池借出的连接"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def cursor(self, *args):
+        return FakeCursor(self.delay)
+
+    def close(self):
+        pass
+
+
+async def run_scenario():
+    """发起一个慢查询，同时连续调用健康检查，返回(慢查询耗时, 健康检查最大耗时)"""
+    slow_started = time.perf_counter()
+    slow_task = asyncio.create_task(user_management.get_user(1))
+    await asyncio.sleep(0.05)  # 确保慢查询已经在执行
+
+    health_latencies = []
+    for _ in range(5):
+        start = time.perf_counter()
+        response = await main.health_check()
+        health_latencies.append(time.perf_counter() - start)
+        assert response.status == "running"
+
+    response = await slow_task
+    assert json.loads(response.body)["username"] == "slow_user"
+    return time.perf_counter() - slow_started, max(health_latencies)
+
+
+def test_slow_query_does_not_block_health():
+    """慢查询期间 /health 应立即返回"""
+    # GET /users/{id} 通过用户缓存读取，缓存未命中时的查询使用cache模块中的连接
+    original_cache_conn = cache.get_read_connection
+    cache.get_read_connection = lambda key=None: FakeConnection(delay=SLOW_QUERY_SECONDS)
+    cache.user_cache.clear()
+    try:
+        slow_elapsed, worst_health = asyncio.run(run_scenario())
+    finally:
+        cache.get_read_connection = original_cache_conn
+        cache.user_cache.clear()
+
+    print(f"慢查询耗时: {slow_elapsed * 1000:.1f}ms, 健康检查最大耗时: {worst_health * 1000:.1f}ms")
+    assert slow_elapsed >= SLOW_QUERY_SECONDS
+    assert worst_health < SLOW_QUERY_SECONDS / 5
+
+
+if __name__ == "__main__":
+    test_slow_query_does_not_block_health()
+    print("✅ 测试通过")
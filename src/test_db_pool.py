@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接池测试脚本
+用模拟的存储后端验证连接复用、获取超时、超过max_lifetime后重建、空闲连接借出前的ping检查、
+归还时回滚未结束的事务，以及丢弃已断开的连接
+"""
+
+import threading
+import time
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import db_pool
+from db_pool import ConnectionPool, PoolClosedError, PoolTimeoutError
+from storage import StorageBackend
+
+
+class FakeRaw:
+    """原始连接：open为False表示已断开，alive为False时ping失败"""
+
+    def __init__(self, number: int):
+        self.number = number
+        self.open = True
+        self.alive = True
+        self.in_transaction = False
+        self.rollback_fails = False
+        self.rollbacks = 0
+        self.closed = False
+
+    def rollback(self):
+        if self.rollback_fails:
+            raise RuntimeError("连接已断开")
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+        self.open = False
+
+
+class FakeBackend(StorageBackend):
+    name = "fake"
+
+    def __init__(self):
+        self.connections = []
+        self.pings = 0
+        self.fail_connect = False
+
+    def connect(self):
+        if self.fail_connect:
+            raise RuntimeError("无法连接数据库")
+        raw = FakeRaw(len(self.connections) + 1)
+        self.connections.append(raw)
+        return raw
+
+    def in_transaction(self, raw) -> bool:
+        return raw.in_transaction
+
+    def is_open(self, raw) -> bool:
+        return raw.open
+
+    def ping(self, raw):
+        self.pings += 1
+        if not raw.alive:
+            raise RuntimeError("ping失败")
+
+
+class FakeClock:
+    """替换db_pool模块使用的time（只用到monotonic）"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def backend():
+    return FakeBackend()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(db_pool, "time", fake)
+    return fake
+
+
+def make_pool(backend, **kwargs):
+    settings = dict(min_size=0, max_size=2, acquire_timeout=1.0, max_lifetime=0, health_check_interval=-1)
+    settings.update(kwargs)
+    return ConnectionPool({}, backend=backend, **settings)
+
+
+def test_connections_are_reused(backend):
+    pool = make_pool(backend, min_size=1)
+    pool.open()
+    with pool.acquire() as connection:
+        assert connection.number == 1
+    with pool.acquire() as connection:
+        assert connection.number == 1
+    stats = pool.stats()
+    assert stats["created"] == 1 and stats["borrowed"] == 2 and stats["idle"] == 1
+    # 重复close不会重复归还
+    connection.close()
+    assert pool.stats()["returned"] == 2
+
+
+def test_acquire_times_out_when_pool_is_exhausted(backend):
+    pool = make_pool(backend, max_size=1)
+    held = pool.acquire()
+    start = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+    assert time.monotonic() - start >= 0.05
+    assert pool.stats()["timeouts"] == 1
+
+    # 等待中的请求在连接归还后立即拿到连接
+    threading.Timer(0.05, held.close).start()
+    with pool.acquire(timeout=2) as connection:
+        assert connection.number == 1
+    assert len(backend.connections) == 1
+
+
+def test_connections_past_max_lifetime_are_replaced(backend, clock):
+    pool = make_pool(backend, max_lifetime=100)
+    pool.acquire().close()
+    clock.now += 100
+    with pool.acquire() as connection:
+        assert connection.number == 2
+    assert backend.connections[0].closed
+    assert pool.stats()["expired"] == 1
+
+    # 借出期间到期的连接在归还时关闭
+    connection = pool.acquire()
+    clock.now += 100
+    connection.close()
+    assert backend.connections[1].closed
+    assert pool.stats()["size"] == 0
+
+
+def test_idle_connections_are_pinged_before_reuse(backend, clock):
+    pool = make_pool(backend, health_check_interval=30)
+    pool.acquire().close()
+    clock.now += 10
+    pool.acquire().close()
+    assert backend.pings == 0  # 刚使用过的连接不检查
+
+    clock.now += 30
+    pool.acquire().close()
+    assert backend.pings == 1
+
+    clock.now += 30
+    backend.connections[0].alive = False
+    with pool.acquire() as connection:
+        assert connection.number == 2
+    assert backend.connections[0].closed
+    assert pool.stats()["health_check_failures"] == 1
+
+
+def test_open_transaction_is_rolled_back_on_return(backend):
+    pool = make_pool(backend)
+    connection = pool.acquire()
+    raw = backend.connections[0]
+    raw.in_transaction = True  # 处理函数在事务中途异常退出
+    connection.close()
+    assert raw.rollbacks == 1 and not raw.closed
+    assert pool.stats()["idle"] == 1
+
+    # 回滚失败时连接状态不可信，直接丢弃
+    connection = pool.acquire()
+    raw.in_transaction = True
+    raw.rollback_fails = True
+    connection.close()
+    assert raw.closed and pool.stats()["size"] == 0
+
+
+def test_broken_connections_are_discarded(backend):
+    pool = make_pool(backend)
+    connection = pool.acquire()
+    backend.connections[0].open = False
+    connection.close()
+    assert pool.stats()["size"] == 0 and pool.stats()["closed"] == 1
+
+    connection = pool.acquire()
+    connection.invalidate()
+    assert backend.connections[1].closed
+    with pool.acquire() as connection:
+        assert connection.number == 3
+
+
+def test_connect_failure_does_not_leak_slots(backend):
+    pool = make_pool(backend, max_size=1)
+    backend.fail_connect = True
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    assert pool.stats()["size"] == 0 and pool.stats()["connect_errors"] == 1
+    backend.fail_connect = False
+    with pool.acquire() as connection:
+        assert connection.number == 1
+
+
+def test_close_pool(backend):
+    pool = make_pool(backend)
+    idle = pool.acquire()
+    borrowed = pool.acquire()
+    idle.close()
+    pool.close()
+    assert backend.connections[0].closed and not backend.connections[1].closed
+    with pytest.raises(PoolClosedError):
+        pool.acquire()
+    # 借出中的连接在归还时关闭
+    borrowed.close()
+    assert backend.connections[1].closed and pool.stats()["size"] == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+读写分离测试脚本
+用进程内的模拟连接池代替主库和只读副本（不需要MySQL），验证副本选择策略、
+写后读走主库、副本失败摘除与探测恢复
+"""
+
+import asyncio
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from fastapi import FastAPI
+
+import db_router
+from db_router import ReadRoutingMiddleware, ReplicaRouter, get_read_connection
+
+
+class FakeConnection:
+    def __init__(self, source: str):
+        self.source = source
+
+    def cursor(self, *args):
+        return FakeCursor()
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchone(self):
+        return (1,)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakePool:
+    """模拟一个数据库实例的连接池，down为True时借连接失败"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.down = False
+        self.closed = False
+
+    def acquire(self, timeout=None):
+        if self.down:
+            raise ConnectionError(f"{self.name} 不可用")
+        return FakeConnection(self.name)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pools():
+    return {"r1": FakePool("r1"), "r2": FakePool("r2")}
+
+
+@pytest.fixture
+def install(monkeypatch):
+    """把router设为全局路由器，主库连接由模拟对象提供"""
+    monkeypatch.setattr(db_router, "get_db_connection", lambda: FakeConnection("primary"))
+
+    def _install(router):
+        monkeypatch.setattr(db_router, "_router", router)
+        return router
+    return _install
+
+
+def read_in_request(method: str = "GET", key=None) -> str:
+    token = db_router._request_route.set((None, method in db_router.SAFE_METHODS))
+    try:
+        return get_read_connection(key).source
+    finally:
+        db_router._request_route.reset(token)
+
+
+def test_round_robin_and_primary_outside_requests(pools, install):
+    install(ReplicaRouter(list(pools.items())))
+    assert {read_in_request() for _ in range(4)} == {"r1", "r2"}
+    assert read_in_request("POST") == "primary"
+    # 后台任务、脚本等不在请求中的读取走主库
+    assert get_read_connection().source == "primary"
+
+
+def test_least_latency_prefers_fastest(pools, install):
+    router = install(ReplicaRouter(list(pools.items()), strategy="least_latency"))
+    router._record_success(router.replicas[0], 8.0)
+    router._record_success(router.replicas[1], 2.0)
+    assert {read_in_request() for _ in range(4)} == {"r2"}
+    with pytest.raises(ValueError):
+        ReplicaRouter([], strategy="random")
+
+
+def test_failing_replica_is_ejected_and_recovered_by_probe(pools, install):
+    router = install(ReplicaRouter(list(pools.items()), eject_after_failures=2, eject_seconds=60))
+    pools["r1"].down = True
+    sources = [read_in_request() for _ in range(6)]
+    assert set(sources) == {"r2"}
+    stats = router.stats()["replicas"]
+    assert stats["r1"]["available"] is False and stats["r1"]["ejections"] == 1
+
+    pools["r2"].down = True
+    assert read_in_request() == "primary"
+    assert router.stats()["primary_reads"] == 1
+
+    pools["r1"].down = pools["r2"].down = False
+    results = router.probe(timeout=1)
+    assert [r["healthy"] for r in results] == [True, True]
+    assert all(r["available"] for r in router.stats()["replicas"].values())
+
+
+def test_read_your_writes_through_middleware(pools, install):
+    install(ReplicaRouter(list(pools.items()), sticky_seconds=60))
+    app = FastAPI()
+
+    @app.get("/read")
+    async def read():
+        return {"source": get_read_connection().source}
+
+    @app.post("/write")
+    async def write():
+        return {"source": get_read_connection().source}
+
+    app.add_middleware(ReadRoutingMiddleware)
+
+    def call(method, path, token):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+            "root_path": "", "headers": [(b"authorization", f"Bearer {token}".encode())],
+            "client": ("127.0.0.1", 5000), "server": ("testserver", 80),
+        }
+        asyncio.run(app(scope, receive, send))
+        return b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body").decode()
+
+    assert "primary" not in call("GET", "/read", "alice")
+    assert "primary" in call("POST", "/write", "alice")
+    assert "primary" in call("GET", "/read", "alice")
+    assert "primary" not in call("GET", "/read", "bob")
+
+
+def test_sticky_window_expires_and_keys(pools, install, monkeypatch):
+    router = install(ReplicaRouter(list(pools.items()), sticky_seconds=5, max_sticky_entries=2))
+    now = [1000.0]
+    monkeypatch.setattr(db_router.time, "monotonic", lambda: now[0])
+    db_router.mark_write(("user", 1))
+    assert read_in_request(key=("user", 1)) == "primary"
+    assert read_in_request(key=("user", 2)) != "primary"
+    now[0] += 6
+    assert read_in_request(key=("user", 1)) != "primary"
+
+    for user_id in range(5):
+        router.mark_write(("user", user_id))
+    assert router.stats()["sticky_entries"] <= 2
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户导出测试脚本
+用模拟连接验证 GET /users/export 的CSV/NDJSON编码、gzip压缩以及中途断开时连接被丢弃
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from streaming import CursorStream, iter_stream
+
+ROWS = [
+    {"id": i, "username": f"user{i}", "email": None, "phone": "138", "user_type": "student",
+     "is_active": 1, "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 2),
+     "last_login": None}
+    for i in range(1, 26)
+]
+COLUMNS = list(ROWS[0])
+
+
+class FakeCursor:
+    """模拟服务端游标，记录每次fetchmany读取的行数"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.fetch_sizes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.stream_cursor = FakeCursor(rows)
+        self.state = "borrowed"
+
+    def cursor(self, cursor_class=None):
+        return self.stream_cursor if cursor_class else FakeCursor([])
+
+    def close(self):
+        self.state = "returned"
+
+    def invalidate(self):
+        self.state = "invalidated"
+
+
+def open_stream(fmt, gzip_level=None, rows=ROWS):
+    connection = FakeConnection(rows)
+    stream = CursorStream(connection, COLUMNS, fmt, fetch_size=10, gzip_level=gzip_level,
+                          bool_columns=["is_active"])
+    stream.execute("users.export", "SELECT ...", [])
+    return connection, stream
+
+
+async def collect(stream, limit=None):
+    chunks = []
+    async for chunk in iter_stream(stream):
+        chunks.append(chunk)
+        if limit and len(chunks) >= limit:
+            break
+    return b"".join(chunks)
+
+
+def test_csv_export():
+    connection, stream = open_stream("csv")
+    body = asyncio.run(collect(stream)).decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert len(rows) == len(ROWS)
+    assert rows[0]["username"] == "user1"
+    assert rows[0]["created_at"] == "2024-01-01T00:00:00"
+    assert connection.state == "returned"
+    assert max(connection.stream_cursor.fetch_sizes) == 10
+
+
+def test_empty_csv_has_header():
+    connection, stream = open_stream("csv", rows=[])
+    body = asyncio.run(collect(stream)).decode("utf-8")
+    assert body.strip() == ",".join(COLUMNS)
+    assert connection.state == "returned"
+
+
+def test_ndjson_gzip_export():
+    connection, stream = open_stream("ndjson", gzip_level=6)
+    body = gzip.decompress(asyncio.run(collect(stream)))
+    records = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert len(records) == len(ROWS)
+    assert records[-1]["is_active"] is True
+    assert connection.state == "returned"
+
+
+def test_aborted_export_invalidates_connection():
+    connection, stream = open_stream("ndjson")
+
+    async def scenario():
+        await collect(stream, limit=1)
+        await asyncio.sleep(0.1)  # 等待线程池中的中止操作完成
+
+    asyncio.run(scenario())
+    assert connection.state == "invalidated"
+
+
+if __name__ == "__main__":
+    test_csv_export()
+    test_empty_csv_has_header()
+    test_ndjson_gzip_export()
+    test_aborted_export_invalidates_connection()
+    print("✅ 测试通过")
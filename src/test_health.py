@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+健康检查测试脚本
+验证 /health 直接返回后台探测器缓存的结果而不访问数据库，check_now() 刷新缓存结果，
+以及探测失败时报告 healthy=False 和错误信息
+"""
+
+import asyncio
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import health
+import main
+from health import HealthProber
+
+
+class FailingPool:
+    def acquire(self, timeout=None):
+        raise RuntimeError("连接被拒绝")
+
+
+@pytest.fixture
+def prober(monkeypatch):
+    """main使用的探测器换成新的实例，副本探测和连接池统计使用固定结果"""
+    fresh = HealthProber(probe_interval=60, probe_timeout=0.1)
+    monkeypatch.setattr(main, "prober", fresh)
+    monkeypatch.setattr(health, "probe_replicas", lambda timeout: [])
+    monkeypatch.setattr(health, "pool_stats", lambda: {"size": 1})
+    return fresh
+
+
+def test_health_returns_cached_state_without_database(prober, monkeypatch):
+    def no_database(*args):
+        raise AssertionError("/health 不应访问数据库")
+
+    monkeypatch.setattr(health, "probe_database", no_database)
+    monkeypatch.setattr(health, "get_pool", no_database)
+    prober._state = {"healthy": True, "latency_ms": 1.5, "error": None, "checked_at": "2025-01-01T00:00:00",
+                     "pool": {"size": 3}, "replicas": []}
+
+    response = asyncio.run(main.health_check())
+    assert response.database == "正常" and response.latency_ms == 1.5
+    assert response.checked_at == "2025-01-01T00:00:00" and response.pool == {"size": 3}
+
+
+def test_check_now_refreshes_state(prober, monkeypatch):
+    assert not prober.state["healthy"] and prober.state["checked_at"] is None
+    monkeypatch.setattr(health, "probe_database",
+                        lambda timeout: {"healthy": True, "latency_ms": 0.8, "error": None})
+
+    result = asyncio.run(prober.check_now())
+    assert prober.state is result
+    assert result["healthy"] and result["error"] is None
+    assert result["checked_at"] is not None and result["pool"] == {"size": 1}
+    assert asyncio.run(main.health_check()).database == "正常"
+
+
+def test_failing_probe_reports_error(prober, monkeypatch):
+    monkeypatch.setattr(health, "get_pool", FailingPool)
+
+    response = asyncio.run(main.deep_health_check())
+    assert response.database == "异常" and response.error == "连接被拒绝"
+    assert prober.state["healthy"] is False and prober.state["error"] == "连接被拒绝"
+    # 之后的 /health 返回同一个失败结果
+    assert asyncio.run(main.health_check()).error == "连接被拒绝"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
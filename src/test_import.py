@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+花名册导入测试脚本
+用内存中的模拟users表验证按块导入、逐行错误报告以及重复导入的幂等性；
+在临时SQLite数据库上验证任务状态写入import_jobs表（其他工作进程可以查询），
+以及服务停止时取消未完成的任务并标记为失败
+"""
+
+import asyncio
+import re
+from datetime import timedelta
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from fastapi import HTTPException
+
+import import_jobs
+import passwords
+import user_management
+from import_jobs import RosterReader, cancel_job_tasks, create_job, load_job, start_job_task
+
+ROSTER = """username,password,email,phone,user_type
+stu_a,pw,a@example.com,13800000001,student
+stu_b,pw,,13800000002,student
+stu_c,pw,c@example.com,,teacher
+,pw,missing@example.com,,student
+stu_d,pw,a@example.com,,student
+stu_e,pw,,,janitor
+stu_f,pw,,,
+"""
+
+
+class FakeTable:
+    """以列值列表保存的users表"""
+
+    def __init__(self):
+        self.rows = []
+        self.commits = 0
+
+
+class FakeCursor:
+    def __init__(self, table: FakeTable):
+        self.table = table
+        self.result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        if sql.lstrip().startswith("INSERT"):
+            for i in range(0, len(params), 7):
+                username, _, email, phone = params[i:i + 4]
+                self.table.rows.append({"id": len(self.table.rows) + 1, "username": username,
+                                        "email": email, "phone": phone})
+            return
+        column = re.search(r"WHERE (\w+) IN", sql).group(1)
+        wanted = {p.casefold() for p in params}
+        self.result = [row for row in self.table.rows
+                       if row[column] and row[column].casefold() in wanted]
+
+    def fetchall(self):
+        return self.result
+
+
+class FakeConnection:
+    def __init__(self, table: FakeTable):
+        self.table = table
+
+    def cursor(self, *args):
+        return FakeCursor(self.table)
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        self.table.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def run_import(path: str):
+    async def scenario():
+        job = create_job("roster.csv")
+        await user_management._run_import(job, RosterReader(path, chunk_size=3))
+        return job
+    return asyncio.run(scenario())
+
+
+def write_roster(tmp_path):
+    path = tmp_path / "roster.csv"
+    path.write_text(ROSTER, encoding="utf-8")
+    return str(path)
+
+
+def test_import_is_chunked_and_idempotent(tmp_path, monkeypatch):
+    # 只验证导入流程，使用不需要进程池的旧哈希算法
+    monkeypatch.setitem(passwords.SECURITY_CONFIG, "password_hash_algorithm", "sha256")
+    # 任务状态不写入数据库
+    monkeypatch.setattr(import_jobs, "get_db_connection", lambda: None)
+    table = FakeTable()
+    original = user_management.get_db_connection
+    user_management.get_db_connection = lambda: FakeConnection(table)
+    try:
+        job = run_import(write_roster(tmp_path))
+        assert job.status == "completed"
+        assert (job.processed, job.created, job.skipped, job.failed) == (7, 4, 0, 3)
+        # 7行按3行一块，每块一个事务；第二块没有可写入的行，不开事务
+        assert table.commits == 2
+        errors = {e["row"]: e["error"] for e in job.errors}
+        assert set(errors) == {5, 6, 7}
+        assert errors[6] == "邮箱地址已存在"
+
+        # 重新导入同一文件：已创建的行全部跳过，不产生新用户，也不计算密码哈希
+        hashed = passwords.password_hasher.stats()["hashed"]
+        job = run_import(write_roster(tmp_path))
+        assert job.status == "completed"
+        assert (job.created, job.skipped, job.failed) == (0, 4, 3)
+        assert len(table.rows) == 4 and table.commits == 2
+        assert passwords.password_hasher.stats()["hashed"] == hashed
+    finally:
+        user_management.get_db_connection = original
+
+
+def forget_job(job_id: str):
+    """模拟轮询请求落到没有运行该任务的工作进程"""
+    with import_jobs._jobs_lock:
+        del import_jobs._jobs[job_id]
+
+
+def test_job_status_is_visible_to_other_workers(backend, tmp_path):
+    job = run_import(write_roster(tmp_path))
+    forget_job(job.job_id)
+    response = asyncio.run(user_management.get_import_job(job.job_id))
+    assert response.status == "completed" and response.finished_at is not None
+    assert (response.processed, response.created, response.skipped, response.failed) == (7, 4, 0, 3)
+    assert response.errors == [user_management.ImportRowError(**e) for e in job.errors]
+    assert not response.errors_truncated
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(user_management.get_import_job("missing"))
+    assert exc.value.status_code == 404
+
+
+def test_finished_jobs_are_purged_after_retention(backend, tmp_path):
+    old = run_import(write_roster(tmp_path))
+    recent = run_import(write_roster(tmp_path))
+    old.finished_at -= timedelta(days=import_jobs.IMPORT_CONFIG['retention_days'], seconds=1)
+    assert import_jobs.save_job(old)
+    assert import_jobs.save_job(create_job("new.csv"), purge=True)
+    assert load_job(old.job_id) is None
+    assert load_job(recent.job_id)["status"] == "completed"
+
+
+def test_unfinished_tasks_are_cancelled_on_shutdown(backend, tmp_path, monkeypatch):
+    path = write_roster(tmp_path)
+    started = []
+
+    async def stalled_chunk(job, reader):
+        started.append(job.job_id)
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(user_management, "_import_chunk", stalled_chunk)
+
+    async def scenario():
+        job = create_job("roster.csv")
+        start_job_task(user_management._run_import(job, RosterReader(path, chunk_size=3)))
+        await asyncio.sleep(0)
+        assert started == [job.job_id]
+        await cancel_job_tasks()
+        return job
+
+    job = asyncio.run(scenario())
+    assert not import_jobs._tasks
+    assert job.status == "failed" and "服务停止" in job.message
+    assert not os.path.exists(path)
+    record = load_job(job.job_id)
+    assert record["status"] == "failed" and record["message"] == job.message
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录验证测试脚本
+用模拟的数据库查询和哈希服务验证用户不存在时同样执行一次密码验证，
+以及数据库故障不计入登录限流的失败次数
+"""
+
+import asyncio
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import auth
+import login_throttle
+import passwords
+from login_throttle import LoginThrottle
+
+STORED = "pbkdf2_sha256$600000$c2FsdA$ZGlnZXN0"
+
+
+class FakeHasher:
+    """记录验证时使用的哈希，不做实际计算"""
+
+    def __init__(self):
+        self.verified = []
+
+    async def verify_async(self, password, stored):
+        self.verified.append(stored)
+        return password == "right"
+
+
+@pytest.fixture
+def hasher(monkeypatch):
+    fake = FakeHasher()
+    monkeypatch.setattr(auth, "password_hasher", fake)
+    return fake
+
+
+@pytest.fixture
+def users(monkeypatch):
+    """用户名 -> 登录查询返回的行"""
+    rows = {"alice": {"id": 1, "username": "alice", "password": STORED, "user_type": "student",
+                      "is_active": True}}
+    monkeypatch.setattr(auth, "_fetch_login_user", rows.get)
+    monkeypatch.setattr(auth, "record_login", lambda *args: None)
+    monkeypatch.setattr(auth, "_complete_login", lambda *args: None)
+    return rows
+
+
+def test_missing_user_pays_for_one_verify(hasher, users):
+    assert asyncio.run(auth.verify_user_credentials("nobody", "right")) is None
+    assert hasher.verified == [passwords.dummy_hash()]
+
+    assert asyncio.run(auth.verify_user_credentials("alice", "wrong")) is None
+    assert asyncio.run(auth.verify_user_credentials("alice", "right"))["id"] == 1
+    assert hasher.verified[1:] == [STORED, STORED]
+
+
+
+class FakeRequest:
+    headers = {}
+
+    class client:
+        host = "10.0.0.9"
+
+
+def test_database_errors_are_not_counted_as_failures(hasher, users, monkeypatch):
+    throttle = LoginThrottle(dict(limit=1, window=60), dict(limit=100, window=60))
+    monkeypatch.setattr(login_throttle, "_throttle", throttle)
+
+    def database_down(username):
+        raise RuntimeError("数据库连接失败")
+
+    monkeypatch.setattr(auth, "_fetch_login_user", database_down)
+    request = auth.LoginRequest(username="alice", password="right")
+    for _ in range(3):
+        response = asyncio.run(auth.login(request, FakeRequest()))
+        assert not response.success and response.message == "服务器内部错误，请稍后重试"
+    assert throttle.check("alice", "10.0.0.9") is None
+
+    # 真正的密码错误仍然计数
+    monkeypatch.setattr(auth, "_fetch_login_user", users.get)
+    response = asyncio.run(auth.login(auth.LoginRequest(username="alice", password="wrong"), FakeRequest()))
+    assert response.message == "用户名或密码错误"
+    assert throttle.check("alice", "10.0.0.9") is not None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
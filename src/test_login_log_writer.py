@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录日志写入器测试脚本
+用记录INSERT的模拟连接验证按批量大小合并写入、最早的日志在flush_interval内写入、
+队列满时改为同步写入，停止时写完队列中剩余的日志，
+以及数据库暂时不可用时日志保留在待重试区，恢复后全部写入
+"""
+
+import threading
+import time
+from datetime import datetime
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import login_log_writer
+from login_log_writer import LoginLogWriter
+
+EVENT_COLUMNS = 6
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.connection.database.execute(params)
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self, *args):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """记录每条多行INSERT写入的user_id；blocked时后台线程的写入会等待release"""
+
+    def __init__(self):
+        self.batches = []
+        self.failures = 0
+        self.unblocked = threading.Event()
+        self.unblocked.set()
+        self.writer_waiting = threading.Event()
+        self._lock = threading.Lock()
+
+    def block_writer_thread(self):
+        self.unblocked.clear()
+
+    def execute(self, params):
+        if threading.current_thread().name == "login-log-writer" and not self.unblocked.is_set():
+            self.writer_waiting.set()
+            self.unblocked.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("数据库不可用")
+        with self._lock:
+            self.batches.append([params[i] for i in range(0, len(params), EVENT_COLUMNS)])
+
+    @property
+    def written(self):
+        with self._lock:
+            return [user_id for batch in self.batches for user_id in batch]
+
+
+@pytest.fixture
+def database(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(login_log_writer, "get_db_connection", lambda: FakeConnection(db))
+    return db
+
+
+def event(user_id):
+    return (user_id, datetime(2024, 1, 1), "127.0.0.1", "pytest", "success", None)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_events_are_written_in_batches(database):
+    writer = LoginLogWriter(batch_size=3, flush_interval=1.0)
+    writer.start()
+    try:
+        for user_id in range(7):
+            writer.submit(event(user_id))
+        assert wait_for(lambda: len(database.written) == 7)
+    finally:
+        writer.stop()
+    assert [len(batch) for batch in database.batches] == [3, 3, 1]
+    assert database.written == list(range(7))
+    stats = writer.stats()
+    assert stats["enqueued"] == 7 and stats["written"] == 7 and stats["batches"] == 3
+    assert stats["inline_writes"] == 0
+
+
+def test_partial_batch_is_written_within_flush_interval(database):
+    writer = LoginLogWriter(batch_size=100, flush_interval=0.1)
+    writer.start()
+    try:
+        start = time.monotonic()
+        writer.submit(event(1))
+        assert wait_for(lambda: database.written == [1])
+        # 一批凑不满时最多等待flush_interval，留出调度余量
+        assert time.monotonic() - start < 1.0
+    finally:
+        writer.stop()
+
+
+def test_full_queue_falls_back_to_inline_write(database):
+    writer = LoginLogWriter(max_queue_size=1, batch_size=1, flush_interval=0.05, enqueue_timeout=0.01)
+    writer.start()
+    try:
+        database.block_writer_thread()
+        writer.submit(event(1))                  # 后台线程取走后阻塞在写入中
+        assert database.writer_waiting.wait(5)
+        writer.submit(event(2))                  # 占满队列
+        writer.submit(event(3))                  # 等待enqueue_timeout后在当前线程写入
+        assert database.written == [3]
+        assert writer.stats()["inline_writes"] == 1
+        database.unblocked.set()
+    finally:
+        writer.stop()
+    assert sorted(database.written) == [1, 2, 3]
+
+
+def test_stop_drains_queue(database):
+    writer = LoginLogWriter(batch_size=2, flush_interval=0.2)
+    writer.start()
+    database.block_writer_thread()
+    writer.submit(event(0))
+    writer.submit(event(1))
+    assert database.writer_waiting.wait(5)
+    for user_id in range(2, 7):
+        writer.submit(event(user_id))
+    database.unblocked.set()
+    writer.stop()
+    assert sorted(database.written) == list(range(7))
+    assert writer.stats()["queue_depth"] == 0 and not writer.stats()["running"]
+
+    # 停止后提交的日志同步写入
+    writer.submit(event(7))
+    assert database.written[-1] == 7
+
+
+def test_failed_batches_are_held_until_written(database, monkeypatch):
+    monkeypatch.setattr(login_log_writer.time, "sleep", lambda seconds: None)
+    writer = LoginLogWriter()
+    database.failures = 2
+    writer.submit(event(1))  # 未启动时同步写入，前两次失败后重试成功
+    assert database.written == [1]
+
+    database.failures = login_log_writer.WRITE_ATTEMPTS
+    writer.submit(event(2))
+    assert database.written == [1]
+    assert writer.stats()["held"] == 1 and writer.stats()["failed"] == 0
+    # 停止时数据库已恢复，待重试的日志被写入
+    writer.stop()
+    assert database.written == [1, 2] and writer.stats()["held"] == 0
+
+
+def test_events_survive_database_outage(database, monkeypatch):
+    monkeypatch.setattr(login_log_writer.time, "sleep", lambda seconds: None)
+    writer = LoginLogWriter(batch_size=2, flush_interval=0.01, retry_backoff=0.01, max_retry_backoff=0.02)
+    # 第一批的WRITE_ATTEMPTS次尝试和之后的若干次重试都失败
+    database.failures = login_log_writer.WRITE_ATTEMPTS + 5
+    writer.start()
+    try:
+        for user_id in range(7):
+            writer.submit(event(user_id))
+        assert wait_for(lambda: sorted(database.written) == list(range(7)))
+    finally:
+        writer.stop()
+    stats = writer.stats()
+    assert stats["written"] == 7 and stats["failed"] == 0 and stats["held"] == 0
+    assert stats["retries"] >= 5
+
+
+def test_held_events_are_bounded(database, monkeypatch):
+    monkeypatch.setattr(login_log_writer.time, "sleep", lambda seconds: None)
+    writer = LoginLogWriter(max_held_events=2)
+    database.failures = 3 * login_log_writer.WRITE_ATTEMPTS
+    for user_id in range(3):
+        writer.submit(event(user_id))
+    assert writer.stats()["held"] == 2 and writer.stats()["failed"] == 1
+    writer.stop()
+    # 最早的日志被丢弃，其余的在停止时写入
+    assert database.written == [1, 2]
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录限流测试脚本
+用显式传入的时间验证滑动窗口、锁定升级、LRU淘汰，以及被限流的登录请求不访问数据库
+"""
+
+import asyncio
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from fastapi import HTTPException
+
+import auth
+import login_throttle
+from login_throttle import LoginThrottle, SlidingWindowLimiter
+
+
+def test_lockout_after_limit_within_window():
+    limiter = SlidingWindowLimiter(limit=3, window=60, base_lockout=10, max_lockout=100)
+    assert limiter.record_failure("alice", now=0) == 0
+    assert limiter.record_failure("alice", now=1) == 0
+    assert limiter.retry_after("alice", now=2) == 0
+    assert limiter.record_failure("alice", now=2) == 10
+    assert limiter.retry_after("alice", now=5) == 7
+    assert limiter.retry_after("alice", now=12) == 0
+    assert limiter.stats()["shed"] == 1
+
+
+def test_failures_outside_window_do_not_lock():
+    limiter = SlidingWindowLimiter(limit=3, window=60, base_lockout=10)
+    for now in (0, 40, 80, 120):
+        assert limiter.record_failure("bob", now=now) == 0
+
+
+def test_lockout_escalates_and_resets():
+    limiter = SlidingWindowLimiter(limit=1, window=60, base_lockout=10, max_lockout=35, strike_reset=1000)
+    assert limiter.record_failure("eve", now=0) == 10
+    assert limiter.record_failure("eve", now=20) == 20
+    assert limiter.record_failure("eve", now=50) == 35  # 40封顶为35
+    assert limiter.record_failure("eve", now=2000) == 10  # 超过strike_reset后重新计算
+
+
+def test_memory_is_bounded():
+    limiter = SlidingWindowLimiter(limit=5, max_entries=100)
+    for i in range(1000):
+        limiter.record_failure(f"user{i}", now=i)
+    assert len(limiter) == 100
+    assert limiter.stats()["evictions"] == 900
+
+
+def test_success_clears_username_failures():
+    throttle = LoginThrottle(dict(limit=2, window=60), dict(limit=100, window=60))
+    throttle.record_failure("Alice", "10.0.0.1")
+    throttle.record_success("alice")
+    throttle.record_failure("ALICE", "10.0.0.1")
+    assert throttle.check("alice", "10.0.0.1") is None
+
+
+class FakeRequest:
+    headers = {}
+
+    class client:
+        host = "10.0.0.9"
+
+
+def test_throttled_login_skips_database(monkeypatch):
+    calls = []
+
+    async def fake_verify(username, password):
+        calls.append(username)
+        return None
+
+    monkeypatch.setattr(auth, "verify_user_credentials", fake_verify)
+    monkeypatch.setattr(login_throttle, "_throttle",
+                        LoginThrottle(dict(limit=2, window=60), dict(limit=100, window=60)))
+    request = auth.LoginRequest(username="victim", password="guess")
+
+    for _ in range(2):
+        response = asyncio.run(auth.login(request, FakeRequest()))
+        assert not response.success
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(auth.login(request, FakeRequest()))
+
+    assert exc.value.status_code == 429
+    assert int(exc.value.headers["Retry-After"]) > 0
+    assert len(calls) == 2
+    assert login_throttle.login_throttle_stats()["username"]["shed"] == 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
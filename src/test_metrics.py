@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控指标测试脚本
+直接以ASGI方式调用应用（不启动服务器、不访问数据库），验证请求指标按路由模板统计、
+直方图和标签的文本格式，以及SQL语句耗时和各模块统计信息的输出
+"""
+
+import asyncio
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import main
+import metrics
+import repository
+from metrics import Histogram, Registry
+
+
+def call(app, method: str, path: str):
+    """发送一个没有请求体的HTTP请求，返回 (状态码, 响应体)"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [], "client": ("127.0.0.1", 5000), "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    status = next(m["status"] for m in messages if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+    return status, body.decode()
+
+
+def test_histogram_text_format():
+    histogram = Histogram("demo_seconds", "演示", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(("/a",), 0.05)
+    histogram.observe(("/a",), 0.1)
+    histogram.observe(("/a",), 5)
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{route="/a"} 3' in lines
+    assert histogram.snapshot(("/a",))["sum"] == pytest.approx(5.15)
+
+
+def test_labels_are_escaped_and_stats_flattened():
+    registry = Registry(prefix="t")
+    registry.counter("events_total", "事件", ("name",)).inc(('a"b\\c',))
+    registry.register_stats("pool", lambda: {"size": 3, "closed": False, "nested": {"hits": 2}, "path": None})
+    text = registry.render()
+    assert 't_events_total{name="a\\"b\\\\c"} 1' in text
+    assert "t_pool_size 3" in text and "t_pool_closed 0" in text and "t_pool_nested_hits 2" in text
+    assert "t_pool_path" not in text
+
+
+def test_requests_recorded_by_route_template():
+    before = metrics.http_requests_total.value(("GET", "/health", "200"))
+    status, _ = call(main.app, "GET", "/health")
+    assert status == 200
+    assert metrics.http_requests_total.value(("GET", "/health", "200")) == before + 1
+
+    status, _ = call(main.app, "GET", "/no/such/path")
+    assert status == 404
+    assert metrics.http_requests_total.value(("GET", metrics.UNMATCHED_ROUTE, "404")) >= 1
+    assert metrics.http_requests_in_flight.value(("GET",)) == 0
+
+
+def test_metrics_endpoint_exposes_statements_and_stats():
+    class Cursor:
+        def execute(self, sql, params=None):
+            pass
+
+        def fetchone(self):
+            return None
+
+    repository.UserRepository(Cursor()).get_row(1)
+    status, text = call(main.app, "GET", "/metrics")
+    assert status == 200
+    assert 'sdp_db_statement_duration_seconds_count{statement="users.get_row"}' in text
+    assert 'sdp_http_request_duration_seconds_bucket{method="GET",route="/health",le="+Inf"}' in text
+    assert "sdp_password_hash_rejected" in text
+    assert "sdp_login_throttle_username_shed" in text
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
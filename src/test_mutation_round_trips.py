@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+写入路径往返次数测试脚本
+用记录SQL语句的模拟连接统计创建/更新用户和管理员时执行的语句数：
+改造前 创建用户5条、更新用户（改三个唯一字段）6条、更新管理员5条（两个连接）；
+唯一约束齐全时应分别为1、2、2条
+"""
+
+import asyncio
+from datetime import datetime
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pymysql
+import pytest
+from fastapi import HTTPException
+
+import admin_management
+import passwords
+import user_management
+import unique_constraints
+
+UNIQUE_INDEX_ROWS = [
+    {"Key_name": "PRIMARY", "Column_name": "id"},
+    {"Key_name": "username", "Column_name": "username"},
+    {"Key_name": "uk_email", "Column_name": "email"},
+    {"Key_name": "uk_phone", "Column_name": "phone"},
+]
+EXISTING_ROW = {
+    "id": 7, "username": "old_name", "email": "old@example.com", "phone": "13800000000",
+    "user_type": "student", "is_active": True, "real_name": "张三", "department": "教务处",
+    "role_level": "admin", "permissions": "user_manage",
+    "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 1), "last_login": None,
+}
+
+
+class RecordingCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = None
+        self.lastrowid = None
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        if sql.startswith("SHOW INDEX"):
+            self.result = self.connection.index_rows
+            return
+        self.connection.statements.append(sql.split()[0])
+        if self.connection.duplicate_key and sql.startswith(("INSERT", "UPDATE")):
+            raise pymysql.err.IntegrityError(
+                1062, f"Duplicate entry 'x' for key 'users.{self.connection.duplicate_key}'")
+        if sql.startswith("INSERT"):
+            self.lastrowid = 42
+        elif sql.startswith("UPDATE"):
+            self.rowcount = 0 if self.connection.password_changed else 1
+        elif sql.startswith("SELECT password"):
+            self.result = [{"password": self.connection.password}]
+        elif sql.startswith("SELECT MAX"):
+            self.result = [self.connection.conflict_row]
+        elif sql.startswith("SELECT"):
+            self.result = [dict(EXISTING_ROW)]
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+
+class RecordingConnection:
+    def __init__(self, index_rows=UNIQUE_INDEX_ROWS, duplicate_key=None, conflict_row=None,
+                 password=None, password_changed=False):
+        self.index_rows = index_rows
+        self.duplicate_key = duplicate_key
+        self.password = password
+        self.password_changed = password_changed
+        self.conflict_row = conflict_row or {"username": None, "email": None, "phone": None}
+        self.statements = []
+
+    def cursor(self, *args):
+        return RecordingCursor(self)
+
+    def commit(self):
+        self.statements.append("COMMIT")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    """返回一个函数，用给定参数创建模拟连接并让两个模块都使用它"""
+    unique_constraints.reset_unique_constraint_detection()
+    # 只统计SQL语句，使用不需要进程池的旧哈希算法
+    monkeypatch.setitem(passwords.SECURITY_CONFIG, "password_hash_algorithm", "sha256")
+    holder = {}
+
+    def use(**kwargs):
+        holder["connection"] = RecordingConnection(**kwargs)
+        return holder["connection"]
+
+    monkeypatch.setattr(user_management, "get_db_connection", lambda: holder["connection"])
+    monkeypatch.setattr(admin_management, "get_db_connection", lambda: holder["connection"])
+    yield use
+    unique_constraints.reset_unique_constraint_detection()
+
+
+def test_create_user_is_single_insert(connection):
+    conn = connection()
+    user = user_management._create_user(user_management.UserCreate(
+        username="new_user", password="pw", email="new@example.com", phone="13900000000"), "hashed-pw")
+    assert conn.statements == ["INSERT"]
+    assert user.id == 42 and user.email == "new@example.com" and user.is_active
+    assert user.created_at.microsecond == 0
+
+
+def test_create_user_maps_duplicate_key(connection):
+    connection(duplicate_key="uk_email")
+    with pytest.raises(HTTPException) as exc:
+        user_management._create_user(user_management.UserCreate(
+            username="new_user", password="pw", email="old@example.com"), "hashed-pw")
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "邮箱地址已存在"
+
+
+def test_create_user_without_constraints_uses_one_check(connection):
+    conn = connection(index_rows=UNIQUE_INDEX_ROWS[:2],
+                      conflict_row={"username": 0, "email": 0, "phone": 1})
+    with pytest.raises(HTTPException) as exc:
+        user_management._create_user(user_management.UserCreate(
+            username="new_user", password="pw", email="new@example.com", phone="13800000000"), "hashed-pw")
+    assert exc.value.detail == "手机号码已存在"
+    assert conn.statements == ["SELECT"]
+
+
+def test_update_user_reads_once_and_updates(connection):
+    conn = connection()
+    user = user_management._update_user(7, user_management.UserUpdate(
+        username="renamed", email="renamed@example.com", phone="13911111111"))
+    assert conn.statements == ["SELECT", "UPDATE"]
+    assert user.username == "renamed" and user.phone == "13911111111"
+    assert user.created_at == EXISTING_ROW["created_at"]
+    assert user.updated_at > EXISTING_ROW["updated_at"]
+
+
+def test_update_user_maps_duplicate_key(connection):
+    connection(duplicate_key="username")
+    with pytest.raises(HTTPException) as exc:
+        user_management._update_user(7, user_management.UserUpdate(username="taken"))
+    assert exc.value.detail == "用户名已被其他用户使用"
+
+
+def test_update_admin_reads_once_and_updates(connection):
+    conn = connection()
+    admin = admin_management._update_admin(7, admin_management.AdminUpdate(
+        email="boss@example.com", permissions=["user_manage", "system_config"]))
+    assert conn.statements == ["SELECT", "UPDATE"]
+    assert admin.email == "boss@example.com"
+    assert admin.permissions == ["user_manage", "system_config"]
+    assert admin.real_name == "张三"
+
+
+
+def update_admin_password(old_password, new_password):
+    return asyncio.run(admin_management.update_admin_password(
+        7, admin_management.AdminPasswordUpdate(old_password=old_password, new_password=new_password)))
+
+
+def test_update_admin_password_is_conditional(connection):
+    stored = passwords.hash_password("old-pw")
+    conn = connection(password=stored)
+    assert update_admin_password("old-pw", "new-pw") == {"message": "密码更新成功"}
+    # 读取哈希和条件UPDATE各用一次连接，验证和计算哈希期间不占用连接
+    assert conn.statements == ["SELECT", "UPDATE", "COMMIT"]
+
+    with pytest.raises(HTTPException) as exc:
+        update_admin_password("wrong-pw", "new-pw")
+    assert exc.value.status_code == 400
+
+
+def test_update_admin_password_detects_concurrent_change(connection):
+    connection(password=passwords.hash_password("old-pw"), password_changed=True)
+    with pytest.raises(HTTPException) as exc:
+        update_admin_password("old-pw", "new-pw")
+    assert exc.value.status_code == 409
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游标分页测试脚本
+验证游标的编码/解析、无效游标返回400而不是500，
+以及在临时SQLite数据库上按两个排序方向翻页时，created_at相同的行既不重复也不遗漏
+"""
+
+import base64
+import json
+from datetime import datetime
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pymysql
+import pytest
+from fastapi import HTTPException
+
+import admin_management
+import db_pool
+import user_management
+from pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_condition, split_page
+
+
+def b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 8, 30, 15)
+    assert decode_cursor(encode_cursor({"created_at": created_at, "id": 42})) == (created_at, 42, "desc")
+    assert decode_cursor(encode_cursor({"created_at": created_at, "id": 42}, "asc")) == (created_at, 42, "asc")
+    # 数据库返回字符串形式的时间时同样可以编码
+    assert decode_cursor(encode_cursor({"created_at": "2024-05-01 08:30:15", "id": 7}))[0] == created_at
+
+
+def test_keyset_condition_follows_direction():
+    cursor = encode_cursor({"created_at": datetime(2024, 5, 1), "id": 42})
+    sql, params = keyset_condition(cursor)
+    assert "created_at <" in sql and "id <" in sql
+    assert params == [datetime(2024, 5, 1), datetime(2024, 5, 1), 42]
+
+    sql, _ = keyset_condition(encode_cursor({"created_at": datetime(2024, 5, 1), "id": 42}, "asc"), "asc")
+    assert "created_at >" in sql and "id >" in sql
+    # 游标不能用于另一个排序方向
+    with pytest.raises(InvalidCursorError):
+        keyset_condition(cursor, "asc")
+
+
+def test_split_page_only_returns_cursor_when_more_rows():
+    rows = [{"created_at": datetime(2024, 1, 1), "id": i} for i in (5, 4, 3)]
+    page, cursor = split_page(rows, 2)
+    assert [r["id"] for r in page] == [5, 4] and decode_cursor(cursor)[1] == 4
+    assert split_page(rows, 3) == (rows, None)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "!!!!",
+    "游标",
+    "a",
+    b64("not json"),
+    b64("{}"),
+    b64("[1]"),
+    b64("42"),
+    b64('["yesterday", 1]'),
+    b64('["2024-01-01T00:00:00", "abc"]'),
+    b64('["2024-01-01T00:00:00", 1, "sideways"]'),
+    b64('["2024-01-01T00:00:00", 1, "asc", "extra"]'),
+])
+def test_garbage_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def execute(sql, params=None):
+    connection = db_pool.get_db_connection()
+    try:
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        connection.commit()
+        return rows
+    finally:
+        connection.close()
+
+
+def list_users(**kwargs):
+    params = dict(page=1, page_size=20, user_type=None, is_active=None, search=None, page_cursor=None)
+    params.update(kwargs)
+    return json.loads(user_management._get_users(**params).body)
+
+
+@pytest.mark.parametrize("cursor", ["garbage", b64('["2024-01-01T00:00:00", "abc"]')])
+def test_list_endpoints_return_400_for_bad_cursor(backend, cursor):
+    with pytest.raises(HTTPException) as exc:
+        list_users(page_cursor=cursor)
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        admin_management._get_admins(1, 20, None, None, None, cursor)
+    assert exc.value.status_code == 400
+
+    asc_cursor = list_users(page_size=2, order="asc")["next_cursor"]
+    with pytest.raises(HTTPException) as exc:
+        list_users(page_cursor=asc_cursor)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("order", ["desc", "asc"])
+def test_paging_with_ties_on_created_at(backend, order):
+    # 6个示例用户同时创建；再把其中3个改为同一个更早的时间，得到两组created_at相同的行
+    execute("UPDATE users SET created_at = '2023-01-01 00:00:00' WHERE id IN (2, 4, 5)")
+    expected = [(row["created_at"], row["id"]) for row in execute("SELECT id, created_at FROM users")]
+    expected.sort(reverse=order == "desc")
+
+    seen, cursor = [], None
+    for _ in range(10):
+        page = list_users(page_size=2, page_cursor=cursor, order=order)
+        assert len(page["users"]) <= 2
+        seen.extend(user["id"] for user in page["users"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [row_id for _, row_id in expected]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
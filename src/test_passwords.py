@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+密码哈希服务测试脚本
+验证旧SHA-256格式与新格式的验证、升级判断、进程池计算和排队上限
+"""
+
+import asyncio
+import hashlib
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import passwords
+from passwords import (HashingBusyError, PasswordHasher, algorithm_of, check_hash, compute_hash, dummy_hash,
+                       needs_rehash)
+
+FAST_PARAMS = dict(passwords.PASSWORD_HASH_CONFIG, pbkdf2_iterations=1000, scrypt_n=2 ** 8)
+
+
+@pytest.fixture(autouse=True)
+def fast_params(monkeypatch):
+    """测试中使用很小的迭代次数"""
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_CONFIG", FAST_PARAMS)
+
+
+def test_legacy_sha256_still_verifies():
+    stored = hashlib.sha256(b"admin123").hexdigest()
+    assert check_hash("admin123", stored)
+    assert not check_hash("admin124", stored)
+
+
+@pytest.mark.parametrize("algorithm", ["pbkdf2_sha256", "scrypt"])
+def test_salted_round_trip(algorithm):
+    first = compute_hash("secret", algorithm, FAST_PARAMS)
+    second = compute_hash("secret", algorithm, FAST_PARAMS)
+    assert first.startswith(algorithm + "$")
+    assert first != second  # 每次使用不同的盐
+    assert check_hash("secret", first) and check_hash("secret", second)
+    assert not check_hash("Secret", first)
+
+
+def test_malformed_hash_does_not_verify():
+    assert not check_hash("x", "pbkdf2_sha256$abc$$")
+    assert not check_hash("x", "")
+    assert not check_hash("x", "plaintext")
+
+
+@pytest.mark.parametrize("algorithm", ["pbkdf2_sha256", "scrypt", "sha256"])
+def test_dummy_hash_matches_current_parameters(monkeypatch, algorithm):
+    monkeypatch.setitem(passwords.SECURITY_CONFIG, "password_hash_algorithm", algorithm)
+    stored = dummy_hash()
+    assert dummy_hash() == stored
+    # 与当前参数下的真实哈希格式和验证耗时相同，但不对应任何密码
+    assert algorithm_of(stored) == algorithm and not needs_rehash(stored)
+    real = compute_hash("", algorithm, FAST_PARAMS)
+    assert len(stored) == len(real)
+    assert not check_hash("", stored)
+
+
+def test_needs_rehash(monkeypatch):
+    monkeypatch.setitem(passwords.SECURITY_CONFIG, "password_hash_algorithm", "pbkdf2_sha256")
+    assert needs_rehash(hashlib.sha256(b"pw").hexdigest())
+    current = compute_hash("pw", "pbkdf2_sha256", FAST_PARAMS)
+    assert not needs_rehash(current)
+    weaker = compute_hash("pw", "pbkdf2_sha256", dict(FAST_PARAMS, pbkdf2_iterations=500))
+    assert needs_rehash(weaker)
+
+
+def test_process_pool_hashing(monkeypatch):
+    monkeypatch.setitem(passwords.SECURITY_CONFIG, "password_hash_algorithm", "pbkdf2_sha256")
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    try:
+        hashes = hasher.hash_many([f"pw{i}" for i in range(40)])
+        assert len(hashes) == 40
+        assert hasher.verify("pw39", hashes[39])
+        assert asyncio.run(hasher.verify_async("pw0", hashes[0]))
+        assert not asyncio.run(hasher.verify_async("pw0", hashes[1]))
+    finally:
+        hasher.shutdown()
+
+
+def test_pending_cap_rejects(monkeypatch):
+    monkeypatch.setitem(passwords.SECURITY_CONFIG, "password_hash_algorithm", "pbkdf2_sha256")
+    hasher = PasswordHasher(workers=1, max_pending=0)
+    try:
+        with pytest.raises(HashingBusyError):
+            hasher.hash("pw")
+        # 旧格式在调用线程中验证，不受上限影响
+        assert hasher.verify("pw", hashlib.sha256(b"pw").hexdigest())
+        assert hasher.stats()["rejected"] == 1
+    finally:
+        hasher.shutdown()
+
+
+def test_bulk_hashing_does_not_block_logins(monkeypatch):
+    """批量哈希排队的分块数超过max_pending时，登录的哈希和验证仍然立即被接受并先完成"""
+    monkeypatch.setitem(passwords.SECURITY_CONFIG, "password_hash_algorithm", "pbkdf2_sha256")
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_CONFIG", dict(FAST_PARAMS, pbkdf2_iterations=20000))
+    hasher = PasswordHasher(workers=1, max_pending=1, bulk_workers=1)
+    stored = hasher.hash("login")  # 预先启动登录进程池
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        bulk = loop.run_in_executor(None, hasher.hash_many,
+                                    [f"pw{i}" for i in range(passwords.HASH_CHUNK_SIZE * 6)])
+        while hasher.stats()["bulk_pending"] < 2:
+            await asyncio.sleep(0.01)
+        assert hasher.stats()["bulk_pending"] > hasher.max_pending
+        hashed = await hasher.hash_async("new")
+        verified = await hasher.verify_async("login", stored)
+        bulk_running = not bulk.done()
+        return hashed, verified, bulk_running, await bulk
+
+    try:
+        hashed, verified, bulk_running, bulk_hashes = asyncio.run(scenario())
+        assert check_hash("new", hashed) and verified
+        assert bulk_running  # 登录没有排在批量分块之后
+        assert len(bulk_hashes) == passwords.HASH_CHUNK_SIZE * 6
+        stats = hasher.stats()
+        assert stats["rejected"] == 0 and stats["pending"] == 0 and stats["bulk_pending"] == 0
+    finally:
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+管理员权限测试脚本
+验证权限注册表的位掩码、权限字符串解析缓存，以及权限依赖只在缓存未命中时读取用户行、
+更新管理员后缓存失效，以及只有开启权限检查时OpenAPI文档才把接口标记为需要Bearer令牌
+"""
+
+import asyncio
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+import auth
+import cache
+import permissions
+from permissions import (ALL_PERMISSIONS, PERMISSION_BITS, UnknownPermissionError, parse_permissions,
+                         permission_mask, permission_names, require_permissions)
+
+ADMIN_ROW = {"id": 7, "user_type": "admin", "is_active": True, "role_level": "admin",
+             "permissions": "user_manage,system_config"}
+
+
+def test_mask_round_trip():
+    mask = permission_mask(["system_config", "user_manage"])
+    assert mask == PERMISSION_BITS["user_manage"] | PERMISSION_BITS["system_config"]
+    assert permission_names(mask) == ["user_manage", "system_config"]
+    assert permission_names(ALL_PERMISSIONS) == list(permissions.PERMISSIONS)
+    with pytest.raises(UnknownPermissionError):
+        permission_mask(["user_manage", "root"])
+
+
+def test_parse_is_cached_and_tolerates_legacy_names():
+    parse_permissions.cache_clear()
+    names, mask = parse_permissions("user_manage,legacy_flag")
+    assert names == ("user_manage", "legacy_flag")
+    assert mask == PERMISSION_BITS["user_manage"]
+    parse_permissions("user_manage,legacy_flag")
+    assert parse_permissions.cache_info().hits == 1
+    assert parse_permissions(None) == ((), 0)
+
+
+def test_admin_mask_rules():
+    assert permissions.admin_mask(ADMIN_ROW) == permission_mask(["user_manage", "system_config"])
+    assert permissions.admin_mask(dict(ADMIN_ROW, role_level="super_admin")) == ALL_PERMISSIONS
+    assert permissions.admin_mask(dict(ADMIN_ROW, is_active=False)) == 0
+    assert permissions.admin_mask(dict(ADMIN_ROW, user_type="teacher")) == 0
+    assert permissions.admin_mask(None) == 0
+
+
+@pytest.fixture
+def enforced(monkeypatch):
+    """开启权限检查，并用内存中的管理员行代替数据库，返回行和加载次数"""
+    state = {"row": dict(ADMIN_ROW), "loads": 0}
+
+    def fake_get_user_row(user_id):
+        state["loads"] += 1
+        return state["row"]
+
+    monkeypatch.setitem(permissions.PERMISSION_CONFIG, "enforce", True)
+    monkeypatch.setattr(permissions, "get_user_row", fake_get_user_row)
+    cache.permission_cache.clear()
+    yield state
+    cache.permission_cache.clear()
+
+
+def check(dependency, user_type="admin"):
+    token = auth.generate_jwt_token({"id": 7, "user_type": user_type})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(dependency(credentials))
+
+
+def test_dependency_disabled_by_default(monkeypatch):
+    monkeypatch.setitem(permissions.PERMISSION_CONFIG, "enforce", False)
+    assert asyncio.run(require_permissions("admin_manage")()) is None
+
+
+@pytest.mark.parametrize("enforce", [False, True])
+def test_openapi_security_follows_enforcement(monkeypatch, enforce):
+    monkeypatch.setitem(permissions.PERMISSION_CONFIG, "enforce", enforce)
+    router = APIRouter(prefix="/admin", dependencies=[Depends(require_permissions("admin_manage"))])
+
+    @router.get("/")
+    async def list_admins():
+        return []
+
+    app = FastAPI()
+    app.include_router(router)
+    schema = app.openapi()
+    assert ("security" in schema["paths"]["/admin/"]["get"]) == enforce
+    assert ("securitySchemes" in schema.get("components", {})) == enforce
+
+
+def test_dependency_uses_cached_mask(enforced):
+    dependency = require_permissions("user_manage")
+    for _ in range(3):
+        assert check(dependency)["sub"] == "7"
+    assert enforced["loads"] == 1
+
+    with pytest.raises(HTTPException) as exc:
+        check(require_permissions("admin_manage"))
+    assert exc.value.status_code == 403
+    assert enforced["loads"] == 1
+
+
+def test_dependency_rejects_missing_token_and_non_admin(enforced):
+    dependency = require_permissions("user_manage")
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(dependency(None))
+    assert exc.value.status_code == 401
+    with pytest.raises(HTTPException) as exc:
+        check(dependency, user_type="student")
+    assert exc.value.status_code == 403
+
+
+def test_update_invalidates_cached_mask(enforced):
+    dependency = require_permissions("admin_manage")
+    with pytest.raises(HTTPException):
+        check(dependency)
+
+    # update_admin 写入新权限后调用 invalidate_user_caches(admin_id)
+    enforced["row"] = dict(ADMIN_ROW, permissions="user_manage,admin_manage")
+    cache.invalidate_user_caches(7)
+    assert check(dependency)["sub"] == "7"
+    assert enforced["loads"] == 2
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
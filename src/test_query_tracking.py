@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求级SQL统计测试脚本
+直接以ASGI方式调用一个小应用（不访问数据库），验证语句在数据库线程中执行时仍记到所属请求、
+Server-Timing 响应头，以及慢查询日志只记录参数形态而不记录参数值
+"""
+
+import asyncio
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from fastapi import FastAPI
+
+import query_tracking
+from config import QUERY_TRACKING_CONFIG
+from db_executor import DBExecutor
+from query_tracking import QueryTrackingMiddleware, current_queries, params_shape
+from repository import UserRepository
+
+
+class FakeCursor:
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchone(self):
+        return None
+
+
+def build_app(executor: DBExecutor) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/users/{user_id}")
+    async def get_user(user_id: int):
+        repository = UserRepository(FakeCursor())
+        await executor.run(repository.get_row, user_id)
+        await executor.run(repository.exists, user_id)
+        return current_queries().to_dict()
+
+    app.add_middleware(QueryTrackingMiddleware)
+    return app
+
+
+def call(app, path: str):
+    """发送GET请求，返回 (响应头dict, 响应体)"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [], "client": ("127.0.0.1", 5000), "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    start = next(m for m in messages if m["type"] == "http.response.start")
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+    return headers, body.decode()
+
+
+@pytest.fixture
+def executor():
+    executor = DBExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+def test_statements_counted_per_request(executor, monkeypatch):
+    monkeypatch.setitem(QUERY_TRACKING_CONFIG, 'server_timing', False)
+    headers, body = call(build_app(executor), "/users/7")
+    assert '"count":2' in body and '"errors":0' in body
+    assert '"slowest":"users.' in body
+    assert "server-timing" not in headers
+    assert current_queries() is None
+
+
+def test_server_timing_header(executor, monkeypatch):
+    monkeypatch.setitem(QUERY_TRACKING_CONFIG, 'server_timing', True)
+    headers, _ = call(build_app(executor), "/users/7")
+    assert headers["server-timing"].startswith('db;dur=')
+    assert 'desc="2 queries"' in headers["server-timing"]
+    assert "db-slowest;dur=" in headers["server-timing"]
+    assert headers["timing-allow-origin"] == "*"
+
+
+def test_slow_query_log_omits_values(monkeypatch, capsys):
+    monkeypatch.setitem(QUERY_TRACKING_CONFIG, 'slow_query_ms', 0)
+    query_tracking._on_statement("users.get_login_user", 0.25, False, ("alice", "alice@example.com", 3))
+    out = capsys.readouterr().out
+    assert "[慢查询] users.get_login_user 250.0ms" in out
+    assert "3个(str×2, int)" in out
+    assert "alice" not in out
+
+    monkeypatch.setitem(QUERY_TRACKING_CONFIG, 'slow_query_ms', None)
+    query_tracking._on_statement("users.get_row", 10.0, False, (1,))
+    assert capsys.readouterr().out == ""
+
+
+def test_params_shape():
+    assert params_shape(None) == "无参数"
+    assert params_shape([]) == "0个()"
+    assert params_shape({"a": 1, "b": None}) == "2个(int, NoneType)"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据访问层测试脚本
+验证语句名称注释、按名称的耗时统计，以及应用模块不再直接调用 cursor.execute
+"""
+
+import re
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import repository
+from repository import AdminRepository, LoginLogRepository, UserRepository, statement_stats
+
+
+class FakeCursor:
+    def __init__(self, row=None, fail=False):
+        self.row = row
+        self.fail = fail
+        self.executed = []
+        self.lastrowid = 5
+        self.rowcount = 1
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+        if self.fail:
+            raise RuntimeError("boom")
+
+    def fetchone(self):
+        return self.row
+
+    def fetchall(self):
+        return [self.row] if self.row else []
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    repository.reset_statement_stats()
+    yield
+    repository.reset_statement_stats()
+
+
+def test_statements_are_tagged_and_timed():
+    cursor = FakeCursor(row={"id": 1})
+    assert UserRepository(cursor).get_row(1) == {"id": 1}
+    assert UserRepository(cursor).get_row(2) == {"id": 1}
+    sql, params = cursor.executed[0]
+    assert sql.startswith("SELECT") and sql.endswith("/* users.get_row */")
+    assert params == (1,)
+    stats = statement_stats()["users.get_row"]
+    assert stats["calls"] == 2 and stats["errors"] == 0
+    assert stats["max_ms"] >= stats["avg_ms"] >= 0
+
+
+def test_failures_are_counted():
+    with pytest.raises(RuntimeError):
+        UserRepository(FakeCursor(fail=True)).count("", [])
+    assert statement_stats()["users.count"]["errors"] == 1
+
+
+def test_admin_scope_restricts_statements():
+    cursor = FakeCursor()
+    assert AdminRepository(cursor).set_active(9, False) == 1
+    sql, params = cursor.executed[0]
+    assert "user_type = 'admin'" in sql and sql.endswith("/* admins.set_active */")
+    assert params[0] is False and params[2] == 9
+
+
+def test_multi_row_statements():
+    cursor = FakeCursor()
+    LoginLogRepository(cursor).insert_batch([(1, "t", "ip", "ua", "success", None)] * 3)
+    sql, params = cursor.executed[0]
+    assert sql.count("(%s, %s, %s, %s, %s, %s)") == 3 and len(params) == 18
+    with pytest.raises(ValueError):
+        UserRepository(cursor).find_existing("password", ["x"])
+
+
+def test_invalid_statement_name_rejected():
+    with pytest.raises(ValueError):
+        repository.execute(FakeCursor(), "users.get */ DROP", "SELECT 1")
+
+
+def test_application_modules_do_not_execute_sql_directly():
+    """除数据访问层外，应用模块中不应出现 cursor.execute"""
+    src = os.path.dirname(__file__)
+    offenders = []
+    for name in os.listdir(src):
+        if not name.endswith(".py") or name.startswith("test_") or name == "repository.py":
+            continue
+        with open(os.path.join(src, name), encoding="utf-8") as f:
+            for lineno, line in enumerate(f, 1):
+                if re.search(r"cursor\.execute(many)?\(", line):
+                    offenders.append(f"{name}:{lineno}")
+    assert offenders == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
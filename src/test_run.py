@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动脚本测试脚本
+验证按连接预算计算的连接池大小写入应用实际使用的config模块（单worker时在本进程生效），
+并通过环境变量传给之后启动的worker进程；密码哈希进程数同样按worker数分配；
+生产模式缺少令牌签名密钥或（多worker时）吊销记录文件时拒绝启动
+"""
+
+import argparse
+import subprocess
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+import config
+import db_executor
+import db_pool
+import passwords
+import run
+
+
+@pytest.fixture
+def pool_config(monkeypatch):
+    """测试结束后恢复连接池配置和环境变量"""
+    monkeypatch.setitem(config.DB_POOL_CONFIG, "max_size", config.DB_POOL_CONFIG["max_size"])
+    monkeypatch.setitem(config.DB_POOL_CONFIG, "min_size", config.DB_POOL_CONFIG["min_size"])
+    monkeypatch.setitem(config.DB_EXECUTOR_CONFIG, "max_workers", config.DB_EXECUTOR_CONFIG["max_workers"])
+    monkeypatch.setenv("SDP_DB_POOL_MAX_SIZE", str(config.DB_POOL_CONFIG["max_size"]))
+
+
+def test_worker_pool_size():
+    assert run.worker_pool_size(120, 1) == 120
+    # 平滑重启期间多出一个worker，按 workers + 1 份分配
+    assert run.worker_pool_size(120, 5) == 20
+    assert run.worker_pool_size(3, 8) == 1
+
+
+def test_apply_pool_size_reaches_the_app_config(pool_config):
+    run.apply_pool_size(1)
+    # 应用启动时创建连接池和线程池读取的正是这两个字典
+    assert db_pool.DB_POOL_CONFIG["max_size"] == 1 and db_pool.DB_POOL_CONFIG["min_size"] == 1
+    assert db_executor.DB_EXECUTOR_CONFIG["max_workers"] == 1
+    assert run.DB_POOL_CONFIG is db_pool.DB_POOL_CONFIG
+
+
+def test_apply_pool_size_reaches_new_workers(pool_config):
+    run.apply_pool_size(3)
+    # worker进程重新导入config
+    output = subprocess.check_output(
+        [sys.executable, "-c", "import config; print(config.DB_POOL_CONFIG['max_size'], "
+                               "config.DB_EXECUTOR_CONFIG['max_workers'])"],
+        cwd=os.path.dirname(__file__), env=dict(os.environ), text=True)
+    assert output.split()[-2:] == ["3", "3"]
+
+
+
+@pytest.fixture
+def hash_config(monkeypatch):
+    """测试结束后恢复哈希进程数和环境变量"""
+    for key in ("workers", "bulk_workers"):
+        monkeypatch.setitem(config.PASSWORD_HASH_CONFIG, key, config.PASSWORD_HASH_CONFIG[key])
+        monkeypatch.setattr(passwords.password_hasher, key, getattr(passwords.password_hasher, key))
+    monkeypatch.setenv("SDP_HASH_WORKERS", str(config.PASSWORD_HASH_CONFIG["workers"]))
+    monkeypatch.setenv("SDP_BULK_HASH_WORKERS", str(config.PASSWORD_HASH_CONFIG["bulk_workers"]))
+
+
+def test_worker_hash_workers():
+    assert run.worker_hash_workers(8, 1) == 8
+    assert run.worker_hash_workers(8, 4) == 2
+    assert run.worker_hash_workers(4, 16) == 1
+    assert run.worker_hash_workers(0, 4) == 0  # 0表示在调用线程中计算
+
+
+def test_apply_hash_workers_reaches_app_and_new_workers(hash_config):
+    run.apply_hash_workers(2, 1)
+    assert passwords.PASSWORD_HASH_CONFIG["workers"] == 2 and passwords.password_hasher.workers == 2
+    assert passwords.password_hasher.bulk_workers == 1
+    output = subprocess.check_output(
+        [sys.executable, "-c", "import config; print(config.PASSWORD_HASH_CONFIG['workers'], "
+                               "config.PASSWORD_HASH_CONFIG['bulk_workers'])"],
+        cwd=os.path.dirname(__file__), env=dict(os.environ), text=True)
+    assert output.split()[-2:] == ["2", "1"]
+
+
+
+def production_args(workers):
+    return argparse.Namespace(workers=workers, host="127.0.0.1", port=8000, keep_alive=5, backlog=2048,
+                              graceful_timeout=30, db_connections=None, hash_workers=2, bulk_hash_workers=1,
+                              no_access_log=True)
+
+
+@pytest.mark.parametrize("workers, journal, starts", [
+    (1, None, True),
+    (2, None, False),
+    (2, "/tmp/revocations.log", True),
+])
+def test_production_requires_shared_revocation_journal(monkeypatch, pool_config, hash_config,
+                                                        workers, journal, starts):
+    started = []
+    monkeypatch.setattr(run.uvicorn, "run", lambda *args, **kwargs: started.append(kwargs["workers"]))
+    monkeypatch.setenv("SDP_PRODUCTION", "")
+    monkeypatch.setenv("SDP_TOKEN_SECRET", "secret")
+    if journal:
+        monkeypatch.setenv("SDP_REVOCATION_JOURNAL", journal)
+    else:
+        monkeypatch.delenv("SDP_REVOCATION_JOURNAL", raising=False)
+
+    if starts:
+        run.run_production(production_args(workers))
+        assert started == [workers]
+    else:
+        with pytest.raises(SystemExit):
+            run.run_production(production_args(workers))
+        assert started == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户搜索测试脚本
+验证全文索引与LIKE的选择（含短于ngram_token_size的关键词）、MATCH和LIKE参数的转义，
+以及在临时SQLite数据库上 %、_、引号和反斜杠按字面匹配
+"""
+
+import json
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import passwords
+import search
+import user_management
+from search import (FTS5_CONDITION, FULLTEXT_CONDITION, LIKE_CONDITION, SQLITE_LIKE_CONDITION,
+                    build_search_condition, can_use_fulltext, escape_like)
+from storage import SQLITE
+
+
+class MySQLCursor:
+    """build_search_condition只读取游标的dialect属性，pymysql游标没有该属性"""
+
+
+class SQLiteCursor:
+    dialect = SQLITE
+
+
+@pytest.fixture
+def fulltext(monkeypatch):
+    """假定全文索引存在"""
+    monkeypatch.setattr(search, "_fulltext_available", True)
+    monkeypatch.setitem(search.SEARCH_CONFIG, "use_fulltext", True)
+    monkeypatch.setitem(search.SEARCH_CONFIG, "ngram_token_size", 2)
+
+
+def test_can_use_fulltext():
+    assert can_use_fulltext("wang") and can_use_fulltext("13800") and can_use_fulltext("张三")
+    # 短于ngram_token_size的关键词无法用索引检索
+    assert not can_use_fulltext("w")
+    assert not can_use_fulltext("li", min_length=3)
+    for term in ("a b", "50%", "stu_a", 'say"hi', "o'neil", "wang@", "a\\b", "+wang", "wang*"):
+        assert not can_use_fulltext(term)
+
+
+def test_mysql_uses_fulltext_then_like(fulltext):
+    sql, params = build_search_condition(MySQLCursor(), "wang")
+    assert sql == f"{FULLTEXT_CONDITION} AND {LIKE_CONDITION}"
+    assert params == ['"wang"', "%wang%", "%wang%", "%wang%"]
+
+
+def test_mysql_falls_back_to_like(fulltext, monkeypatch):
+    assert build_search_condition(MySQLCursor(), "w") == (LIKE_CONDITION, ["%w%"] * 3)
+    # 含有引号或通配符的关键词不会进入MATCH参数
+    sql, params = build_search_condition(MySQLCursor(), 'a"b')
+    assert sql == LIKE_CONDITION and params == ['%a"b%'] * 3
+    monkeypatch.setattr(search, "_fulltext_available", False)
+    assert build_search_condition(MySQLCursor(), "wang")[0] == LIKE_CONDITION
+
+
+def test_sqlite_needs_three_characters_for_fts5(fulltext):
+    sql, params = build_search_condition(SQLiteCursor(), "wang")
+    assert sql == f"{FTS5_CONDITION} AND {SQLITE_LIKE_CONDITION}"
+    assert params[0] == '"wang"'
+    assert build_search_condition(SQLiteCursor(), "li") == (SQLITE_LIKE_CONDITION, ["%li%"] * 3)
+
+
+def test_like_wildcards_are_escaped(fulltext):
+    assert escape_like("50%_off\\") == "50\\%\\_off\\\\"
+    _, params = build_search_condition(MySQLCursor(), "stu_a%")
+    assert params == ["%stu\\_a\\%%"] * 3
+    _, params = build_search_condition(SQLiteCursor(), "o'neil")
+    assert params == ["%o'neil%"] * 3
+
+
+@pytest.fixture
+def special_users(backend):
+    """用户名中含有LIKE通配符、引号和反斜杠的用户"""
+    for username in ("pct%sign", "pctXsign", "o'neil", "back\\slash", "backXslash"):
+        user_management._create_user(user_management.UserCreate(username=username, password="pw"),
+                                     passwords.hash_password("pw"))
+
+
+def search_usernames(term):
+    body = user_management._get_users(page=1, page_size=50, user_type=None, is_active=None,
+                                      search=term, page_cursor=None).body
+    return {user["username"] for user in json.loads(body)["users"]}
+
+
+def test_special_characters_match_literally(special_users):
+    assert search_usernames("t%s") == {"pct%sign"}
+    assert search_usernames("t_s") == set()
+    assert search_usernames("r_z") == {"teacher_zhang"}
+    assert search_usernames("o'n") == {"o'neil"}
+    assert search_usernames("k\\s") == {"back\\slash"}
+    # 走FTS5索引的关键词结果与LIKE子串匹配一致
+    assert search_usernames("Xsign") == {"pctXsign"}
+    assert search_usernames("sign") == {"pct%sign", "pctXsign"}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应序列化测试脚本
+验证由数据库行直接编码的JSON与原来经FastAPI序列化的结果一致、多余的列不会输出，
+以及列表接口的OpenAPI文档仍引用原响应模型
+"""
+
+import json
+from datetime import datetime
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+
+import main
+from admin_management import AdminListResponse, _admin_fields
+from serialization import model_json, model_response
+from user_management import UserListResponse, UserResponse
+
+NOW = datetime(2024, 9, 1, 8, 30, 0)
+
+
+def user_row(user_id: int) -> dict:
+    return {"id": user_id, "username": f"user{user_id}", "email": None, "phone": "13800000000",
+            "user_type": "student", "is_active": 1, "created_at": NOW, "updated_at": NOW,
+            "last_login": None, "password": "pbkdf2_sha256$secret"}
+
+
+def test_matches_previous_encoding():
+    rows = [user_row(i) for i in range(3)]
+    data = {"total": 3, "total_estimated": False, "users": rows, "page": 1, "page_size": 10,
+            "next_cursor": None}
+    previous = UserListResponse(**dict(data, users=[UserResponse(**row) for row in rows]))
+    encoded = model_json(UserListResponse, data)
+    assert json.loads(encoded) == jsonable_encoder(previous)
+    assert b"password" not in encoded and b'"is_active":true' in encoded
+
+
+def test_admin_rows_and_invalid_rows():
+    row = dict(user_row(1), real_name="张三", department="教务处", role_level="admin",
+               permissions="user_manage,system_config", user_type="admin")
+    response = model_response(AdminListResponse, {"admins": [_admin_fields(row)], "page": 1,
+                                                  "page_size": 10})
+    assert response.media_type == "application/json"
+    admin = json.loads(response.body)["admins"][0]
+    assert admin["permissions"] == ["user_manage", "system_config"]
+    assert admin["real_name"] == "张三"
+
+    with pytest.raises(ValidationError):
+        model_json(UserResponse, dict(user_row(1), created_at=None))
+
+
+def test_openapi_schema_unchanged():
+    paths = main.app.openapi()["paths"]
+    schema = paths["/users/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema == {"$ref": "#/components/schemas/UserListResponse"}
+    schema = paths["/admin/{admin_id}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema == {"$ref": "#/components/schemas/AdminResponse"}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite存储后端测试脚本
+在临时目录中创建SQLite数据库（按 sql_scripts/ 中的SQLite脚本建表），全局连接池使用该后端，
+直接调用用户、管理员、登录各接口的数据库操作函数，验证MySQL写法的语句在SQLite上的行为一致
+"""
+
+import json
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pymysql
+import pytest
+from fastapi import HTTPException
+
+import admin_management
+import auth
+import db_pool
+import passwords
+import unique_constraints
+import user_management
+from storage import create_backend
+
+SEED_USERS = 6
+
+
+def query(sql, params=None):
+    connection = db_pool.get_db_connection()
+    try:
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+    finally:
+        connection.close()
+
+
+def list_users(**kwargs):
+    params = dict(page=1, page_size=20, user_type=None, is_active=None, search=None, page_cursor=None)
+    params.update(kwargs)
+    return json.loads(user_management._get_users(**params).body)
+
+
+def test_schema_seed_and_constraints(backend):
+    assert len(query("SELECT id FROM users")) == SEED_USERS
+    assert backend.fts_available
+    connection = db_pool.get_db_connection()
+    try:
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            assert unique_constraints._detect_unique_keys(cursor) == {
+                "sqlite_autoindex_users_1": "username", "uk_email": "email", "uk_phone": "phone"}
+    finally:
+        connection.close()
+    with pytest.raises(ValueError):
+        create_backend("postgres")
+
+
+def test_user_crud_and_duplicates(backend):
+    user = user_management._create_user(user_management.UserCreate(
+        username="new_user", password="pw", email="new@example.com", phone="13900000000"), passwords.hash_password("pw"))
+    assert user.id == SEED_USERS + 1
+
+    with pytest.raises(HTTPException) as exc:
+        user_management._create_user(user_management.UserCreate(
+            username="other_user", password="pw", email="NEW@example.com"), passwords.hash_password("pw"))
+    assert exc.value.detail == "邮箱地址已存在"
+
+    updated = user_management._update_user(user.id, user_management.UserUpdate(phone="13900000001"))
+    assert updated.phone == "13900000001"
+    with pytest.raises(HTTPException) as exc:
+        user_management._update_user(user.id, user_management.UserUpdate(username="admin"))
+    assert exc.value.status_code == 400
+
+    detail = json.loads(user_management._get_user(user.id).body)
+    assert detail["username"] == "new_user" and detail["is_active"] is True
+
+    user_management._delete_user(user.id)
+    assert json.loads(user_management._get_user(user.id).body)["is_active"] is False
+
+
+def test_bulk_create_reports_conflicts(backend):
+    users = [user_management.UserCreate(username=f"bulk_{i}", password="pw") for i in range(3)]
+    users.append(user_management.UserCreate(username="teacher_zhang", password="pw"))
+    result = user_management._create_users_bulk(users)
+    assert result.created == 3 and result.failed == 1
+
+
+def test_list_search_and_cursor_paging(backend):
+    assert [u["username"] for u in list_users(search="school")["users"]] == ["teacher_li", "teacher_zhang"]
+    # 少于3个字符的关键词不走FTS5，仍按LIKE子串匹配
+    assert {u["username"] for u in list_users(search="li")["users"]} == {"teacher_li", "student_liu"}
+    assert list_users(user_type="student", estimate_total=True)["total"] == 3
+
+    first = list_users(page_size=4)
+    assert first["total"] == SEED_USERS and first["next_cursor"]
+    second = list_users(page_size=4, page_cursor=first["next_cursor"])
+    ids = [u["id"] for u in first["users"] + second["users"]]
+    assert sorted(ids) == list(range(1, SEED_USERS + 1))
+    assert second["next_cursor"] is None
+
+
+def test_admin_crud(backend):
+    admin = admin_management._create_admin(admin_management.AdminCreate(
+        username="ops", password="pw", real_name="运维", department="信息中心",
+        permissions=["user_manage"]), passwords.hash_password("pw"))
+    body = json.loads(admin_management._get_admins(1, 20, None, None, None, None).body)
+    assert {a["username"] for a in body["admins"]} == {"admin", "ops"}
+
+    admin_management._update_admin(admin.id, admin_management.AdminUpdate(role_level="super_admin"))
+    assert json.loads(admin_management._get_admin(admin.id).body)["role_level"] == "super_admin"
+    with pytest.raises(HTTPException):
+        admin_management._get_admin(2)  # teacher_zhang不是管理员
+
+
+def test_login_upgrades_hash_and_writes_log(backend):
+    user = auth._fetch_login_user("student_wang")
+    assert passwords.verify_password("student123", user["password"])
+
+    auth._complete_login(user["id"], "stale-hash", "new-hash")
+    assert query("SELECT password FROM users WHERE id = %s", (user["id"],))[0]["password"] == user["password"]
+    auth._complete_login(user["id"], user["password"], "new-hash")
+    row = query("SELECT password, last_login, updated_at FROM users WHERE id = %s", (user["id"],))[0]
+    assert row["password"] == "new-hash" and row["last_login"] is not None
+
+    logs = query("SELECT user_id, login_status FROM login_logs")
+    assert logs == [{"user_id": user["id"], "login_status": "success"}] * 2
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+令牌吊销测试脚本
+验证吊销记录的追加写入和重启恢复、过期条目淘汰、文件压缩，
+以及按sync_interval读取其他worker写入的吊销记录
+"""
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import token_revocation
+from token_revocation import RevocationSet
+
+
+class FakeClock:
+    """替换token_revocation模块使用的time（time()为墙上时间，monotonic()用于同步间隔）"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(token_revocation, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "revoked.log")
+
+
+def journal_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_memory_only_revocation(clock):
+    revocations = RevocationSet()
+    revocations.revoke("a1b2c3d4e5f60718", clock.now + 60)
+    assert revocations.is_revoked("a1b2c3d4e5f60718")
+    assert not revocations.is_revoked("0000000000000000")
+    # 已过期的令牌不需要记录
+    revocations.revoke("1111111111111111", clock.now - 1)
+    assert len(revocations) == 1
+
+
+def test_journal_append_and_reload(clock, journal):
+    first = RevocationSet(journal)
+    first.revoke("a1b2c3d4e5f60718", int(clock.now) + 60)
+    first.revoke("not-hex-jti", int(clock.now) + 120)
+    assert journal_lines(journal) == [f"a1b2c3d4e5f60718 {int(clock.now) + 60}",
+                                      f"not-hex-jti {int(clock.now) + 120}"]
+
+    # 模拟重启：新进程从文件恢复
+    restarted = RevocationSet(journal)
+    restarted.load()
+    assert restarted.is_revoked("a1b2c3d4e5f60718") and restarted.is_revoked("not-hex-jti")
+    assert len(restarted) == 2
+
+
+def test_reload_skips_partial_and_garbage_lines(clock, journal):
+    with open(journal, "w") as f:
+        f.write(f"a1b2c3d4e5f60718 {int(clock.now) + 60}\ngarbage\nb1b2c3d4 {int(clock.now) + 60}")
+    revocations = RevocationSet(journal)
+    revocations.load()
+    # 最后一行没有换行符，可能正在被其他worker写入，暂不处理
+    assert revocations.is_revoked("a1b2c3d4e5f60718")
+    assert not revocations.is_revoked("b1b2c3d4")
+
+
+def test_expired_entries_are_pruned(clock):
+    revocations = RevocationSet()
+    revocations.revoke("aaaaaaaaaaaaaaaa", clock.now + 10)
+    revocations.revoke("bbbbbbbbbbbbbbbb", clock.now + 100)
+    clock.now += 10
+    assert not revocations.is_revoked("aaaaaaaaaaaaaaaa")
+    # 下一次吊销时清理已过期的条目
+    revocations.revoke("cccccccccccccccc", clock.now + 100)
+    assert len(revocations) == 2
+    assert revocations.is_revoked("bbbbbbbbbbbbbbbb")
+
+
+def test_load_compacts_journal_of_expired_entries(clock, journal):
+    with open(journal, "w") as f:
+        for i in range(20):
+            f.write(f"{i:016x} {int(clock.now) - 1}\n")
+        f.write(f"{99:016x} {int(clock.now) + 60}\n")
+    revocations = RevocationSet(journal, compact_min_lines=10)
+    revocations.load()
+    assert journal_lines(journal) == [f"{99:016x} {int(clock.now) + 60}"]
+    assert revocations.is_revoked(f"{99:016x}")
+
+
+def test_load_keeps_small_journal(clock, journal):
+    with open(journal, "w") as f:
+        for i in range(5):
+            f.write(f"{i:016x} {int(clock.now) - 1}\n")
+    RevocationSet(journal, compact_min_lines=10).load()
+    assert len(journal_lines(journal)) == 5
+
+
+def test_sync_interval_picks_up_other_worker(clock, journal):
+    worker_a = RevocationSet(journal, sync_interval=5)
+    worker_b = RevocationSet(journal, sync_interval=5)
+    worker_b.load()
+    assert not worker_b.is_revoked("a1b2c3d4e5f60718")  # 读取一次，下次同步在5秒后
+
+    worker_a.revoke("a1b2c3d4e5f60718", clock.now + 60)
+    assert not worker_b.is_revoked("a1b2c3d4e5f60718")
+    clock.now += 5
+    assert worker_b.is_revoked("a1b2c3d4e5f60718")
+
+
+def test_sync_compacts_growing_journal(clock, journal):
+    worker_a = RevocationSet(journal, sync_interval=0, compact_min_lines=10)
+    worker_b = RevocationSet(journal, sync_interval=0, compact_min_lines=10)
+    for i in range(20):
+        worker_a.revoke(f"{i:016x}", clock.now + 10)
+    worker_a.revoke(f"{99:016x}", clock.now + 100)
+    assert len(journal_lines(journal)) == 21
+
+    clock.now += 10
+    assert worker_b.is_revoked(f"{99:016x}")
+    # 文件中只剩有效记录，其他worker读取替换后的文件并继续追加
+    assert journal_lines(journal) == [f"{99:016x} {int(clock.now) + 90}"]
+    worker_a.revoke(f"{100:016x}", clock.now + 100)
+    assert worker_b.is_revoked(f"{100:016x}") and worker_a.is_revoked(f"{99:016x}")
+    assert len(journal_lines(journal)) == 2
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
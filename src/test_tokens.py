@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+访问令牌测试脚本
+验证令牌的签名和有效期检查、格式错误的令牌被拒绝，以及刷新时对用户状态和最长会话时间的检查
+"""
+
+import base64
+import json
+import time
+
+# 添加当前目录到Python路径
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+import auth
+import token_revocation
+from token_revocation import RevocationSet
+
+USER = {"id": 7, "user_type": "student"}
+ACTIVE_ROW = {"id": 7, "username": "student_wang", "user_type": "student", "is_active": True}
+
+
+@pytest.fixture(autouse=True)
+def revocations(monkeypatch):
+    """每个测试使用独立的内存吊销集合"""
+    monkeypatch.setattr(token_revocation, "_revocations", RevocationSet())
+
+
+@pytest.fixture
+def user_rows(monkeypatch):
+    """刷新令牌时读取的用户行，测试中可修改"""
+    rows = {7: dict(ACTIVE_ROW)}
+    monkeypatch.setattr(auth, "get_user_row", rows.get)
+    return rows
+
+
+def b64(data) -> str:
+    if not isinstance(data, bytes):
+        data = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def signed(payload: str) -> str:
+    """用正确的密钥给任意载荷签名，用于验证签名之后的解析错误"""
+    signing_input = auth._TOKEN_HEADER + b'.' + payload.encode()
+    return (signing_input + b'.' + auth._sign(signing_input)).decode()
+
+
+def test_round_trip():
+    claims = auth.verify_jwt_token(auth.generate_jwt_token(USER))
+    assert claims["sub"] == "7" and claims["user_type"] == "student"
+    assert claims["auth_time"] == claims["iat"]
+    assert claims["exp"] == claims["iat"] + auth.SECURITY_CONFIG["session_timeout"]
+
+
+def test_tampered_payload_and_signature_are_rejected():
+    header, payload, signature = auth.generate_jwt_token(USER).split('.')
+    claims = json.loads(auth._b64decode(payload))
+    claims["user_type"] = "admin"
+    assert auth.verify_jwt_token(f"{header}.{b64(claims)}.{signature}") is None
+
+    flipped = ('A' if signature[0] != 'A' else 'B') + signature[1:]
+    assert auth.verify_jwt_token(f"{header}.{payload}.{flipped}") is None
+    assert auth.verify_jwt_token(f"{header}.{payload}.") is None
+
+    other_header = b64({"alg": "none", "typ": "JWT"})
+    assert auth.verify_jwt_token(f"{other_header}.{payload}.{signature}") is None
+
+
+def test_wrong_secret_is_rejected(monkeypatch):
+    monkeypatch.setattr(auth, "_TOKEN_KEY", b"another-secret")
+    token = auth.generate_jwt_token(USER)
+    monkeypatch.undo()
+    assert auth.verify_jwt_token(token) is None
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    monkeypatch.setitem(auth.SECURITY_CONFIG, "session_timeout", -1)
+    assert auth.verify_jwt_token(auth.generate_jwt_token(USER)) is None
+
+
+@pytest.mark.parametrize("token", [None, "", "abc", "a.b", "a.b.c.d", "...", "é.é.é"])
+def test_malformed_segments_are_rejected(token):
+    assert auth.verify_jwt_token(token) is None
+
+
+@pytest.mark.parametrize("payload", [
+    "!!!!",                                      # 不是base64
+    "a",                                         # 长度不合法的base64
+    b64(b"\xff\xfe"),                            # 不是UTF-8
+    b64(b"not json"),
+    b64([1, 2, 3]),                              # 不是对象
+    b64({"sub": "7", "user_type": "student"}),   # 缺少exp
+    b64({"sub": "7", "exp": "never"}),           # exp不是数字
+])
+def test_signed_garbage_payload_is_rejected(payload):
+    assert auth.verify_jwt_token(signed(payload)) is None
+
+
+def test_revoked_token_is_rejected():
+    token = auth.generate_jwt_token(USER)
+    claims = auth.verify_jwt_token(token)
+    auth.revoke_token(claims["jti"], claims["exp"])
+    assert auth.verify_jwt_token(token) is None
+
+
+def test_refresh_keeps_auth_time_and_revokes_old_token(user_rows):
+    auth_time = int(time.time()) - 600
+    token = auth.generate_jwt_token(USER, auth_time)
+    new_token = auth.refresh_token(token)
+    claims = auth.verify_jwt_token(new_token)
+    assert claims["sub"] == "7" and claims["auth_time"] == auth_time
+    assert claims["iat"] >= auth_time + 600
+    assert auth.verify_jwt_token(token) is None
+    assert auth.refresh_token(token) is None
+
+
+def test_refresh_uses_current_user_type(user_rows):
+    user_rows[7]["user_type"] = "teacher"
+    claims = auth.verify_jwt_token(auth.refresh_token(auth.generate_jwt_token(USER)))
+    assert claims["user_type"] == "teacher"
+
+
+def test_refresh_of_inactive_or_deleted_user_is_refused(user_rows):
+    token = auth.generate_jwt_token(USER)
+    user_rows[7]["is_active"] = False
+    assert auth.refresh_token(token) is None
+    # 拒绝刷新时不吊销原令牌
+    assert auth.verify_jwt_token(token) is not None
+
+    del user_rows[7]
+    assert auth.refresh_token(token) is None
+
+
+def test_refresh_past_max_session_age_is_refused(user_rows, monkeypatch):
+    token = auth.generate_jwt_token(USER, int(time.time()) - 100)
+    monkeypatch.setitem(auth.SECURITY_CONFIG, "max_session_age", 50)
+    assert auth.refresh_token(token) is None
+
+
+def test_expiry_is_capped_by_max_session_age(monkeypatch):
+    monkeypatch.setitem(auth.SECURITY_CONFIG, "max_session_age", 1000)
+    auth_time = int(time.time()) - 900
+    claims = auth.verify_jwt_token(auth.generate_jwt_token(USER, auth_time))
+    assert claims["exp"] == auth_time + 1000
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
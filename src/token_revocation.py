@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+令牌吊销模块
+登出时把令牌的jti放入内存吊销集合，令牌验证时O(1)检查，
+条目在令牌本身过期时自动淘汰；可选的追加写入文件用于重启恢复和多worker共享
+"""
+
+import heapq
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+try:
+    import fcntl
+except ImportError:  # Windows没有fcntl，仅单进程使用时不需要文件锁
+    fcntl = None
+try:
+    from .config import TOKEN_REVOCATION_CONFIG
+except ImportError:
+    from config import TOKEN_REVOCATION_CONFIG
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class RevocationSet:
+    """
+    已吊销令牌集合
+
+    - 内存中以 jti(8字节) -> 过期时间 的字典保存，检查为一次字典查找
+    - 最小堆按过期时间排序，吊销新令牌时顺带清理已过期的条目
+    - journal_path不为空时，每次吊销追加一行 "jti 过期时间" 到文件；
+      验证时最多每sync_interval秒读取一次文件新增部分，获取其他worker的吊销记录；
+      文件行数超过有效记录数的compact_ratio倍时，用有效记录重写文件，长期运行时文件不会无限增长
+    """
+
+    def __init__(self, journal_path: Optional[str] = None, sync_interval: float = 1.0,
+                 compact_ratio: float = 2.0, compact_min_lines: int = 100):
+        self.journal_path = journal_path
+        self.sync_interval = sync_interval
+        self.compact_ratio = compact_ratio
+        self.compact_min_lines = compact_min_lines
+        self._entries: Dict[bytes, int] = {}
+        self._heap: List[Tuple[int, bytes]] = []
+        self._lock = threading.Lock()
+        self._journal_inode: Optional[int] = None
+        self._journal_offset = 0
+        self._journal_lines = 0
+        self._next_sync = 0.0
+
+    @staticmethod
+    def _key(jti: str) -> bytes:
+        try:
+            return bytes.fromhex(jti)
+        except ValueError:
+            return jti.encode()
+
+    def _add(self, key: bytes, expires_at: int):
+        """调用方需持有self._lock"""
+        current = self._entries.get(key)
+        if current is None or expires_at > current:
+            self._entries[key] = expires_at
+            heapq.heappush(self._heap, (expires_at, key))
+
+    def _purge(self, now: float):
+        """调用方需持有self._lock"""
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            if self._entries.get(key) == expires_at:
+                del self._entries[key]
+
+    def revoke(self, jti: str, expires_at: int):
+        """吊销令牌，expires_at为令牌自身的过期时间（Unix时间戳）"""
+        now = time.time()
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._purge(now)
+            self._add(self._key(jti), int(expires_at))
+        if self.journal_path:
+            try:
+                self._append(jti, int(expires_at))
+            except OSError as e:
+                print(f"写入令牌吊销记录失败: {e}")
+
+    def is_revoked(self, jti: str) -> bool:
+        """检查令牌是否已被吊销"""
+        if self.journal_path:
+            self._maybe_sync()
+        expires_at = self._entries.get(self._key(jti))
+        return expires_at is not None and expires_at > time.time()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _append(self, jti: str, expires_at: int):
+        line = f"{jti} {expires_at}\n".encode()
+        while True:
+            with open(self.journal_path, 'ab') as f:
+                _lock_file(f)
+                try:
+                    # 加锁期间文件可能被压缩替换，需要写到当前文件
+                    if os.fstat(f.fileno()).st_ino != os.stat(self.journal_path).st_ino:
+                        continue
+                    f.write(line)
+                    f.flush()
+                    return
+                finally:
+                    _unlock_file(f)
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if now < self._next_sync or not self._lock.acquire(blocking=False):
+            return
+        compact = False
+        try:
+            self._next_sync = now + self.sync_interval
+            self._read_journal()
+            compact = self._needs_compaction()
+        except OSError as e:
+            print(f"读取令牌吊销记录失败: {e}")
+        finally:
+            self._lock.release()
+        if compact:
+            try:
+                self._compact()
+            except OSError as e:
+                print(f"压缩令牌吊销记录失败: {e}")
+
+    def _needs_compaction(self) -> bool:
+        """文件中的行数是否远多于有效记录数；调用方需持有self._lock"""
+        return (self._journal_lines > self.compact_min_lines
+                and self._journal_lines > self.compact_ratio * len(self._entries))
+
+    def _read_journal(self) -> int:
+        """读取文件中新增的吊销记录，返回本次读取的行数；调用方需持有self._lock"""
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return 0
+        with f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self._journal_inode or stat.st_size < self._journal_offset:
+                # 文件被压缩替换，从头读取
+                self._journal_inode = stat.st_ino
+                self._journal_offset = 0
+                self._journal_lines = 0
+            f.seek(self._journal_offset)
+            data = f.read()
+
+        end = data.rfind(b'\n') + 1  # 只处理完整的行
+        lines = data[:end].splitlines()
+        for line in lines:
+            try:
+                jti, expires_at = line.decode().split()
+                self._add(self._key(jti), int(expires_at))
+            except ValueError:
+                continue
+        self._journal_offset += end
+        self._journal_lines += len(lines)
+        self._purge(time.time())
+        return len(lines)
+
+    def load(self):
+        """启动时从文件恢复吊销记录；文件中过期和重复的记录过多时压缩文件"""
+        if not self.journal_path:
+            return
+        with self._lock:
+            self._read_journal()
+            compact = self._needs_compaction()
+        if compact:
+            self._compact()
+
+    def _compact(self):
+        """用仍然有效的记录重写文件，通过原子替换保证其他worker读写安全"""
+        tmp_path = f"{self.journal_path}.{os.getpid()}.tmp"
+        with open(self.journal_path, 'ab') as current:
+            _lock_file(current)
+            try:
+                with self._lock:
+                    self._read_journal()
+                    entries = list(self._entries.items())
+                with open(tmp_path, 'wb') as tmp:
+                    for key, expires_at in entries:
+                        tmp.write(f"{key.hex()} {expires_at}\n".encode())
+                    tmp.flush()
+                    os.fsync(tmp.fileno())
+                os.replace(tmp_path, self.journal_path)
+            finally:
+                _unlock_file(current)
+
+    def stats(self) -> Dict:
+        return {
+            "revoked_tokens": len(self._entries),
+            "journal_path": self.journal_path,
+            "journal_lines": self._journal_lines,
+        }
+
+
+_revocations = RevocationSet(**TOKEN_REVOCATION_CONFIG)
+
+
+def load_revocations():
+    """从持久化文件恢复吊销记录（在应用lifespan启动阶段调用）"""
+    try:
+        _revocations.load()
+    except OSError as e:
+        print(f"加载令牌吊销记录失败: {e}")
+
+
+def revoke_token(jti: str, expires_at: int):
+    """吊销指定令牌直到其过期"""
+    _revocations.revoke(jti, expires_at)
+
+
+def is_token_revoked(jti: str) -> bool:
+    """令牌是否已被吊销"""
+    return _revocations.is_revoked(jti)
+
+
+def revocation_stats() -> Dict:
+    """吊销集合统计信息"""
+    return _revocations.stats()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+唯一性检查模块
+users表的username/email/phone都有唯一约束时，创建和更新直接写入，
+由数据库报告冲突（IntegrityError）；约束不全时（尚未执行
+add_unique_contact_constraints.sql）用一条查询同时检查三个字段
+"""
+
+import re
+import threading
+from typing import Dict, Optional
+import pymysql
+try:
+    from .repository import UserRepository
+except ImportError:
+    from repository import UserRepository
+
+UNIQUE_FIELDS = ("username", "email", "phone")
+DUPLICATE_ENTRY = 1062
+_DUPLICATE_KEY_PATTERN = re.compile(r"for key '(?:[^'.]+\.)?([^']+)'")
+
+_unique_keys: Optional[Dict[str, str]] = None  # 唯一索引名 -> 列名
+_lock = threading.Lock()
+
+
+def _detect_unique_keys(cursor) -> Dict[str, str]:
+    """读取users表上的单列唯一索引，结果在进程内缓存"""
+    global _unique_keys
+    if _unique_keys is None:
+        with _lock:
+            if _unique_keys is None:
+                rows = UserRepository(cursor).unique_indexes()
+                columns_per_key: Dict[str, list] = {}
+                for row in rows:
+                    columns_per_key.setdefault(row["Key_name"], []).append(row["Column_name"])
+                _unique_keys = {key: columns[0] for key, columns in columns_per_key.items()
+                                if len(columns) == 1 and columns[0] in UNIQUE_FIELDS}
+                missing = set(UNIQUE_FIELDS) - set(_unique_keys.values())
+                if missing:
+                    print(f"users表的 {', '.join(sorted(missing))} 没有唯一约束，写入前将先查询检查冲突")
+    return _unique_keys
+
+
+def reset_unique_constraint_detection():
+    """重新检测唯一约束（执行约束迁移脚本后调用）"""
+    global _unique_keys
+    with _lock:
+        _unique_keys = None
+
+
+def find_conflict(cursor, values: Dict[str, Optional[str]], exclude_id: Optional[int] = None) -> Optional[str]:
+    """
+    返回第一个与其他用户冲突的字段名（按username、email、phone顺序），没有冲突返回None
+
+    约束齐全时不执行任何查询，冲突由写入语句的IntegrityError报告（见duplicate_field）；
+    否则用一条查询检查所有提供的字段，比较规则与表的排序规则一致
+    """
+    fields = [f for f in UNIQUE_FIELDS if values.get(f)]
+    if not fields:
+        return None
+    unique_columns = set(_detect_unique_keys(cursor).values())
+    if all(f in unique_columns for f in fields):
+        return None
+
+    row = UserRepository(cursor).find_conflict({f: values[f] for f in fields}, exclude_id)
+    if not row:
+        return None
+    return next((f for f in fields if row[f]), None)
+
+
+def duplicate_field(error: pymysql.err.IntegrityError) -> Optional[str]:
+    """把唯一约束冲突的IntegrityError映射为字段名，不是唯一约束冲突时返回None"""
+    if not error.args or error.args[0] != DUPLICATE_ENTRY:
+        return None
+    match = _DUPLICATE_KEY_PATTERN.search(str(error.args[1]) if len(error.args) > 1 else "")
+    if not match:
+        return None
+    key = match.group(1)
+    return (_unique_keys or {}).get(key, key if key in UNIQUE_FIELDS else None)
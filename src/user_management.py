@@ -5,19 +5,54 @@
 实现用户的增删改查功能
 """
 
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, EmailStr, ValidationError
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import csv
+import os
+import tempfile
 import pymysql
 from datetime import datetime
-import hashlib
 try:
-    from .config import DB_CONFIG
+    from .config import BULK_CREATE_CONFIG, EXPORT_CONFIG, IMPORT_CONFIG
+    from .db_pool import get_db_connection
+    from .db_router import get_read_connection
+    from .db_executor import run_db
+    from .pagination import (DEFAULT_ORDER, KEYSET_ORDER_BY, InvalidCursorError, keyset_condition,
+                             split_page, fetch_total)
+    from .cache import count_cache_key, invalidate_user_caches, get_user_row
+    from .search import build_search_condition
+    from .unique_constraints import duplicate_field, find_conflict
+    from .passwords import hash_passwords, password_hasher
+    from .permissions import require_permissions
+    from .repository import UserRepository
+    from .serialization import model_response
+    from .streaming import EXPORT_FORMATS, CursorStream, iter_stream
+    from .import_jobs import (ImportJob, RosterFormatError, RosterReader, ROSTER_COLUMNS,
+                              create_job, get_job, load_job, save_job, start_job_task)
 except ImportError:
-    from config import DB_CONFIG
+    from config import BULK_CREATE_CONFIG, EXPORT_CONFIG, IMPORT_CONFIG
+    from db_pool import get_db_connection
+    from db_router import get_read_connection
+    from db_executor import run_db
+    from pagination import (DEFAULT_ORDER, KEYSET_ORDER_BY, InvalidCursorError, keyset_condition,
+                            split_page, fetch_total)
+    from cache import count_cache_key, invalidate_user_caches, get_user_row
+    from search import build_search_condition
+    from unique_constraints import duplicate_field, find_conflict
+    from passwords import hash_passwords, password_hasher
+    from permissions import require_permissions
+    from repository import UserRepository
+    from serialization import model_response
+    from streaming import EXPORT_FORMATS, CursorStream, iter_stream
+    from import_jobs import (ImportJob, RosterFormatError, RosterReader, ROSTER_COLUMNS,
+                             create_job, get_job, load_job, save_job, start_job_task)
 
 # 创建路由器
-router = APIRouter(prefix="/users", tags=["用户管理"])
+router = APIRouter(prefix="/users", tags=["用户管理"],
+                   dependencies=[Depends(require_permissions("user_manage"))])
 
 # 数据模型定义
 class UserCreate(BaseModel):
@@ -50,23 +85,131 @@ class UserResponse(BaseModel):
 
 class UserListResponse(BaseModel):
     """用户列表响应模型"""
-    total: int
+    total: Optional[int] = None  # include_total=false时为None
+    total_estimated: bool = False  # total是否为估算值
     users: List[UserResponse]
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # 下一页游标，没有更多数据时为None
+
+class BulkUserCreate(BaseModel):
+    """批量创建用户请求模型"""
+    users: List[UserCreate]
+
+class BulkUserResult(BaseModel):
+    """批量创建中单行的结果"""
+    index: int  # 在请求users列表中的下标
+    username: str
+    success: bool
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class ImportRowError(BaseModel):
+    """导入中单行的错误"""
+    row: int  # CSV文件中的行号（表头为第1行）
+    username: Optional[str] = None
+    error: str
+
+class ImportJobResponse(BaseModel):
+    """花名册导入任务进度响应模型"""
+    job_id: str
+    filename: Optional[str] = None
+    status: str  # pending/running/completed/failed
+    processed: int
+    created: int
+    skipped: int
+    failed: int
+    chunks: int
+    errors: List[ImportRowError]
+    errors_truncated: bool
+    message: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+class BulkUserCreateResponse(BaseModel):
+    """批量创建用户响应模型"""
+    total: int
+    created: int
+    failed: int
+    results: List[BulkUserResult]
+
+VALID_USER_TYPES = ["admin", "teacher", "student"]
+USERNAME_EXISTS = "用户名已存在"
 
-def get_db_connection():
-    """获取数据库连接"""
+CREATE_CONFLICT_MESSAGES = {
+    "username": "用户名已存在",
+    "email": "邮箱地址已存在",
+    "phone": "手机号码已存在",
+}
+UPDATE_CONFLICT_MESSAGES = {
+    "username": "用户名已被其他用户使用",
+    "email": "邮箱地址已被其他用户使用",
+    "phone": "手机号码已被其他用户使用",
+}
+
+def _create_user(user_data: UserCreate, hashed_password: str):
+    """
+    创建新用户（数据库操作部分）
+    
+    唯一约束齐全时只执行一条INSERT，冲突由IntegrityError映射为原来的错误信息，
+    响应直接由已知的值构造
+    """
+    # 验证用户类型
+    if user_data.user_type not in VALID_USER_TYPES:
+        raise HTTPException(status_code=400, detail=f"用户类型必须是: {', '.join(VALID_USER_TYPES)}")
+    
+    # 空字符串视为未提供，避免与唯一约束冲突
+    email = user_data.email or None
+    phone = user_data.phone or None
+    # TIMESTAMP列不保存微秒，去掉后响应与数据库中的值一致
+    now = datetime.now().replace(microsecond=0)
+    
+    connection = get_db_connection()
+    if not connection:
+        raise HTTPException(status_code=500, detail="数据库连接失败")
+    
     try:
-        connection = pymysql.connect(**DB_CONFIG)
-        return connection
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            conflict = find_conflict(cursor, {"username": user_data.username, "email": email, "phone": phone})
+            if conflict:
+                raise HTTPException(status_code=400, detail=CREATE_CONFLICT_MESSAGES[conflict])
+            
+            # 创建用户
+            try:
+                user_id = UserRepository(cursor).insert({
+                    "username": user_data.username,
+                    "password": hashed_password,
+                    "email": email,
+                    "phone": phone,
+                    "user_type": user_data.user_type,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+            except pymysql.err.IntegrityError as e:
+                field = duplicate_field(e)
+                if field:
+                    raise HTTPException(status_code=400, detail=CREATE_CONFLICT_MESSAGES[field])
+                raise
+        
+        invalidate_user_caches()
+        return UserResponse(
+            id=user_id,
+            username=user_data.username,
+            email=email,
+            phone=phone,
+            user_type=user_data.user_type,
+            is_active=True,
+            created_at=now,
+            updated_at=now
+        )
+            
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"数据库连接失败: {e}")
-        return None
-
-def hash_password(password: str) -> str:
-    """对密码进行哈希处理"""
-    return hashlib.sha256(password.encode()).hexdigest()
+        print(f"创建用户时出错: {e}")
+        raise HTTPException(status_code=500, detail="创建用户失败")
+    finally:
+        connection.close()
 
 @router.post("/", response_model=UserResponse, summary="创建新用户")
 async def create_user(user_data: UserCreate):
@@ -79,69 +222,248 @@ async def create_user(user_data: UserCreate):
     - **phone**: 手机号码（可选）
     - **user_type**: 用户类型（admin/teacher/student，默认为student）
     """
+    # 慢哈希在进程池中计算，不占用数据库线程和连接
+    hashed_password = await password_hasher.hash_async(user_data.password)
+    return await run_db(_create_user, user_data, hashed_password)
+
+def _chunks(items: List, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _fold(value: Optional[str]) -> Optional[str]:
+    """与表的 _ci 排序规则一致，比较时忽略大小写"""
+    return value.casefold() if value else value
+
+def _find_existing(cursor, column: str, values: Set[str]) -> Set[str]:
+    """用分块的 IN (...) 查询找出已存在于users表中的值"""
+    repository = UserRepository(cursor)
+    existing = set()
+    for chunk in _chunks(sorted(values), BULK_CREATE_CONFIG['lookup_chunk_size']):
+        existing.update(_fold(row[column]) for row in repository.find_existing(column, chunk))
+    return existing
+
+def _validate_bulk_rows(cursor, users: List[UserCreate]) -> Dict[int, str]:
+    """
+    集合化的唯一性检查，返回 {下标: 错误信息}
+
+    检查顺序与单个创建一致：用户名、邮箱、手机号、用户类型；
+    同一请求内重复的值，第一次出现的行有效，之后的行报错
+    """
+    existing_usernames = _find_existing(cursor, "username", {u.username for u in users})
+    existing_emails = _find_existing(cursor, "email", {u.email for u in users if u.email})
+    existing_phones = _find_existing(cursor, "phone", {u.phone for u in users if u.phone})
+
+    errors = {}
+    seen_usernames, seen_emails, seen_phones = set(), set(), set()
+    for index, user in enumerate(users):
+        username, email, phone = _fold(user.username), _fold(user.email), _fold(user.phone)
+        if username in existing_usernames:
+            errors[index] = USERNAME_EXISTS
+        elif username in seen_usernames:
+            errors[index] = "用户名在本次请求中重复"
+        elif email and email in existing_emails:
+            errors[index] = "邮箱地址已存在"
+        elif email and email in seen_emails:
+            errors[index] = "邮箱地址在本次请求中重复"
+        elif phone and phone in existing_phones:
+            errors[index] = "手机号码已存在"
+        elif phone and phone in seen_phones:
+            errors[index] = "手机号码在本次请求中重复"
+        elif user.user_type not in VALID_USER_TYPES:
+            errors[index] = f"用户类型必须是: {', '.join(VALID_USER_TYPES)}"
+        else:
+            seen_usernames.add(username)
+            if email:
+                seen_emails.add(email)
+            if phone:
+                seen_phones.add(phone)
+    return errors
+
+def _insert_users(cursor, users: List[UserCreate], hashed_passwords: Dict[int, str],
+                  indexes: List[int]) -> Dict[str, int]:
+    """用多行INSERT写入users中指定下标的行，返回 {折叠后的用户名: 新用户ID}"""
+    repository = UserRepository(cursor)
+    ids = {}
+    now = datetime.now()
+    for chunk in _chunks(indexes, BULK_CREATE_CONFIG['insert_chunk_size']):
+        repository.insert_many([
+            (users[i].username, hashed_passwords[i], users[i].email or None, users[i].phone or None,
+             users[i].user_type, now, now)
+            for i in chunk
+        ])
+        # 多行INSERT的自增ID不保证连续，按唯一的用户名取回ID
+        rows = repository.ids_by_username([users[i].username for i in chunk])
+        ids.update((_fold(row["username"]), row["id"]) for row in rows)
+    return ids
+
+def _check_bulk_size(users: List[UserCreate]):
+    if len(users) > BULK_CREATE_CONFIG['max_rows']:
+        raise HTTPException(status_code=400, detail=f"单次最多创建 {BULK_CREATE_CONFIG['max_rows']} 个用户")
+
+def _validate_new_users(users: List[UserCreate]) -> Dict[int, str]:
+    """
+    唯一性检查（数据库操作部分），检查完立即归还连接
+
+    在计算密码哈希之前执行，只为能写入的行计算慢哈希，重复导入同一文件时不计算任何哈希
+    """
     connection = get_db_connection()
+    if not connection:
+        raise RuntimeError("数据库连接失败")
+    try:
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            return _validate_bulk_rows(cursor, users)
+    finally:
+        connection.close()
+
+def _insert_new_users(connection, users: List[UserCreate], hashed_passwords: Dict[int, str],
+                      errors: Dict[int, str]) -> Tuple[List[int], Dict[str, int]]:
+    """
+    在一个事务中写入已计算哈希的行，返回 (写入的下标, {折叠后的用户名: 新用户ID})
+
+    计算哈希期间其他请求可能写入了相同的值，事务中对这些行重新检查一次，新的冲突记入errors
+    """
+    candidates = sorted(hashed_passwords)
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        connection.begin()
+        recheck = _validate_bulk_rows(cursor, [users[i] for i in candidates])
+        for position, error in recheck.items():
+            errors[candidates[position]] = error
+        valid = [i for i in candidates if i not in errors]
+        ids = _insert_users(cursor, users, hashed_passwords, valid)
+        connection.commit()
+    return valid, ids
+
+def _write_users_bulk(users: List[UserCreate], hashed_passwords: Dict[int, str],
+                      errors: Dict[int, str]) -> BulkUserCreateResponse:
+    """写入批量创建中通过检查的行（数据库操作部分）"""
+    valid, ids = [], {}
+    if hashed_passwords:
+        connection = get_db_connection()
+        if not connection:
+            raise HTTPException(status_code=500, detail="数据库连接失败")
+        try:
+            valid, ids = _insert_new_users(connection, users, hashed_passwords, errors)
+        except pymysql.err.IntegrityError:
+            connection.rollback()
+            raise HTTPException(status_code=400, detail="批量创建期间用户数据发生变化，请重试")
+        except Exception as e:
+            connection.rollback()
+            print(f"批量创建用户时出错: {e}")
+            raise HTTPException(status_code=500, detail="批量创建用户失败")
+        finally:
+            connection.close()
+
+    if valid:
+        invalidate_user_caches()
+
+    results = [
+        BulkUserResult(index=i, username=user.username, success=i not in errors,
+                       id=ids.get(_fold(user.username)) if i not in errors else None,
+                       error=errors.get(i))
+        for i, user in enumerate(users)
+    ]
+    return BulkUserCreateResponse(total=len(users), created=len(valid),
+                                  failed=len(errors), results=results)
+
+def _create_users_bulk(users: List[UserCreate]) -> BulkUserCreateResponse:
+    """批量创建用户的同步版本（脚本和基准测试使用）：检查、哈希、写入"""
+    _check_bulk_size(users)
+    errors = _validate_new_users(users)
+    valid = [i for i in range(len(users)) if i not in errors]
+    hashed_passwords = hash_passwords([users[i].password for i in valid])
+    return _write_users_bulk(users, dict(zip(valid, hashed_passwords)), errors)
+
+@router.post("/bulk", response_model=BulkUserCreateResponse, summary="批量创建用户")
+async def create_users_bulk(bulk_data: BulkUserCreate):
+    """
+    批量创建用户
+
+    - **users**: UserCreate 列表，字段与创建单个用户相同
+
+    用户名/邮箱/手机号冲突或用户类型无效的行会被跳过并在 results 中给出原因，
+    其余行在同一事务中用多行INSERT写入；密码哈希只为通过检查的行计算，且不占用数据库连接和线程
+    """
+    users = bulk_data.users
+    _check_bulk_size(users)
+    try:
+        errors = await run_db(_validate_new_users, users)
+    except RuntimeError:
+        raise HTTPException(status_code=500, detail="数据库连接失败")
+    valid = [i for i in range(len(users)) if i not in errors]
+    hashed_passwords = await password_hasher.hash_many_async([users[i].password for i in valid])
+    return await run_db(_write_users_bulk, users, dict(zip(valid, hashed_passwords)), errors)
+
+def _build_user_filters(cursor, user_type: Optional[str], is_active: Optional[bool],
+                        search: Optional[str]):
+    """构建用户列表和导出共用的筛选条件，返回(条件列表, 参数列表)"""
+    where_conditions = []
+    params = []
+    
+    if user_type:
+        where_conditions.append("user_type = %s")
+        params.append(user_type)
+    
+    if is_active is not None:
+        where_conditions.append("is_active = %s")
+        params.append(is_active)
+    
+    if search:
+        search_sql, search_params = build_search_condition(cursor, search)
+        where_conditions.append(search_sql)
+        params.extend(search_params)
+    
+    return where_conditions, params
+
+def _get_users(page: int, page_size: int, user_type: Optional[str],
+               is_active: Optional[bool], search: Optional[str], page_cursor: Optional[str],
+               include_total: bool = True, estimate_total: bool = False, order: str = DEFAULT_ORDER):
+    """获取用户列表，支持分页、筛选和搜索（数据库操作部分）"""
+    connection = get_read_connection()
     if not connection:
         raise HTTPException(status_code=500, detail="数据库连接失败")
     
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            # 检查用户名是否已存在
-            check_sql = "SELECT id FROM users WHERE username = %s"
-            cursor.execute(check_sql, (user_data.username,))
-            if cursor.fetchone():
-                raise HTTPException(status_code=400, detail="用户名已存在")
-            
-            # 检查邮箱是否已存在（如果提供）
-            if user_data.email:
-                check_email_sql = "SELECT id FROM users WHERE email = %s"
-                cursor.execute(check_email_sql, (user_data.email,))
-                if cursor.fetchone():
-                    raise HTTPException(status_code=400, detail="邮箱地址已存在")
-            
-            # 检查手机号是否已存在（如果提供）
-            if user_data.phone:
-                check_phone_sql = "SELECT id FROM users WHERE phone = %s"
-                cursor.execute(check_phone_sql, (user_data.phone,))
-                if cursor.fetchone():
-                    raise HTTPException(status_code=400, detail="手机号码已存在")
-            
-            # 验证用户类型
-            valid_types = ["admin", "teacher", "student"]
-            if user_data.user_type not in valid_types:
-                raise HTTPException(status_code=400, detail=f"用户类型必须是: {', '.join(valid_types)}")
-            
-            # 创建用户
-            insert_sql = """
-                INSERT INTO users (username, password, email, phone, user_type, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            now = datetime.now()
-            hashed_password = hash_password(user_data.password)
-            
-            cursor.execute(insert_sql, (
-                user_data.username,
-                hashed_password,
-                user_data.email,
-                user_data.phone,
-                user_data.user_type,
-                now,
-                now
-            ))
-            
-            user_id = cursor.lastrowid
-            
-            # 获取创建的用户信息
-            select_sql = "SELECT * FROM users WHERE id = %s"
-            cursor.execute(select_sql, (user_id,))
-            user = cursor.fetchone()
+            # 构建查询条件
+            where_conditions, params = _build_user_filters(cursor, user_type, is_active, search)
             
-            return UserResponse(**user)
+            where_clause = " WHERE " + " AND ".join(where_conditions) if where_conditions else ""
             
-    except HTTPException:
-        raise
+            # 获取总数（优先使用缓存）
+            cache_key = count_cache_key("users", user_type=user_type, is_active=is_active, search=search)
+            repository = UserRepository(cursor)
+            total, total_estimated = fetch_total(repository, cache_key, where_clause, params,
+                                                 include_total, estimate_total)
+            
+            # 获取用户列表：提供游标时从游标位置继续，否则按页码偏移
+            if page_cursor:
+                keyset_sql, keyset_params = keyset_condition(page_cursor, order)
+                page_where = " WHERE " + " AND ".join(where_conditions + [keyset_sql])
+                page_params = params + keyset_params + [page_size + 1]
+                limit_clause = "LIMIT %s"
+            else:
+                page_where = where_clause
+                page_params = params + [page_size + 1, (page - 1) * page_size]
+                limit_clause = "LIMIT %s OFFSET %s"
+            
+            rows = repository.list_page(page_where, page_params, limit_clause, KEYSET_ORDER_BY[order])
+            users, next_cursor = split_page(rows, page_size, order)
+            
+            # 数据库行直接按响应模型校验一次并编码为JSON
+            return model_response(UserListResponse, {
+                "total": total,
+                "total_estimated": total_estimated,
+                "users": users,
+                "page": page,
+                "page_size": page_size,
+                "next_cursor": next_cursor,
+            })
+            
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"创建用户时出错: {e}")
-        raise HTTPException(status_code=500, detail="创建用户失败")
+        print(f"获取用户列表时出错: {e}")
+        raise HTTPException(status_code=500, detail="获取用户列表失败")
     finally:
         connection.close()
 
@@ -151,7 +473,11 @@ async def get_users(
     page_size: int = Query(10, ge=1, le=100, description="每页数量"),
     user_type: Optional[str] = Query(None, description="用户类型筛选"),
     is_active: Optional[bool] = Query(None, description="激活状态筛选"),
-    search: Optional[str] = Query(None, description="搜索关键词（用户名、邮箱、手机号）")
+    search: Optional[str] = Query(None, description="搜索关键词（用户名、邮箱、手机号）"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor），提供时忽略page"),
+    include_total: bool = Query(True, description="是否返回总数"),
+    estimate_total: bool = Query(False, description="总数缓存未命中时是否接受估算值"),
+    order: str = Query(DEFAULT_ORDER, pattern="^(asc|desc)$", description="按创建时间排序的方向")
 ):
     """
     获取用户列表，支持分页、筛选和搜索
@@ -161,180 +487,306 @@ async def get_users(
     - **user_type**: 用户类型筛选（admin/teacher/student）
     - **is_active**: 激活状态筛选（true/false）
     - **search**: 搜索关键词
+    - **cursor**: 分页游标，深翻页时比page更快
+    - **include_total**: 为false时不计算总数（total返回null）
+    - **estimate_total**: 为true时允许返回估算的总数
+    - **order**: desc（默认，最新创建的在前）或 asc；游标只能用于签发它时的排序方向
     """
-    connection = get_db_connection()
+    return await run_db(_get_users, page, page_size, user_type, is_active, search, cursor,
+                        include_total, estimate_total, order)
+
+EXPORT_COLUMNS = ["id", "username", "email", "phone", "user_type", "is_active",
+                  "created_at", "updated_at", "last_login"]
+
+def _open_user_export(user_type: Optional[str], is_active: Optional[bool], search: Optional[str],
+                      fmt: str, gzip_level: Optional[int]) -> CursorStream:
+    """打开用户导出的服务端游标（数据库操作部分），连接由返回的CursorStream持有"""
+    connection = get_read_connection()
     if not connection:
         raise HTTPException(status_code=500, detail="数据库连接失败")
     
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            # 构建查询条件
-            where_conditions = []
-            params = []
-            
-            if user_type:
-                where_conditions.append("user_type = %s")
-                params.append(user_type)
-            
-            if is_active is not None:
-                where_conditions.append("is_active = %s")
-                params.append(is_active)
-            
-            if search:
-                where_conditions.append("(username LIKE %s OR email LIKE %s OR phone LIKE %s)")
-                search_param = f"%{search}%"
-                params.extend([search_param, search_param, search_param])
-            
-            where_clause = " WHERE " + " AND ".join(where_conditions) if where_conditions else ""
-            
-            # 获取总数
-            count_sql = f"SELECT COUNT(*) as total FROM users{where_clause}"
-            cursor.execute(count_sql, params)
-            total = cursor.fetchone()['total']
-            
-            # 获取用户列表
-            offset = (page - 1) * page_size
-            select_sql = f"""
-                SELECT id, username, email, phone, user_type, is_active, 
-                       created_at, updated_at, last_login
-                FROM users{where_clause}
-                ORDER BY created_at DESC
-                LIMIT %s OFFSET %s
-            """
-            cursor.execute(select_sql, params + [page_size, offset])
-            users = cursor.fetchall()
-            
-            return UserListResponse(
-                total=total,
-                users=[UserResponse(**user) for user in users],
-                page=page,
-                page_size=page_size
-            )
-            
+            where_conditions, params = _build_user_filters(cursor, user_type, is_active, search)
+        where_clause = " WHERE " + " AND ".join(where_conditions) if where_conditions else ""
+        stream = CursorStream(connection, EXPORT_COLUMNS, fmt, EXPORT_CONFIG['fetch_size'],
+                              gzip_level, bool_columns=["is_active"])
+        name, sql = UserRepository.export_sql(EXPORT_COLUMNS, where_clause)
+        stream.execute(name, sql, params)
+        return stream
     except Exception as e:
-        print(f"获取用户列表时出错: {e}")
-        raise HTTPException(status_code=500, detail="获取用户列表失败")
-    finally:
-        connection.close()
+        connection.invalidate()
+        print(f"导出用户时出错: {e}")
+        raise HTTPException(status_code=500, detail="导出用户失败")
 
-@router.get("/{user_id}", response_model=UserResponse, summary="获取单个用户")
-async def get_user(user_id: int):
+@router.get("/export", summary="导出用户")
+async def export_users(
+    request: Request,
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$", description="导出格式（csv/ndjson）"),
+    user_type: Optional[str] = Query(None, description="用户类型筛选"),
+    is_active: Optional[bool] = Query(None, description="激活状态筛选"),
+    search: Optional[str] = Query(None, description="搜索关键词（用户名、邮箱、手机号）")
+):
     """
-    根据用户ID获取用户详细信息
+    流式导出用户，筛选条件与获取用户列表相同
     
-    - **user_id**: 用户ID
+    - **format**: csv（带表头）或 ndjson（每行一个JSON对象）
+    - 请求头 `Accept-Encoding` 包含 gzip 时，响应在发送过程中进行gzip压缩
+    
+    结果通过服务端游标按批读取，内存占用与导出行数无关
     """
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="数据库连接失败")
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    gzip_level = EXPORT_CONFIG['gzip_level'] if use_gzip else None
+    stream = await run_db(_open_user_export, user_type, is_active, search, fmt, gzip_level)
     
+    headers = {"Content-Disposition": f'attachment; filename="users.{fmt}"'}
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(iter_stream(stream), media_type=EXPORT_FORMATS[fmt], headers=headers)
+
+def _parse_roster_rows(job: ImportJob, rows) -> Tuple[List[UserCreate], List[int]]:
+    """用UserCreate校验一块CSV行，校验失败的行记入任务错误"""
+    users, line_numbers = [], []
+    for line_number, raw in rows:
+        data = {key: (value.strip() if isinstance(value, str) else value)
+                for key, value in raw.items() if key in ROSTER_COLUMNS}
+        # 空单元格视为未提供
+        data = {key: value for key, value in data.items() if value not in (None, "")}
+        try:
+            users.append(UserCreate(**data))
+            line_numbers.append(line_number)
+        except ValidationError as e:
+            fields = ", ".join(".".join(str(p) for p in err["loc"]) for err in e.errors())
+            job.add_error(line_number, data.get("username"), f"字段无效: {fields}")
+    return users, line_numbers
+
+def _read_import_chunk(job: ImportJob, reader: RosterReader):
+    """
+    读取并检查下一块（数据库操作部分），没有更多行时返回None
+
+    返回 (行数, 通过字段校验的用户, 行号, {下标: 唯一性错误})
+    """
+    rows = reader.next_chunk()
+    if not rows:
+        return None
+    users, line_numbers = _parse_roster_rows(job, rows)
+    errors = _validate_new_users(users) if users else {}
+    return len(rows), users, line_numbers, errors
+
+def _write_import_chunk(job: ImportJob, row_count: int, users: List[UserCreate], line_numbers: List[int],
+                        hashed_passwords: Dict[int, str], errors: Dict[int, str]):
+    """
+    写入一块中通过检查的行（数据库操作部分），每块一个事务
+
+    用户名已存在的行计为跳过而不是错误，所以重复导入同一文件是幂等的
+    """
+    valid = []
+    if hashed_passwords:
+        connection = get_db_connection()
+        if not connection:
+            raise RuntimeError("数据库连接失败")
+        try:
+            for attempt in (1, 2):
+                try:
+                    valid, _ = _insert_new_users(connection, users, hashed_passwords, errors)
+                    break
+                except pymysql.err.IntegrityError:
+                    # 并发写入了相同的用户名，重新检查一次即可把这些行归为跳过
+                    connection.rollback()
+                    if attempt == 2:
+                        raise
+        finally:
+            connection.close()
+
+    skipped = 0
+    for i, error in errors.items():
+        if error == USERNAME_EXISTS:
+            skipped += 1
+        else:
+            job.add_error(line_numbers[i], users[i].username, error)
+    if valid:
+        invalidate_user_caches()
+    job.record_chunk(row_count, len(valid), skipped)
+    save_job(job)
+
+async def _import_chunk(job: ImportJob, reader: RosterReader) -> bool:
+    """
+    导入下一块，没有更多行时返回False
+
+    先检查唯一性，只为需要写入的行计算哈希（在哈希进程池中，不占用数据库线程和连接），再写入；
+    重复导入已导入过的文件时不计算任何哈希
+    """
+    chunk = await run_db(_read_import_chunk, job, reader)
+    if chunk is None:
+        return False
+    row_count, users, line_numbers, errors = chunk
+    valid = [i for i in range(len(users)) if i not in errors]
+    hashed_passwords = await password_hasher.hash_many_async([users[i].password for i in valid])
+    await run_db(_write_import_chunk, job, row_count, users, line_numbers,
+                 dict(zip(valid, hashed_passwords)), errors)
+    return True
+
+async def _run_import(job: ImportJob, reader: RosterReader):
+    """后台导入任务：逐块处理，块之间让出线程池给其他请求；每块提交后和结束时保存任务状态"""
+    job.status = "running"
     try:
-        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            select_sql = """
-                SELECT id, username, email, phone, user_type, is_active, 
-                       created_at, updated_at, last_login
-                FROM users WHERE id = %s
-            """
-            cursor.execute(select_sql, (user_id,))
-            user = cursor.fetchone()
-            
-            if not user:
-                raise HTTPException(status_code=404, detail="用户不存在")
-            
-            return UserResponse(**user)
-            
-    except HTTPException:
+        while await _import_chunk(job, reader):
+            pass
+        job.finish("completed")
+    except asyncio.CancelledError:
+        job.finish("failed", "服务停止，导入中断；已提交的块不会回滚，可重新导入同一文件继续")
+        raise
+    except Exception as e:
+        print(f"导入花名册时出错: {e}")
+        job.finish("failed", f"导入中断，已提交的块不会回滚，可重新导入同一文件继续: {e}")
+    finally:
+        reader.close()
+        await run_db(save_job, job)
+
+async def _spool_upload(request: Request) -> str:
+    """把请求体流式写入临时文件，返回文件路径"""
+    limit = IMPORT_CONFIG['max_upload_bytes']
+    size = 0
+    spool = tempfile.NamedTemporaryFile(prefix="roster_", suffix=".csv", delete=False)
+    try:
+        with spool:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > limit:
+                    raise HTTPException(status_code=413, detail=f"文件超过 {limit // (1024 * 1024)}MB 上限")
+                spool.write(chunk)
+    except BaseException:
+        os.remove(spool.name)
         raise
+    return spool.name
+
+@router.post("/import", response_model=ImportJobResponse, status_code=202, summary="导入花名册CSV")
+async def import_users(
+    request: Request,
+    filename: Optional[str] = Query(None, description="原始文件名，仅用于在任务中显示")
+):
+    """
+    导入花名册CSV，请求体为CSV文件内容（Content-Type: text/csv）
+    
+    - 表头必须包含 **username**、**password**，可选 **email**、**phone**、**user_type**
+    - 上传完成后立即返回任务，导入在后台按块进行，每块一个事务
+    - 用户名已存在的行计为跳过，重复导入同一文件不会产生重复用户
+    
+    通过 GET /users/import/{job_id} 查询进度和逐行错误
+    """
+    path = await _spool_upload(request)
+    try:
+        reader = await run_db(RosterReader, path, IMPORT_CONFIG['chunk_size'])
+    except (RosterFormatError, UnicodeDecodeError, csv.Error) as e:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail=f"无法解析CSV文件: {e}")
+    job = create_job(filename)
+    # 先写入任务表，其他工作进程收到轮询请求时也能查到该任务
+    await run_db(save_job, job, True)
+    start_job_task(_run_import(job, reader))
+    return ImportJobResponse(**job.to_dict())
+
+def _load_import_job(job_id: str):
+    """从任务表读取其他工作进程上的导入任务（数据库操作部分）"""
+    try:
+        job = load_job(job_id)
+    except Exception as e:
+        print(f"获取导入任务时出错: {e}")
+        raise HTTPException(status_code=500, detail="获取导入任务失败")
+
+    if not job:
+        raise HTTPException(status_code=404, detail="导入任务不存在")
+
+    return ImportJobResponse(**job)
+
+@router.get("/import/{job_id}", response_model=ImportJobResponse, summary="查询花名册导入进度")
+async def get_import_job(job_id: str):
+    """查询导入任务的进度和逐行错误报告，任务可以在任意工作进程上运行"""
+    job = get_job(job_id)
+    if job:
+        return ImportJobResponse(**job.to_dict())
+    return await run_db(_load_import_job, job_id)
+
+def _get_user(user_id: int):
+    """根据用户ID获取用户详细信息（数据库操作部分，优先读取用户缓存）"""
+    try:
+        user = get_user_row(user_id)
     except Exception as e:
         print(f"获取用户时出错: {e}")
         raise HTTPException(status_code=500, detail="获取用户失败")
-    finally:
-        connection.close()
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="用户不存在")
+    
+    return model_response(UserResponse, user)
 
-@router.put("/{user_id}", response_model=UserResponse, summary="更新用户信息")
-async def update_user(user_id: int, user_data: UserUpdate):
+@router.get("/{user_id}", response_model=UserResponse, summary="获取单个用户")
+async def get_user(user_id: int):
     """
-    更新用户信息
+    根据用户ID获取用户详细信息
     
     - **user_id**: 用户ID
-    - **user_data**: 要更新的用户信息
     """
+    return await run_db(_get_user, user_id)
+
+def _update_user(user_id: int, user_data: UserUpdate):
+    """
+    更新用户信息（数据库操作部分）
+    
+    读取当前行、更新各一条语句（约束不全时多一条冲突检查），
+    响应由读取的行合并更新的值构造，不再重新查询
+    """
+    # 构建更新字段
+    changes = {}
+    if user_data.username is not None:
+        changes["username"] = user_data.username
+    if user_data.email is not None:
+        changes["email"] = user_data.email or None
+    if user_data.phone is not None:
+        changes["phone"] = user_data.phone or None
+    if user_data.user_type is not None:
+        changes["user_type"] = user_data.user_type
+    if user_data.is_active is not None:
+        changes["is_active"] = user_data.is_active
+    
     connection = get_db_connection()
     if not connection:
         raise HTTPException(status_code=500, detail="数据库连接失败")
     
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            # 检查用户是否存在
-            check_sql = "SELECT id FROM users WHERE id = %s"
-            cursor.execute(check_sql, (user_id,))
-            if not cursor.fetchone():
+            # 检查用户是否存在，同时取得构造响应所需的其他字段
+            repository = UserRepository(cursor)
+            user = repository.get(user_id)
+            if not user:
                 raise HTTPException(status_code=404, detail="用户不存在")
             
-            # 构建更新字段
-            update_fields = []
-            params = []
-            
-            if user_data.username is not None:
-                # 检查用户名是否已被其他用户使用
-                check_username_sql = "SELECT id FROM users WHERE username = %s AND id != %s"
-                cursor.execute(check_username_sql, (user_data.username, user_id))
-                if cursor.fetchone():
-                    raise HTTPException(status_code=400, detail="用户名已被其他用户使用")
-                update_fields.append("username = %s")
-                params.append(user_data.username)
-            
-            if user_data.email is not None:
-                # 检查邮箱是否已被其他用户使用
-                check_email_sql = "SELECT id FROM users WHERE email = %s AND id != %s"
-                cursor.execute(check_email_sql, (user_data.email, user_id))
-                if cursor.fetchone():
-                    raise HTTPException(status_code=400, detail="邮箱地址已被其他用户使用")
-                update_fields.append("email = %s")
-                params.append(user_data.email)
-            
-            if user_data.phone is not None:
-                # 检查手机号是否已被其他用户使用
-                check_phone_sql = "SELECT id FROM users WHERE phone = %s AND id != %s"
-                cursor.execute(check_phone_sql, (user_data.phone, user_id))
-                if cursor.fetchone():
-                    raise HTTPException(status_code=400, detail="手机号码已被其他用户使用")
-                update_fields.append("phone = %s")
-                params.append(user_data.phone)
-            
-            if user_data.user_type is not None:
-                valid_types = ["admin", "teacher", "student"]
-                if user_data.user_type not in valid_types:
-                    raise HTTPException(status_code=400, detail=f"用户类型必须是: {', '.join(valid_types)}")
-                update_fields.append("user_type = %s")
-                params.append(user_data.user_type)
+            if not changes:
+                raise HTTPException(status_code=400, detail="没有提供要更新的字段")
             
-            if user_data.is_active is not None:
-                update_fields.append("is_active = %s")
-                params.append(user_data.is_active)
+            conflict = find_conflict(cursor, changes, exclude_id=user_id)
+            if conflict:
+                raise HTTPException(status_code=400, detail=UPDATE_CONFLICT_MESSAGES[conflict])
             
-            if not update_fields:
-                raise HTTPException(status_code=400, detail="没有提供要更新的字段")
+            if "user_type" in changes and changes["user_type"] not in VALID_USER_TYPES:
+                raise HTTPException(status_code=400, detail=f"用户类型必须是: {', '.join(VALID_USER_TYPES)}")
             
             # 添加更新时间
-            update_fields.append("updated_at = %s")
-            params.append(datetime.now())
-            params.append(user_id)
+            changes["updated_at"] = datetime.now().replace(microsecond=0)
             
             # 执行更新
-            update_sql = f"UPDATE users SET {', '.join(update_fields)} WHERE id = %s"
-            cursor.execute(update_sql, params)
-            
-            # 获取更新后的用户信息
-            select_sql = """
-                SELECT id, username, email, phone, user_type, is_active, 
-                       created_at, updated_at, last_login
-                FROM users WHERE id = %s
-            """
-            cursor.execute(select_sql, (user_id,))
-            user = cursor.fetchone()
-            
-            return UserResponse(**user)
+            try:
+                repository.update_fields(user_id, changes)
+            except pymysql.err.IntegrityError as e:
+                field = duplicate_field(e)
+                if field:
+                    raise HTTPException(status_code=400, detail=UPDATE_CONFLICT_MESSAGES[field])
+                raise
+        
+        invalidate_user_caches(user_id)
+        user.update(changes)
+        return UserResponse(**user)
             
     except HTTPException:
         raise
@@ -344,13 +796,18 @@ async def update_user(user_id: int, user_data: UserUpdate):
     finally:
         connection.close()
 
-@router.delete("/{user_id}", summary="删除用户")
-async def delete_user(user_id: int):
+@router.put("/{user_id}", response_model=UserResponse, summary="更新用户信息")
+async def update_user(user_id: int, user_data: UserUpdate):
     """
-    删除用户（软删除，将is_active设置为False）
+    更新用户信息
     
     - **user_id**: 用户ID
+    - **user_data**: 要更新的用户信息
     """
+    return await run_db(_update_user, user_id, user_data)
+
+def _delete_user(user_id: int):
+    """删除用户（软删除，将is_active设置为False）（数据库操作部分）"""
     connection = get_db_connection()
     if not connection:
         raise HTTPException(status_code=500, detail="数据库连接失败")
@@ -358,16 +815,15 @@ async def delete_user(user_id: int):
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
             # 检查用户是否存在
-            check_sql = "SELECT id, username FROM users WHERE id = %s"
-            cursor.execute(check_sql, (user_id,))
-            user = cursor.fetchone()
+            repository = UserRepository(cursor)
+            user = repository.get_name(user_id)
             
             if not user:
                 raise HTTPException(status_code=404, detail="用户不存在")
             
             # 软删除：将is_active设置为False
-            update_sql = "UPDATE users SET is_active = FALSE, updated_at = %s WHERE id = %s"
-            cursor.execute(update_sql, (datetime.now(), user_id))
+            repository.set_active(user_id, False)
+            invalidate_user_caches(user_id)
             
             return {
                 "message": f"用户 '{user['username']}' 已成功删除",
@@ -383,14 +839,17 @@ async def delete_user(user_id: int):
     finally:
         connection.close()
 
-@router.post("/{user_id}/reset-password", summary="重置用户密码")
-async def reset_user_password(user_id: int, new_password: str):
+@router.delete("/{user_id}", summary="删除用户")
+async def delete_user(user_id: int):
     """
-    重置用户密码
+    删除用户（软删除，将is_active设置为False）
     
     - **user_id**: 用户ID
-    - **new_password**: 新密码
     """
+    return await run_db(_delete_user, user_id)
+
+def _reset_user_password(user_id: int, hashed_password: str):
+    """重置用户密码（数据库操作部分），hashed_password 由路由在进程池中预先计算"""
     connection = get_db_connection()
     if not connection:
         raise HTTPException(status_code=500, detail="数据库连接失败")
@@ -398,17 +857,15 @@ async def reset_user_password(user_id: int, new_password: str):
     try:
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
             # 检查用户是否存在
-            check_sql = "SELECT id, username FROM users WHERE id = %s"
-            cursor.execute(check_sql, (user_id,))
-            user = cursor.fetchone()
+            repository = UserRepository(cursor)
+            user = repository.get_name(user_id)
             
             if not user:
                 raise HTTPException(status_code=404, detail="用户不存在")
             
             # 更新密码
-            hashed_password = hash_password(new_password)
-            update_sql = "UPDATE users SET password = %s, updated_at = %s WHERE id = %s"
-            cursor.execute(update_sql, (hashed_password, datetime.now(), user_id))
+            repository.set_password(user_id, hashed_password)
+            invalidate_user_caches(user_id)
             
             return {
                 "message": f"用户 '{user['username']}' 密码已重置",
@@ -423,3 +880,14 @@ async def reset_user_password(user_id: int, new_password: str):
         raise HTTPException(status_code=500, detail="重置密码失败")
     finally:
         connection.close()
+
+@router.post("/{user_id}/reset-password", summary="重置用户密码")
+async def reset_user_password(user_id: int, new_password: str):
+    """
+    重置用户密码
+    
+    - **user_id**: 用户ID
+    - **new_password**: 新密码
+    """
+    hashed_password = await password_hasher.hash_async(new_password)
+    return await run_db(_reset_user_password, user_id, hashed_password)